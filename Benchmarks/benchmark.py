@@ -0,0 +1,269 @@
+"""Benchmarks of the drivers against the simulated instruments (see Simulator).
+
+    python -m Benchmarks.benchmark --output results.json
+    python -m Benchmarks.benchmark --output new.json --compare results.json
+
+Measured:
+    - commands - queries/s and p50/p99 latency of driver methods,
+    - waveform - MB/s of :WAV:DATA? reads of 1.2k, 250k and 12M points,
+    - dmm_fetch - time to fetch and parse 5000 and 50000 FETC? readings,
+    - files - CSV and binary write throughput,
+    - capture - full capture cycle of the osc_test.py workflow.
+Results are written as JSON, --compare prints the change against older results."""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+from Simulator.SCPIServer import SCPIServer, LinkModel, LINK_MODELS
+from Simulator.SimFluke8846A import SimFluke8846A
+from Simulator.SimFluke9142 import SimFluke9142
+from Simulator.SimIsotech954 import SimIsotech954
+from Simulator.SimRigolDS1054Z import SimRigolDS1054Z
+from Fluke8846A.Fluke8846A import Fluke8846A, parse_readings
+from Fluke9142.Fluke9142 import Fluke9142
+from Isotech954.Isotech954 import Isotech954
+from RigolDS1054Z.RigolDS1054Z import RigolDS1054Z, WaveformPreamble
+from RigolDS1054Z.Oscilloscope import Oscilloscope
+from RigolDS1054Z.CaptureFile import CaptureWriter, write_csv
+
+# Simulated time runs faster, so the meter integration time does not dominate
+DMM_TIME_SCALE = 1000
+# Result fields where a higher value is better, used by compare
+HIGHER_IS_BETTER = ('rate', 'MB_per_s', 'points_per_s', 'readings_per_s')
+
+def timings(function, repeat) -> dict:
+    """Calls the function repeat times and returns rate and latency percentiles"""
+    latencies = np.empty(repeat)
+    for i in range(repeat):
+        start = time.perf_counter()
+        function()
+        latencies[i] = time.perf_counter() - start
+    return {'count': repeat, 'rate': repeat/latencies.sum(),
+            'p50_ms': 1e3*float(np.percentile(latencies, 50)),
+            'p99_ms': 1e3*float(np.percentile(latencies, 99)),
+            'mean_ms': 1e3*float(latencies.mean())}
+
+def best_time(function, repeat = 3) -> float:
+    """Shortest of repeat runs of the function in seconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+class Benchmark:
+    def __init__(self, link = 'IDEAL', transport = 'SOCKET', repeat = 200, quick = False) -> None:
+        self.link = link
+        self.transport = transport
+        self.repeat = repeat
+        self.quick = quick
+        self.results = {}
+
+    def server(self, instrument) -> SCPIServer:
+        return SCPIServer(instrument, link=LinkModel(**LINK_MODELS[self.link], seed=0))
+
+    def run(self) -> dict:
+        for name in ('commands', 'waveform', 'dmm_fetch', 'files', 'capture'):
+            print(f'Running {name}')
+            self.results[name] = getattr(self, name)()
+        return self.results
+
+    def commands(self) -> dict:
+        results = {}
+        with self.server(SimFluke8846A(time_scale=DMM_TIME_SCALE, seed=0)) as server:
+            dmm = Fluke8846A(server.resource, transport=self.transport)
+            for method in (dmm.get_info, dmm.get_dc_voltage_range, dmm.get_current_config):
+                results[f'Fluke8846A.{method.__name__}'] = timings(method, self.repeat)
+            results['Fluke8846A.set_dc_voltage_range'] = timings(lambda: dmm.set_dc_voltage_range(10), self.repeat)
+            dmm.close_connection()
+        with self.server(SimFluke9142(seed=0)) as server:
+            bath = Fluke9142(server.resource, transport=self.transport)
+            for method in (bath.get_reference_temperature, bath.get_stability_status):
+                results[f'Fluke9142.{method.__name__}'] = timings(method, self.repeat)
+            bath.close_connection()
+        with self.server(SimIsotech954(switching_time=0)) as server:
+            switch = Isotech954(server.resource, transport=self.transport)
+            results['Isotech954.switch_to_channel'] = timings(lambda: switch.switch_to_channel(1), self.repeat)
+            switch.close_connection()
+        with self.server(SimRigolDS1054Z(seed=0)) as server:
+            rigol = RigolDS1054Z(server.resource, read_termination='\n', transport=self.transport)
+            results['RigolDS1054Z.get_trigger_status'] = timings(rigol.get_trigger_status, self.repeat)
+            results['RigolDS1054Z.get_waveform_parameters'] = timings(rigol.get_waveform_parameters, self.repeat)
+            rigol.close_connection()
+        return results
+
+    def waveform(self) -> dict:
+        results = {}
+        simulator = SimRigolDS1054Z(seed=0)
+        for n in (2, 3, 4):
+            simulator.settings[f'CHAN{n}:DISP'] = '0'
+        with self.server(simulator) as server:
+            osc = Oscilloscope(server.resource, transport=self.transport)
+            rigol = osc.rigol
+            rigol.set_waveform_channel('CHAN1')
+            rigol.set_return_format_waveform('BYTE')
+            rigol.set_reading_mode('NORM')
+            results['1.2k_list'] = self.__transfer(lambda: rigol.get_waveform_data(), 1200)
+            buffer = np.empty(1200, dtype=np.uint8)
+            results['1.2k_into'] = self.__transfer(lambda: rigol.get_waveform_data_into(buffer), 1200)
+            rigol.stop()
+            rigol.set_memory_depth(1_200_000)
+            rigol.set_reading_mode('RAW')
+            rigol.set_start_point_waveform_data(1)
+            rigol.set_stop_point_waveform_data(250_000)
+            results['250k_list'] = self.__transfer(lambda: rigol.get_waveform_data(), 250_000)
+            buffer = np.empty(250_000, dtype=np.uint8)
+            results['250k_into'] = self.__transfer(lambda: rigol.get_waveform_data_into(buffer), 250_000)
+            if not self.quick:
+                rigol.set_memory_depth(12_000_000)
+                osc.points = None
+                buffer = np.empty(12_000_000, dtype=np.uint8)
+                results['12M_memory'] = self.__transfer(lambda: osc.read_waveform_window(buffer, len(buffer)), len(buffer), 1)
+            osc.rigol.close_connection()
+        return results
+
+    def dmm_fetch(self) -> dict:
+        results = {}
+        with self.server(SimFluke8846A(time_scale=DMM_TIME_SCALE, seed=0)) as server:
+            dmm = Fluke8846A(server.resource, transport=self.transport)
+            dmm.set_dc_current('6E-1', 'MAX')
+            for count in (5000, 50000):
+                blocks = count//5000
+                dmm.set_trigger_count(5000)
+                fetch = []
+                parse = []
+                parse_array = []
+                for _ in range(blocks):
+                    dmm.init_wait_for_triger()
+                    start = time.perf_counter()
+                    data = dmm.fetch_data()
+                    fetched = time.perf_counter()
+                    values = [float(value) for value in data.strip().split(',')]
+                    parsed = time.perf_counter()
+                    readings = parse_readings(data)
+                    parse_array.append(time.perf_counter() - parsed)
+                    parse.append(parsed - fetched)
+                    fetch.append(fetched - start)
+                total = sum(fetch) + sum(parse_array)
+                results[f'{count}_readings'] = {'fetch_s': sum(fetch), 'parse_split_s': sum(parse),
+                                                'parse_array_s': sum(parse_array), 'total_s': total,
+                                                'readings_per_s': count/total, 'readings': len(readings)*blocks}
+            dmm.close_connection()
+        return results
+
+    def files(self) -> dict:
+        results = {}
+        points = 100_000 if self.quick else 1_000_000
+        rng = np.random.default_rng(0)
+        time_axis = np.arange(points)*1e-6
+        voltage = rng.standard_normal((3, points))
+        codes = rng.integers(0, 256, (3, points), dtype=np.uint8)
+        readings = [f'{value:+.8E}' for value in 1.3e-4 + 1e-6*rng.standard_normal(5000)]
+        preamble = SimRigolDS1054Z(seed=0).preamble().split(',')
+        preamble = WaveformPreamble(*(int(float(value)) for value in preamble[:4]), *(float(value) for value in preamble[4:10]))
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'bench')
+            elapsed = best_time(lambda: write_csv(filename + '.csv', time_axis, voltage), 1 if not self.quick else 3)
+            results['csv_3ch'] = {'points': points, 'seconds': elapsed, 'points_per_s': points/elapsed,
+                                  'MB_per_s': os.path.getsize(filename + '.csv')/elapsed/1e6}
+
+            def write_binary():
+                with CaptureWriter(filename + '.cap') as writer:
+                    for i, channel in enumerate(('CHAN1', 'CHAN2', 'CHAN3')):
+                        writer.add_channel(channel, preamble, codes[i])
+            elapsed = best_time(write_binary)
+            results['binary_3ch'] = {'points': points, 'seconds': elapsed, 'points_per_s': points/elapsed,
+                                     'MB_per_s': os.path.getsize(filename + '.cap')/elapsed/1e6}
+
+            def write_readings():
+                with open(filename + '_readings.csv', 'w', newline='') as f:
+                    for reading in readings:
+                        f.write(reading + '\n')
+            elapsed = best_time(write_readings)
+            results['dmm_readings_csv'] = {'points': len(readings), 'seconds': elapsed,
+                                           'points_per_s': len(readings)/elapsed}
+        return results
+
+    def capture(self) -> dict:
+        """run, wait, set memory depth 300k, single, read 3 channels and write CSV as osc_test.py"""
+        with self.server(SimRigolDS1054Z(seed=0)) as server, tempfile.TemporaryDirectory() as directory:
+            osc = Oscilloscope(server.resource, transport=self.transport)
+            phases = {}
+
+            def cycle():
+                start = time.perf_counter()
+                osc.rigol.run()
+                osc.rigol.wait_for_trigger_state(('TD', 'WAIT', 'RUN', 'AUTO'), timeout=10)
+                osc.rigol.set_memory_depth(300_000)
+                osc.rigol.single_and_wait(timeout=20)
+                armed = time.perf_counter()
+                voltage, time_axis = osc.acquire_channels(['CHAN1', 'CHAN2', 'CHAN3'])
+                read = time.perf_counter()
+                osc.write_to_csv(os.path.join(directory, 'capture.csv'), time_axis, voltage)
+                phases.update(acquire_s=armed - start, read_s=read - armed, csv_s=time.perf_counter() - read)
+            elapsed = best_time(cycle, 1 if self.quick else 3)
+            osc.rigol.close_connection()
+        return dict(cycle_s=elapsed, **phases)
+
+    def __transfer(self, read, points, repeat = None) -> dict:
+        repeat = repeat or max(3, self.repeat//20)
+        result = timings(read, repeat)
+        result['points'] = points
+        result['MB_per_s'] = points*result['rate']/1e6
+        return result
+
+def git_version() -> str:
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return ''
+
+def flatten(results, prefix = '') -> dict:
+    """Returns {'group.name.field': value} of nested results"""
+    values = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            values.update(flatten(value, f'{prefix}{key}.'))
+        elif isinstance(value, (int, float)):
+            values[prefix + key] = value
+    return values
+
+def compare(results, reference) -> None:
+    """Prints relative change of every numeric result against the reference results"""
+    old = flatten(reference['results'])
+    for name, value in flatten(results['results']).items():
+        if not old.get(name):
+            continue
+        change = (value - old[name])/old[name]
+        better = change > 0 if name.endswith(HIGHER_IS_BETTER) else change < 0
+        flag = '' if abs(change) < 0.1 else (' better' if better else ' WORSE')
+        print(f'{name}: {old[name]:.4g} -> {value:.4g} ({change:+.1%}){flag}')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='python -m Benchmarks.benchmark')
+    parser.add_argument('--output', default='benchmark.json')
+    parser.add_argument('--compare', help='JSON results of an earlier run')
+    parser.add_argument('--link', choices=LINK_MODELS, default='IDEAL')
+    parser.add_argument('--transport', choices=('SOCKET', 'VISA'), default='SOCKET')
+    parser.add_argument('--repeat', type=int, default=200, help='repetitions of every command')
+    parser.add_argument('--quick', action='store_true', help='skip 12M point reads, smaller files')
+    args = parser.parse_args()
+
+    benchmark = Benchmark(args.link, args.transport, args.repeat, args.quick)
+    results = {'version': git_version(), 'date': datetime.now().isoformat(timespec='seconds'),
+               'python': platform.python_version(), 'machine': platform.machine(),
+               'link': args.link, 'transport': args.transport, 'quick': args.quick,
+               'results': benchmark.run()}
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f'Results written to {args.output}')
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
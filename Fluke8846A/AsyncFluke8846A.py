@@ -0,0 +1,25 @@
+import numpy as np
+from SCPIInstrument.AsyncSCPIInstrument import AsyncSCPIBatching, AsyncSCPIInstrument
+from Fluke8846A.Fluke8846A import Fluke8846A
+
+class AsyncFluke8846A(AsyncSCPIBatching, AsyncSCPIInstrument, Fluke8846A):
+    """asyncio variant of Fluke8846A, every method is a coroutine,
+    e.g. await dmm.fetch_data()."""
+
+    # Local methods which do not talk to the instrument stay synchronous
+    get_active_config = Fluke8846A.get_active_config
+
+    async def stream(self, chunk_size = 1000, count = 'INF', poll_interval = 0.05, overload = np.nan, timeout = 10):
+        """Async generator variant of Fluke8846A.stream, used as
+        `async for readings in dmm.stream(1000):`"""
+        state = await self._stream_start(count, chunk_size, timeout)
+        if state is None:
+            return
+        try:
+            while True:
+                readings = await self._stream_next(state, chunk_size, poll_interval, overload)
+                if readings is None:
+                    return
+                yield readings
+        finally:
+            await self._stream_stop(state)
@@ -1,7 +1,36 @@
-import pyvisa
+import math
 import time
-
-class Fluke8846A:
+import numpy as np
+from SCPIInstrument.SCPIInstrument import SCPIBatching, SCPIInstrument, io_method
+from Fluke8846A.MeasurementConfig import FUNCTIONS, NPLC_FUNCTIONS, config_commands, config_from_reply, config_messages
+
+# Reading returned by the Meter when the input is out of range
+OVERLOAD = 9.9E37
+# Readings held in the Meter's internal memory
+MEMORY_SIZE = 5000
+# Readings stream takes before it estimates the reading rate from them, a rate
+# of fewer readings is too inaccurate and overslept polls overfill the memory
+STREAM_RATE_READINGS = 10
+# Default power line frequency in Hz, integration time of a reading is NPLC/line_frequency
+LINE_FREQUENCY = 50
+# Integration times tried by tune_nplc
+TUNING_NPLC = (0.02, 0.2, 1, 10, 100)
+
+def parse_readings(data, overload = np.nan) -> np.ndarray:
+    """Parses comma separated readings of FETC?/READ? into a float64 array.
+    Overload readings (+-9.9E37) are replaced with `overload`, or kept if it is None.
+    Raises ValueError if any of the readings is not a number."""
+    if data is None:
+        return None
+    text = data.strip().strip(',')
+    if not text:
+        return np.empty(0, dtype=np.float64)
+    readings = np.array(text.split(','), dtype=np.float64)
+    if overload is not None:
+        readings[np.abs(readings) >= OVERLOAD] = overload
+    return readings
+
+class Fluke8846A(SCPIBatching, SCPIInstrument):
     """Class that controls Fluke 9142 Dry Temperature bath.
 
     Set dev_info:
@@ -9,94 +38,262 @@ class Fluke8846A:
         Note: If instrument could not be recognized with standdar TCPIP settings, try with raw socket
         e.g. ['TCPIP::169.254.1.2::3490:SOCKET']
         - usb connection  (dev_info set to ['usb_dev_info'] e.g [''])
-        - serial connection (dev_info set_to ['COM port',] e.g ['ASRL/dev/ttyUSB0::INSTR'])"""
-
-    def __init__(self, dev_info, read_termination = '\r\n', write_termination = '\r\n', delay = 0.05, timeout = 10_000) -> None:
-        
-        self.__instrument_connected = False
-        
-        rm = pyvisa.ResourceManager()
-        try:
-            self.__inst = rm.open_resource(dev_info, write_termination=write_termination, read_termination=read_termination)
-            self.__instrument_connected = True
-            self.__inst.timeout = timeout
-            self.__delay = delay
-        except:
-            print('Check connection with Fluke 9142')
-    
-    def __get_data(self,query) -> str:
-        if self.__instrument_connected:
-            try:
-                recv = self.__inst.query(query)
-                time.sleep(self.__delay)
-                return recv
-            except:
-                print('Can not query data from the instrument')
-            
-        else:
-            print('Fluke 8846A is not connected')
-        return None
-
-    def __write_data(self, data) -> bool:
-        if self.__instrument_connected:
-            try:
-                self.__inst.write(data)
-                time.sleep(self.__delay)
-                return True
-            except Exception as e: 
-                print('Can not send data to the Fluke 8846A')
-                print('Reason:', e)
-            
-        else:
-            print('Fluke 8846A is not connected')
-        return False
-
-    def close_connection(self) -> str:
-        """Close connection"""
-        if self.__instrument_connected:
-            self.__inst.close()
-            self.__instrument_connected = False
+        - serial connection (dev_info set_to ['COM port',] e.g ['ASRL/dev/ttyUSB0::INSTR'])
+    Set pacing:
+        - OPC (default) - no waiting after queries, *OPC? after commands which take long
+          (*RST, CONF),
+        - ADAPTIVE - as OPC, with a minimum interval between commands derived from timed *OPC?,
+        - FIXED - sleep `delay` seconds after every command,
+        - NONE - no waiting.
+    Set transport:
+        - VISA (default) - resource is opened with pyvisa,
+        - SOCKET - TCPIP::host::port::SOCKET resource over a raw TCP socket, without VISA.
+    Set line_frequency:
+        - power line frequency in Hz (50 or 60), used to convert NPLC to integration time.
+    Redundant setting commands can be skipped with enable_state_cache().
+    Complete setups are applied in one message with apply_config(MeasurementConfig(...))."""
+
+    name = 'Fluke 8846A'
+    opc_commands = ('*RST', 'CONF')
+    state_invalidating_commands = ('*RST', '*CLS', 'SYST:LOC', 'CONF', 'MEAS')
+    # Settings of one function depend on each other, e.g. range turns autorange
+    # off and resolution sets NPLC
+    state_subtrees = tuple(f'SENS:{function}' for function in FUNCTIONS)
+    # Commands which do not change the measurement configuration
+    config_preserving_commands = ('INIT', 'ABOR', '*TRG', '*OPC', '*CLS', 'SYST:REM', 'SYST:LOC', 'DISP')
+
+    def __init__(self, dev_info, read_termination = '\r\n', write_termination = '\r\n', delay = 0.05, timeout = 10_000, pacing = 'OPC', transport = 'VISA', line_frequency = LINE_FREQUENCY) -> None:
+        self.line_frequency = line_frequency
+        self._config = None
+        self.tuning_cache = {}
+        super().__init__(dev_info, read_termination, write_termination, delay, timeout, pacing, transport)
 
     # Get instrument info
     def get_info(self) -> str:
         """Get instrument info """
-        return self.__get_data('*IDN?')
+        return self._get_data('*IDN?')
 
     def get_operation_complete_bit(self) -> str:
         """Get "Operation Complete" bit in Standard event reg.
            Returns “1” in output buffer after command execution."""
-        return self.__get_data('*OPC?')
+        return self._get_data('*OPC?')
 
     def clear_status(self) -> bool:
         """Clear status byte summary, and all event registers"""
-        return self.__write_data('*CLS')
+        return self._write_data('*CLS')
 
     def reset_instrument(self) -> bool:
         """Reset Meter to its power-on state"""
-        return self.__write_data('*RST')
+        return self._write_data('*RST')
 
     def self_test(self) -> bool:
         """Perform self-test. Returns “0” if the test succeeds,
         “1” if the test fails"""
-        return self.__write_data('*TST')
+        return self._write_data('*TST')
 
     def switch_to_local(self) -> bool:
         """Places the Meter in the local mode. Front-panel keys still function"""
-        return self.__write_data('SYST:LOC')
+        return self._write_data('SYST:LOC')
 
     def switch_to_remote(self) -> bool:
         """Places the Meter in the remote mode for RS-232 or Ethernet remote
         control. All front-panel keys, except the local key, are disabled."""
-        return self.__write_data('SYST:REM')
+        return self._write_data('SYST:REM')
 
     def get_current_config(self) -> str:
         """Retrieves present Meter configuration"""
-        return self.__get_data('CONF?')
+        return self._get_data('CONF?')
 
     def set_display_status(self, status = 'ON') -> bool:
         """Enables or disables the Meter's display"""
-        return self.__write_data('DISP {}'.format(status))
+        return self._write_data('DISP {}'.format(status))
+
+
+    '''Measurement configuration'''
+
+    @io_method
+    def apply_config(self, config) -> bool:
+        """Applies the complete measurement configuration in one message.
+        The commands of every configuration are compiled once, and nothing is
+        sent when the configuration is already active, i.e. no other setting
+        was written since it was applied.
+
+        Parameters
+        ----------
+        config : type - MeasurementConfig
+
+        Returns
+        -------
+        bool status
+        """
+        if config == self._config:
+            return True
+        messages = self._config_messages(config)
+        if messages is None:
+            return False
+        status = True
+        for message in messages:
+            status = (yield self._write_data(message)) and status
+        self._config = config if status else None
+        return status
+
+    def get_active_config(self):
+        """Returns MeasurementConfig applied last, or None if settings were changed since"""
+        return self._config
+
+    @io_method
+    def tune_nplc(self, max_std = None, min_rate = None, config = None, burst = 100, burst_time = 1.0):
+        """Finds and applies the integration time which meets the target.
+
+        Short bursts of readings are taken at the TUNING_NPLC values, the reading
+        rate and the standard deviation of every burst are stored in tuning_cache
+        under the function and range, so later calls with the same function and
+        range only measure the values not tried yet. tuning_cache is a plain
+        dict, e.g. {'VOLT:DC 10': {0.02: (rate, std), ...}}, which can be
+        saved and restored between sessions. The input has to be stable during tuning.
+        The rate is measured from DATA:POIN? polls during the acquisition, so it
+        does not include the command and transfer overhead of the bursts.
+
+        Parameters
+        ----------
+        max_std : type - float - largest standard deviation of readings, the fastest
+                                 NPLC meeting it is selected
+        min_rate : type - float - smallest rate in readings/s, without max_std the
+                                  NPLC with the lowest noise reaching it is selected
+        config : type - MeasurementConfig - function and range, by default the active
+                        configuration, or function and range read with CONF?
+        burst : type - int - largest number of readings in one burst
+        burst_time : type - float - duration of one burst in seconds, at least 10 readings are taken
 
+        Returns
+        -------
+        MeasurementConfig applied, or None if no NPLC meets the target.
+        """
+        if max_std is None and min_rate is None:
+            print('Please set max_std or min_rate.')
+            return None
+        config = config or self._config
+        if config is None:
+            config = config_from_reply((yield self.get_current_config()))
+        if config is None:
+            print('Please set config, the Meter configuration could not be read.')
+            return None
+        if config.function.upper() not in NPLC_FUNCTIONS:
+            print(f'NPLC can not be set for {config.function}')
+            return None
+        key = self._tuning_key(config)
+        nplc = self._tuning_next(key, max_std, min_rate)
+        while nplc is not None:
+            trial = self._tuning_trial(config, nplc, burst, burst_time)
+            if not (yield self.apply_config(trial)):
+                return None
+            rate = yield self._tuning_burst(trial)
+            readings = yield self.fetch_data(as_array=True)
+            if rate is None or readings is None:
+                return None
+            self._tuning_store(key, nplc, readings, rate)
+            nplc = self._tuning_next(key, max_std, min_rate)
+        nplc = self._tuning_choice(key, max_std, min_rate)
+        if nplc is None:
+            print(f'No NPLC of {self.name} meets the target.')
+            return None
+        return self._config if (yield self.apply_config(config._replace(nplc=nplc, resolution=None))) else None
+
+    @io_method
+    def _tuning_burst(self, trial) -> float:
+        """Initiates the burst and polls DATA:POIN? until it is complete.
+        Returns the reading rate between the first and the last poll of the
+        running acquisition, or None."""
+        count = trial.sample_count
+        reading_time = trial.nplc/self.line_frequency
+        if not (yield self.init_wait_for_triger()):
+            return None
+        start = time.perf_counter()
+        polls = []
+        yield self._sleep(count*reading_time/2)
+        while True:
+            sent = time.perf_counter()
+            points = yield self._get_data('DATA:POIN?', delay=0)
+            if points is None:
+                return None
+            # Readings are counted in the middle of the round trip
+            at = (sent + time.perf_counter())/2
+            points = int(float(points))
+            if points >= count:
+                break
+            polls.append((points, at))
+            yield self._sleep(min(max((count - points)*reading_time/2, 0.001), 1.0))
+        if len(polls) > 1 and polls[-1][0] > polls[0][0]:
+            return (polls[-1][0] - polls[0][0])/(polls[-1][1] - polls[0][1])
+        return count/(at - start)
+
+    def _tuning_key(self, config) -> str:
+        try:
+            range = f'{float(config.range):g}'
+        except ValueError:
+            range = config.range
+        return f'{config.function} {range}'.upper()
+
+    def _tuning_order(self, max_std, min_rate) -> list:
+        """Integration times in order of preference, fastest first when the noise
+        is limited, otherwise the quietest which can reach min_rate first"""
+        order = [nplc for nplc in TUNING_NPLC if min_rate is None or self.line_frequency/nplc >= min_rate]
+        return order if max_std is not None else order[::-1]
+
+    def _tuning_meets(self, result, max_std, min_rate) -> bool:
+        rate, std = result
+        return (max_std is None or std <= max_std) and (min_rate is None or rate >= min_rate)
+
+    def _tuning_next(self, key, max_std, min_rate):
+        """Next NPLC to measure, or None when the cache is enough to decide"""
+        results = self.tuning_cache.get(key, {})
+        for nplc in self._tuning_order(max_std, min_rate):
+            if nplc not in results:
+                return nplc
+            if self._tuning_meets(results[nplc], max_std, min_rate):
+                return None
+        return None
+
+    def _tuning_trial(self, config, nplc, burst, burst_time):
+        count = min(burst, max(10, int(burst_time*self.line_frequency/nplc)))
+        return config._replace(nplc=nplc, resolution=None, trigger_source='IMM', trigger_delay=None,
+                               trigger_count=1, sample_count=count)
+
+    def _tuning_store(self, key, nplc, readings, rate) -> None:
+        valid = readings[~np.isnan(readings)]
+        std = float(np.std(valid, ddof=1)) if len(valid) > 1 else math.inf
+        self.tuning_cache.setdefault(key, {})[nplc] = (rate, std)
+
+    def _tuning_choice(self, key, max_std, min_rate):
+        results = self.tuning_cache.get(key, {})
+        for nplc in self._tuning_order(max_std, min_rate):
+            if nplc in results and self._tuning_meets(results[nplc], max_std, min_rate):
+                return nplc
+        return None
+
+    def _config_messages(self, config) -> tuple:
+        try:
+            return config_messages(config, self.max_message_length)
+        except ValueError as e:
+            print('Please check measurement configuration.', e)
+            return None
+
+    def _before_write(self, data) -> None:
+        if self._config is None:
+            return
+        applied = config_commands(self._config)
+        for command in data.split(';'):
+            command = command.strip().lstrip(':')
+            if command not in applied and not command.upper().startswith(self.config_preserving_commands):
+                self._config = None
+                return
+
+    def _command_failed(self) -> None:
+        super()._command_failed()
+        self._config = None
+
+    def _batch_discarded(self) -> None:
+        self._config = None
 
     '''Filters'''
 
@@ -115,9 +312,9 @@ class Fluke8846A:
         bool status
         """
         if state == 'ON' or state == '1' or state == 1:
-            return self.__write_data('FILT ON')
+            return self._write_data('FILT ON')
         elif state == 'OFF' or state == '0' or state == 0:
-            return self.__write_data('FILT OFF')
+            return self._write_data('FILT OFF')
         else:
             print('Please check parameter state.')
         
@@ -137,9 +334,9 @@ class Fluke8846A:
         bool status
         """
         if state == 'ON' or state == '1' or state == 1:
-            return self.__write_data('FILT:DIG ON')
+            return self._write_data('FILT:DIG ON')
         elif state == 'OFF' or state == '0' or state == 0:
-            return self.__write_data('FILT:DIG OFF')
+            return self._write_data('FILT:DIG OFF')
         else:
             print('Please check parameter state.')
 
@@ -151,7 +348,7 @@ class Fluke8846A:
         str status - Returns the digital averaging filter setting. (0 =
                      OFF and 1 = ON)
         """
-        return self.__write_data('FILT:DIG?')
+        return self._write_data('FILT:DIG?')
 
     def get_filter_analog(self) -> str:
         """Gets state of the 3-pole analog filter.
@@ -160,33 +357,33 @@ class Fluke8846A:
         -------
         str status - Returns the analog dc filter setting. (0 = OFF and 1 = ON)
         """
-        return self.__write_data('FILT?')
+        return self._write_data('FILT?')
 
     '''2 wire resistance'''
 
     def get_2w_resistance_range(self) -> str:
         """Gets 2-wire resistance measurement range"""
-        return self.__get_data('SENS:RES:RANG?')
+        return self._get_data('SENS:RES:RANG?')
 
     def set_2w_resistance(self, range = 'DEF', resolution = 'MIN') -> bool:
         """Selects 2-wire resistance function"""
-        return self.__write_data('CONF:RES {}, {}'.format(range, resolution))
+        return self._write_data('CONF:RES {}, {}'.format(range, resolution))
 
     '''4 wire resistance'''
 
     def set_4w_resistance(self, range = 'DEF', resolution = 'MIN') -> bool:
         """Selects 4-wire resistance function"""
-        return self.__write_data('CONF:FRES {}, {}'.format(range, resolution))
+        return self._write_data('CONF:FRES {}, {}'.format(range, resolution))
 
     def get_2w_resistance_range(self) -> str:
         """Gets 4-wire resistance measurement range"""
-        return self.__get_data('SENS:FRES:RANG?')
+        return self._get_data('SENS:FRES:RANG?')
 
     '''DC voltage'''
 
     def set_dc_voltage(self, range = 'DEF', resolution = 'MIN') -> bool:
         """Selects dc volts function """
-        return self.__write_data('CONF:VOLT:DC {}, {}'.format(range, resolution))
+        return self._write_data('CONF:VOLT:DC {}, {}'.format(range, resolution))
 
     def set_dc_voltage_range(self, range) -> bool:
         """Sets the range of the DC voltage measurement.
@@ -202,7 +399,7 @@ class Fluke8846A:
         -------
         bool status                
         """
-        return self.__write_data('SENS:VOLT:DC:RANG {}'.format(range))
+        return self._write_data('SENS:VOLT:DC:RANG {}'.format(range))
 
     def set_dc_voltage_auto_range(self, autorange) -> bool:
         """Switches the Meter between autoranging and manual ranging.
@@ -218,9 +415,9 @@ class Fluke8846A:
         bool status    
         """ 
         if autorange:
-            return self.__write_data('SENS:VOLT:DC:RANG:AUTO ON')
+            return self._write_data('SENS:VOLT:DC:RANG:AUTO ON')
         else:
-            return self.__write_data('SENS:VOLT:DC:RANG:AUTO OFF')
+            return self._write_data('SENS:VOLT:DC:RANG:AUTO OFF')
 
     def set_dc_voltage_resolution(self, resolution) -> bool:
         """Sets the resolution of the DC voltage measurement.
@@ -236,7 +433,7 @@ class Fluke8846A:
         -------
         bool status                
         """
-        return self.__write_data('SENS:VOLT:DC:RES {}'.format(resolution))
+        return self._write_data('SENS:VOLT:DC:RES {}'.format(resolution))
 
     def set_dc_voltage_NPLC(self, nplc) -> bool:
         """Sets the Meter's integration time for the dc voltage measurement.
@@ -256,7 +453,7 @@ class Fluke8846A:
         nplc_list = [0.02, 0.2, 1, 10, 100, '0.02', '0.2', '1', '10', '100', 'MIN', 'MAX']
 
         if nplc in nplc_list:
-            return self.__write_data('SENS:VOLT:DC:NPLC {}'.format(nplc))
+            return self._write_data('SENS:VOLT:DC:NPLC {}'.format(nplc))
         else:
             print('Please check nplc parameter.')
 
@@ -267,7 +464,7 @@ class Fluke8846A:
         -------
         str - Returns the set resolution for dc volts.   
         """
-        return self.__get_data('SENS:VOLT:DC:RANG?')
+        return self._get_data('SENS:VOLT:DC:RANG?')
 
     def get_dc_voltage_resolution(self) -> str:
         """Gets the resolution of the DC voltage measurement.
@@ -276,7 +473,7 @@ class Fluke8846A:
         -------
         str - Returns the set resolution for dc volts.               
         """
-        return self.__get_data('SENS:VOLT:DC:RES?')
+        return self._get_data('SENS:VOLT:DC:RES?')
 
     def get_dc_voltage_nplc(self) -> str:
         """Gets the nplc of the DC voltage measurement.
@@ -285,14 +482,14 @@ class Fluke8846A:
         -------
         str - Returns the set nplc for dc volts.               
         """
-        return self.__get_data('SENS:VOLT:DC:NPLC?')
+        return self._get_data('SENS:VOLT:DC:NPLC?')
 
 
     '''AC voltage'''
 
     def set_ac_voltage(self, range = 'DEF', resolution = 'MIN') -> bool: 
         """Selects ac volts function"""
-        return self.__write_data('CONF:VOLT:AC {}, {}'.format(range,resolution))
+        return self._write_data('CONF:VOLT:AC {}, {}'.format(range,resolution))
     
     def set_ac_voltage_range(self, range) -> bool:
         """Sets the range of the AC voltage measurement.
@@ -308,33 +505,33 @@ class Fluke8846A:
         -------
         bool status                
         """
-        return self.__write_data('SENS:VOLT:AC:RANG {}'.format(range))
+        return self._write_data('SENS:VOLT:AC:RANG {}'.format(range))
 
     def get_ac_voltage_range(self) -> str:
         """Gets ac volts measurement range"""
-        return self.__get_data('SENS:VOLT:AC:RANG?')
+        return self._get_data('SENS:VOLT:AC:RANG?')
 
     '''DC voltage ratio'''
 
     def set_dc_voltage_ratio(self) -> bool:
         """Selects dc volts ratio function"""
-        return self.__write_data('CONF:VOLT:DC:RATIO')
+        return self._write_data('CONF:VOLT:DC:RATIO')
 
     '''DC current'''
 
     def set_dc_current(self, range = 'DEF', resolution = 'MIN') -> bool:
         """Selects dc current function """
-        return self.__write_data('CONF:CURR:DC {}, {}'.format(range, resolution))
+        return self._write_data('CONF:CURR:DC {}, {}'.format(range, resolution))
 
     def get_dc_voltage_range(self) -> str:
         """Gets dc current measurement range"""
-        return self.__get_data('SENS:CURR:DC:RANG?')
+        return self._get_data('SENS:CURR:DC:RANG?')
 
     '''AC current'''
 
     def set_ac_current(self, range = 'DEF', resolution = 'MIN') -> bool:
         """Selects ac current function """
-        return self.__write_data('CONF:CURR:AC {}, {}'.format(range, resolution))
+        return self._write_data('CONF:CURR:AC {}, {}'.format(range, resolution))
 
     def set_ac_current_range(self, range) -> bool:
         """Sets the range of the AC current measurement.
@@ -350,7 +547,7 @@ class Fluke8846A:
         -------
         bool status                
         """
-        return self.__write_data('SENS:CURR:AC:RANG {}'.format(range))
+        return self._write_data('SENS:CURR:AC:RANG {}'.format(range))
 
     def set_ac_voltage_auto_range(self, autorange) -> bool:
         """Switches the Meter between autoranging and manual ranging.
@@ -366,9 +563,9 @@ class Fluke8846A:
         bool status    
         """ 
         if autorange:
-            return self.__write_data('SENS:CURR:AC:RANG:AUTO ON')
+            return self._write_data('SENS:CURR:AC:RANG:AUTO ON')
         else:
-            return self.__write_data('SENS:CURR:AC:RANG:AUTO OFF')
+            return self._write_data('SENS:CURR:AC:RANG:AUTO OFF')
 
     def set_ac_current_resolution(self, resolution) -> bool:
         """Sets the resolution of the AC current measurement.
@@ -384,7 +581,7 @@ class Fluke8846A:
         -------
         bool status                
         """
-        return self.__write_data('SENS:CURR:AC:RES {}'.format(resolution))
+        return self._write_data('SENS:CURR:AC:RES {}'.format(resolution))
 
     def set_ac_current_bandwidth(self, bandwidth=20) -> bool:
         """Sets the appropriate filter for the frequency specified by bandwidth parameter.
@@ -405,7 +602,7 @@ class Fluke8846A:
         bandwidth_list = [3, 20, 200, '3', '20', '200', 'MIN', 'MAX']
 
         if bandwidth in bandwidth_list:
-            return self.__write_data('SENS:CURRENT:AC:BAND {}'.format(bandwidth))
+            return self._write_data('SENS:CURRENT:AC:BAND {}'.format(bandwidth))
         else:
             print('Please check bandwidth parameter.')
 
@@ -416,7 +613,7 @@ class Fluke8846A:
         -------
         str - Returns the set resolution for ac current.   
         """
-        return self.__get_data('SENS:CURR:AC:RANG?')
+        return self._get_data('SENS:CURR:AC:RANG?')
 
     def get_ac_current_resolution(self) -> str:
         """Gets the resolution of the AC current measurement.
@@ -425,7 +622,7 @@ class Fluke8846A:
         -------
         str - Returns the set resolution for ac current.               
         """
-        return self.__get_data('SENS:CURR:AC:RES?')
+        return self._get_data('SENS:CURR:AC:RES?')
 
     def get_ac_current_bandwidth(self) -> str:
         """Gets the bandwidth of the AC current measurement.
@@ -434,37 +631,37 @@ class Fluke8846A:
         -------
         str - Returns the set bandwidth for ac current.               
         """
-        return self.__get_data('SENS:CURR:AC:BAND?')
+        return self._get_data('SENS:CURR:AC:BAND?')
 
     '''Selects frequency function'''
     
     def set_frequency(self, range = 'DEF', resolution = 'MIN') -> bool:
         """Selects frequency function"""
-        return self.__write_data('CONF:FREQ {}, {}'.format(range, resolution))
+        return self._write_data('CONF:FREQ {}, {}'.format(range, resolution))
 
     def get_frequency_range(self) -> str:
         """Gets frequency range"""
-        return self.__get_data('SENS:FREQ:RANG?')
+        return self._get_data('SENS:FREQ:RANG?')
 
     '''Selects period function'''
     
     def set_period(self, range = 'DEF', resolution = 'MIN') -> bool:
         """Selects period function"""
-        return self.__write_data('CONF:PER {}, {}'.format(range, resolution))
+        return self._write_data('CONF:PER {}, {}'.format(range, resolution))
 
     def get_period_range(self) -> str:
         """Gets period range"""
-        return self.__get_data('SENS:PER:RANG?')
+        return self._get_data('SENS:PER:RANG?')
 
     '''Selects capacitance function'''
     
     def set_capacitance(self, range = 'DEF', resolution = 'MIN') -> bool:
         """Selects capacitance function"""
-        return self.__write_data('CONF:CAP {}, {}'.format(range, resolution))
+        return self._write_data('CONF:CAP {}, {}'.format(range, resolution))
 
     def get_capacitance_range(self) -> str:
         """Gets capacitance range"""
-        return self.__get_data('SENS:CAP:RANG?')    
+        return self._get_data('SENS:CAP:RANG?')    
 
     '''Selects temperature 2-wire function'''
     
@@ -485,7 +682,7 @@ class Fluke8846A:
         """
         rtd = ['PT100_385', 'PT100_392', 'CUST1']
         if type in rtd:
-            return self.__write_data('CONF:TEMP:RTD {}'.format(type))
+            return self._write_data('CONF:TEMP:RTD {}'.format(type))
         else:
             print('Please check sensor type.')
             return False
@@ -510,7 +707,7 @@ class Fluke8846A:
         """
         rtd = ['PT100_385', 'PT100_392', 'CUST1']
         if type in rtd:
-            return self.__write_data('CONF:TEMP:FRTD {}'.format(type))
+            return self._write_data('CONF:TEMP:FRTD {}'.format(type))
         else:
             print('Please check sensor type.')
             return False
@@ -529,7 +726,7 @@ class Fluke8846A:
         -------
         bool status
         """
-        return self.__write_data('SENS:TEMP:TRAN:FRTD:R0 {}'.format(r0))
+        return self._write_data('SENS:TEMP:TRAN:FRTD:R0 {}'.format(r0))
 
     '''Selects continuity function.'''
 
@@ -542,7 +739,7 @@ class Fluke8846A:
         -------
         bool status
         """
-        return self.__write_data('CONF:CONT')
+        return self._write_data('CONF:CONT')
 
     '''Selects diode function'''
 
@@ -562,7 +759,7 @@ class Fluke8846A:
         -------
         bool status
         """
-        return self.__write_data('CONF:DIOD {}, {}'.format(low_current, high_voltage))
+        return self._write_data('CONF:DIOD {}, {}'.format(low_current, high_voltage))
 
     '''Triggering'''
 
@@ -582,7 +779,7 @@ class Fluke8846A:
         """
         sources = ['BUS', 'IMM', 'EXT', 'IMMEDIATE', 'EXTERNAL']
         if triggering_source.upper() in sources: 
-            return self.__write_data('TRIG:SOUR {}'.format(triggering_source.upper()))
+            return self._write_data('TRIG:SOUR {}'.format(triggering_source.upper()))
         else:
             print('Please check triggering source parameter.')
             return False
@@ -601,7 +798,7 @@ class Fluke8846A:
         -------
         bool status
         """
-        return self.__write_data('TRIG:DEL {}'.format(trigger_delay))
+        return self._write_data('TRIG:DEL {}'.format(trigger_delay))
 
     def set_trigger_count(self, trigger_count = 1)-> bool:
         """Sets the number of triggers the Meter will take before switching to an idle state. 
@@ -619,7 +816,7 @@ class Fluke8846A:
         -------
         bool status 
         """
-        return self.__write_data('TRIG:COUN {}'.format(trigger_count))
+        return self._write_data('TRIG:COUN {}'.format(trigger_count))
     
     def set_samples_per_trigger(self, samples_count = 1)-> bool:
         """Sets the number of measurements the Meter takes per trigger.
@@ -635,7 +832,7 @@ class Fluke8846A:
         -------
         bool status        
         """
-        return self.__write_data('SAMP:COUN {}'.format(samples_count))
+        return self._write_data('SAMP:COUN {}'.format(samples_count))
 
     def init_wait_for_triger(self) -> bool:
         """Sets the Meter to the wait-for-trigger state in which the next trigger from
@@ -647,20 +844,27 @@ class Fluke8846A:
         -------
         bool status
         """
-        return self.__write_data('INIT')
+        return self._write_data('INIT')
 
-    def read_sample_per_trigger(self) -> str:
+    @io_method
+    def read_sample_per_trigger(self, as_array = False, overload = np.nan):
         """Sets the Meter in to the wait-for-trigger state where the next trigger from
         the selected source triggers a measurement cycle. Measurements are sent
         directly to the output buffer.
-        
+
+        Parameters
+        ----------
+        as_array : type - bool - return readings as numpy float64 array
+        overload : type - float - value of overload readings in the array
+
         Returns
         -------
-        str : sample
+        str : sample, or numpy array if as_array.
         """
-        return self.__get_data('READ?')
+        return self._readings((yield self._get_data('READ?')), as_array, overload)
 
-    def fetch_data(self, data_source = 1) -> str:
+    @io_method
+    def fetch_data(self, data_source = 1, as_array = False, overload = np.nan):
         """ Moves measurements stored in the Meter's internal memory to the output
             buffer. FETCh1? or FETCh? returns measurements from the primary
             display. FETCh2? Returns readings from the secondary display.
@@ -670,20 +874,157 @@ class Fluke8846A:
         data_source : type - int
             - 1 : returns measurements from the primary display,
             - 2 : returns readings from the secondary display.
+        as_array : type - bool - return readings as numpy float64 array
+        overload : type - float - value of overload readings (9.9E37) in the array, None keeps 9.9E37
 
         Returns
         -------
-        str : samples defined by trigger and sample count.
+        str : samples defined by trigger and sample count, or numpy array if as_array.
         """
 
         if data_source in [1,2]:
-            return self.__get_data('FETC{}?'.format(data_source))
+            return self._readings((yield self._get_data('FETC{}?'.format(data_source))), as_array, overload)
         else:
             print('Please check data_source parameter.')
 
-    @staticmethod
-    def list_instruments()->str:
-        rm = pyvisa.ResourceManager()
-        return rm.list_resources()
+    def stream(self, chunk_size = 1000, count = 'INF', poll_interval = 0.05, overload = np.nan, timeout = 10):
+        """Generator of readings taken continuously, without the 5000 readings
+        limit of the Meter's memory. Sets trigger count to `count`, one sample
+        per trigger and initiates the measurement. Readings are removed from the
+        memory with R? as soon as at least chunk_size of them are stored, so the
+        memory does not fill up and no reading is skipped between the chunks.
+        The acquisition is aborted when the generator is closed before `count`
+        readings are received. The stream ends early when the memory was full,
+        as readings may have been lost, or when no reading was taken for
+        `timeout` seconds.
+
+        e.g.
+            for readings in dmm.stream(1000):
+                log.write(readings)
 
-    
\ No newline at end of file
+        Parameters
+        ----------
+        chunk_size : type - int - minimal number of readings in one chunk, below MEMORY_SIZE
+        count : type - int or str - number of readings, 'INF' streams until closed
+        poll_interval : type - float - seconds between DATA:POIN? polls until the reading rate is known
+        overload : type - float - value of overload readings (9.9E37) in the chunks
+        timeout : type - float - seconds without a new reading after which the stream
+                  ends, None waits forever (e.g. for external triggers)
+
+        Yields
+        ------
+        numpy float64 array : up to MEMORY_SIZE readings in order of acquisition.
+        """
+        state = self._stream_start(count, chunk_size, timeout)
+        if state is None:
+            return
+        try:
+            while True:
+                readings = self._stream_next(state, chunk_size, poll_interval, overload)
+                if readings is None:
+                    return
+                yield readings
+        finally:
+            self._stream_stop(state)
+
+    @io_method
+    def _stream_start(self, count, chunk_size, timeout) -> dict:
+        """Starts the acquisition of stream, returns its state"""
+        if not 0 < chunk_size < MEMORY_SIZE:
+            print(f'chunk_size should be between 1 and {MEMORY_SIZE - 1} readings.')
+            return None
+        remaining = math.inf if str(count).upper().startswith('INF') else int(count)
+        commands = ['TRIG:COUN {}'.format('INF' if math.isinf(remaining) else remaining), 'SAMP:COUN 1', 'INIT']
+        if not (yield self._write_commands(commands)):
+            return None
+        started = time.perf_counter()
+        return {'remaining': remaining, 'received': 0, 'started': started, 'buffer': bytearray(),
+                'timeout': timeout, 'taken': 0, 'last_reading': started, 'ended': False}
+
+    @io_method
+    def _stream_next(self, state, chunk_size, poll_interval, overload) -> np.ndarray:
+        """Waits for the next chunk of stream, returns None at the end or after a failure"""
+        while state['remaining'] > 0 and not state['ended']:
+            points = yield self._get_data('DATA:POIN?')
+            if points is None:
+                return None
+            points = int(float(points))
+            wanted = min(chunk_size, state['remaining'])
+            if points < wanted and not self._stream_stalled(state, points):
+                yield self._sleep(self._stream_wait(points, wanted, state['received'], state['started'], poll_interval))
+                continue
+            if not points:
+                return None
+            length = yield self._get_block_into('R? {}'.format(min(points, state['remaining'])), state['buffer'])
+            if length is None:
+                return None
+            # Readings taken while the memory was full are lost, count can not be reached
+            state['ended'] = state['ended'] or points >= MEMORY_SIZE
+            readings = self._stream_chunk(state['buffer'], length, points, overload)
+            state['received'] += len(readings)
+            state['remaining'] -= len(readings)
+            return readings
+        return None
+
+    @io_method
+    def _stream_stop(self, state) -> None:
+        """Aborts the acquisition of a stream closed before all readings were received"""
+        if state['remaining'] > 0:
+            yield self._write_data('ABOR')
+
+    def _stream_stalled(self, state, points) -> bool:
+        """True if no reading was taken for the timeout of the stream, which then ends"""
+        now = time.perf_counter()
+        taken = state['received'] + points
+        if taken > state['taken']:
+            state['taken'] = taken
+            state['last_reading'] = now
+            return False
+        if state['timeout'] is None or now - state['last_reading'] < state['timeout']:
+            return False
+        print(f'{self.name} took no reading for {state["timeout"]} s, stream stopped.')
+        state['ended'] = True
+        return True
+
+    def _stream_wait(self, points, wanted, received, started, poll_interval) -> float:
+        """Seconds until the memory is expected to hold the wanted readings"""
+        elapsed = time.perf_counter() - started
+        taken = received + points
+        if taken < STREAM_RATE_READINGS:
+            return poll_interval
+        return min(max((wanted - points)*elapsed/taken, 0.001), 1.0)
+
+    def _stream_chunk(self, buffer, length, points, overload) -> np.ndarray:
+        if points >= MEMORY_SIZE:
+            print(f'{self.name} memory was full, readings may be lost, stream stopped. Use smaller chunk_size.')
+        return parse_readings(buffer[:length].decode(), overload)
+
+    @io_method
+    def fetch_both_displays(self, overload = np.nan) -> np.ndarray:
+        """Moves measurements of the primary and the secondary display (e.g. ac
+        volts and frequency) to the output buffer with one 'FETC1?;:FETC2?' query.
+
+        Parameters
+        ----------
+        overload : type - float - value of overload readings (9.9E37) in the array, None keeps 9.9E37
+
+        Returns
+        -------
+        numpy float64 array : shape (n, 2), primary readings in column 0 and the
+                              secondary readings taken with them in column 1.
+        """
+        return self._both_displays((yield self._get_data('FETC1?;:FETC2?')), overload)
+
+    def _both_displays(self, data, overload) -> np.ndarray:
+        if data is None:
+            return None
+        primary, _, secondary = data.partition(';')
+        primary = parse_readings(primary, overload)
+        secondary = parse_readings(secondary, overload)
+        if len(primary) != len(secondary):
+            print(f'{self.name} returned {len(primary)} primary and {len(secondary)} secondary readings.')
+            return None
+        return np.column_stack((primary, secondary))
+
+    def _readings(self, data, as_array, overload):
+        return parse_readings(data, overload) if as_array else data
@@ -0,0 +1,120 @@
+import functools
+from typing import NamedTuple
+from SCPIInstrument.SCPIInstrument import join_commands
+
+# Functions selected with CONF:<function>
+FUNCTIONS = ('VOLT:DC', 'VOLT:AC', 'CURR:DC', 'CURR:AC', 'RES', 'FRES', 'FREQ', 'PER', 'CAP')
+# Functions with settable integration time, analog filter and ac bandwidth
+NPLC_FUNCTIONS = ('VOLT:DC', 'CURR:DC', 'RES', 'FRES')
+FILTER_FUNCTIONS = ('VOLT:DC', 'CURR:DC')
+BANDWIDTH_FUNCTIONS = ('VOLT:AC', 'CURR:AC')
+NPLC_VALUES = (0.02, 0.2, 1, 10, 100, 'MIN', 'MAX')
+BANDWIDTH_VALUES = (3, 20, 200, 'MIN', 'MAX')
+TRIGGER_SOURCES = ('IMM', 'BUS', 'EXT')
+# Functions in the CONF? reply which are named differently in CONF:<function>
+REPLY_FUNCTIONS = {'VOLT': 'VOLT:DC', 'CURR': 'CURR:DC'}
+
+class MeasurementConfig(NamedTuple):
+    """Complete measurement setup of the Meter, applied with Fluke8846A.apply_config.
+
+    CONF:<function> sets trigger source IMM, trigger and sample count 1 and
+    automatic trigger delay, so only the differing trigger settings are sent.
+    None leaves filters, bandwidth and trigger delay as set by CONF.
+
+    e.g.
+        current = MeasurementConfig('CURR:DC', range=0.1, nplc=1, sample_count=100)
+        dmm.apply_config(current)
+
+    Parameters
+    ----------
+    function : str - one of FUNCTIONS
+    range : str or float - expected reading, 'DEF' or 'AUTO' for autoranging, MIN or MAX
+    resolution : str or float - resolution in units of the function, MIN or MAX, exclusive with nplc
+    nplc : float or str - integration time in power line cycles, one of NPLC_VALUES
+    analog_filter : bool - 3-pole analog filter of dc functions
+    digital_filter : bool - digital averaging filter of dc functions
+    bandwidth : int or str - ac filter, one of BANDWIDTH_VALUES
+    trigger_source : str - IMM, BUS or EXT
+    trigger_delay : float or str - seconds, MIN or MAX
+    trigger_count : int or str - triggers before idle, or INF
+    sample_count : int - measurements per trigger
+    """
+    function: str = 'VOLT:DC'
+    range: object = 'DEF'
+    resolution: object = None
+    nplc: object = None
+    analog_filter: bool = None
+    digital_filter: bool = None
+    bandwidth: object = None
+    trigger_source: str = 'IMM'
+    trigger_delay: object = None
+    trigger_count: object = 1
+    sample_count: int = 1
+
+    def commands(self) -> tuple:
+        """SCPI commands which set the configuration, raises ValueError for invalid one"""
+        return config_commands(self)
+
+def config_from_reply(reply) -> MeasurementConfig:
+    """MeasurementConfig with function and range of the CONF? reply,
+    e.g. '"VOLT +1.00000000E+01,+3.00000000E-06"', or None"""
+    try:
+        function, _, values = reply.strip().strip('"').partition(' ')
+        range = float(values.split(',')[0])
+    except (AttributeError, ValueError):
+        return None
+    function = REPLY_FUNCTIONS.get(function.upper(), function.upper())
+    if function not in FUNCTIONS:
+        return None
+    return MeasurementConfig(function, range=range)
+
+def _on_off(state) -> str:
+    return 'ON' if state else 'OFF'
+
+@functools.lru_cache(maxsize=None)
+def config_commands(config) -> tuple:
+    """Compiles the configuration into the shortest sequence of SCPI commands"""
+    function = config.function.upper()
+    if function not in FUNCTIONS:
+        raise ValueError(f'Unknown function {config.function}')
+    if config.resolution is not None and config.nplc is not None:
+        raise ValueError('Set either resolution or nplc')
+    if config.nplc is not None and (function not in NPLC_FUNCTIONS or config.nplc not in NPLC_VALUES):
+        raise ValueError(f'NPLC {config.nplc} can not be set for {function}')
+    if config.bandwidth is not None and (function not in BANDWIDTH_FUNCTIONS or config.bandwidth not in BANDWIDTH_VALUES):
+        raise ValueError(f'Bandwidth {config.bandwidth} can not be set for {function}')
+    filters = (config.analog_filter, config.digital_filter)
+    if function not in FILTER_FUNCTIONS and filters != (None, None):
+        raise ValueError(f'Filters can not be set for {function}')
+    if config.trigger_source.upper() not in TRIGGER_SOURCES:
+        raise ValueError(f'Unknown trigger source {config.trigger_source}')
+
+    range = 'DEF' if str(config.range).upper() == 'AUTO' else config.range
+    if config.resolution is not None:
+        commands = [f'CONF:{function} {range}, {config.resolution}']
+    elif str(range).upper() != 'DEF':
+        commands = [f'CONF:{function} {range}']
+    else:
+        commands = [f'CONF:{function}']
+    if config.nplc is not None:
+        commands.append(f'SENS:{function}:NPLC {config.nplc}')
+    if config.bandwidth is not None:
+        commands.append(f'SENS:{function}:BAND {config.bandwidth}')
+    if config.analog_filter is not None:
+        commands.append(f'FILT {_on_off(config.analog_filter)}')
+    if config.digital_filter is not None:
+        commands.append(f'FILT:DIG {_on_off(config.digital_filter)}')
+    if config.trigger_source.upper() != 'IMM':
+        commands.append(f'TRIG:SOUR {config.trigger_source.upper()}')
+    if config.trigger_delay is not None:
+        commands.append(f'TRIG:DEL {config.trigger_delay}')
+    if str(config.trigger_count) != '1':
+        commands.append(f'TRIG:COUN {config.trigger_count}')
+    if str(config.sample_count) != '1':
+        commands.append(f'SAMP:COUN {config.sample_count}')
+    return tuple(commands)
+
+@functools.lru_cache(maxsize=None)
+def config_messages(config, max_length) -> tuple:
+    """Commands of the configuration joined into as few messages as fit into max_length"""
+    return tuple(join_commands(config_commands(config), max_length))
@@ -0,0 +1,165 @@
+import math
+import numpy as np
+
+# Averaging factors (in readings) of the Allan deviation, 1, 2, 4, ... 2**15
+ALLAN_FACTORS = tuple(2**k for k in range(16))
+
+class _AllanLevel:
+    """Non-overlapping Allan variance of block means of `factor` readings"""
+
+    __slots__ = ('factor', 'partial_sum', 'partial_count', 'last_mean', 'sum_squares', 'differences')
+
+    def __init__(self, factor) -> None:
+        self.factor = factor
+        self.partial_sum = 0.0
+        self.partial_count = 0
+        self.last_mean = None
+        self.sum_squares = 0.0
+        self.differences = 0
+
+    def update(self, values) -> None:
+        if self.partial_count:
+            fill = min(self.factor - self.partial_count, len(values))
+            self.partial_sum += float(values[:fill].sum())
+            self.partial_count += fill
+            values = values[fill:]
+            if self.partial_count < self.factor:
+                return
+            self.__add_means(np.array([self.partial_sum/self.factor]))
+            self.partial_sum = 0.0
+            self.partial_count = 0
+        blocks = len(values)//self.factor
+        if blocks:
+            self.__add_means(values[:blocks*self.factor].reshape(blocks, self.factor).mean(axis=1))
+        rest = values[blocks*self.factor:]
+        self.partial_sum = float(rest.sum())
+        self.partial_count = len(rest)
+
+    def merge(self, other) -> None:
+        """Pools the differences of the other level, the block spanning both is dropped"""
+        self.sum_squares += other.sum_squares
+        self.differences += other.differences
+        if other.last_mean is not None:
+            self.last_mean = other.last_mean
+            self.partial_sum = other.partial_sum
+            self.partial_count = other.partial_count
+
+    def deviation(self) -> float:
+        if not self.differences:
+            return math.nan
+        return math.sqrt(self.sum_squares/(2*self.differences))
+
+    def __add_means(self, means) -> None:
+        if self.last_mean is not None:
+            means = np.concatenate(([self.last_mean], means))
+        differences = np.diff(means)
+        self.sum_squares += float(np.dot(differences, differences))
+        self.differences += len(differences)
+        self.last_mean = float(means[-1])
+
+class ReadingStatistics:
+    """Running statistics of readings added in chunks, e.g. as they stream in
+
+        stats = ReadingStatistics(histogram_range=(0.59, 0.61))
+        for readings in dmm.stream(1000, count=100_000):
+            stats.update(readings)
+        print(stats.summary())
+
+    Mean and variance are updated with the Welford/Chan algorithm, so the
+    memory does not grow with the number of readings. Drift is the slope of
+    the least squares line over the reading index. Allan deviation is kept
+    for the ALLAN_FACTORS averaging factors. The histogram has `bins` bins over
+    histogram_range, readings outside it are counted in underflow and overflow.
+    Overload readings (NaN, see Fluke8846A.parse_readings) are only counted.
+
+    Statistics of chunks measured one after another, e.g. in other processes,
+    are combined with merge(). Allan deviation of the merged statistics pools
+    both parts without the block spanning the boundary."""
+
+    def __init__(self, histogram_range = None, bins = 100, allan_factors = ALLAN_FACTORS) -> None:
+        self.count = 0
+        self.overloads = 0
+        self.mean = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self.histogram_range = histogram_range
+        self.histogram = None if histogram_range is None else np.zeros(bins, dtype=np.int64)
+        self.underflow = 0
+        self.overflow = 0
+        self.__m2 = 0.0
+        # Sum of (index - mean index)*(reading - mean) for the drift
+        self.__cross = 0.0
+        self.__allan = [_AllanLevel(factor) for factor in allan_factors]
+
+    def update(self, readings) -> None:
+        """Adds next chunk of readings"""
+        readings = np.asarray(readings, dtype=np.float64)
+        valid = readings[~np.isnan(readings)]
+        self.overloads += len(readings) - len(valid)
+        count = len(valid)
+        if not count:
+            return
+        mean = float(valid.mean())
+        deviations = valid - mean
+        index = np.arange(count) - (count - 1)/2
+        self.__combine(count, mean, float(np.dot(deviations, deviations)), float(np.dot(index, deviations)),
+                       float(valid.min()), float(valid.max()))
+        for level in self.__allan:
+            level.update(valid)
+        if self.histogram is not None:
+            low, high = self.histogram_range
+            self.underflow += int(np.count_nonzero(valid < low))
+            self.overflow += int(np.count_nonzero(valid > high))
+            self.histogram += np.histogram(valid, len(self.histogram), self.histogram_range)[0]
+
+    def merge(self, other) -> 'ReadingStatistics':
+        """Adds statistics of readings taken after the readings of this one"""
+        if self.histogram is not None:
+            if other.histogram_range != self.histogram_range or len(other.histogram) != len(self.histogram):
+                raise ValueError('Histograms have different bins')
+            self.histogram += other.histogram
+            self.underflow += other.underflow
+            self.overflow += other.overflow
+        self.overloads += other.overloads
+        if other.count:
+            self.__combine(other.count, other.mean, other.__m2, other.__cross, other.minimum, other.maximum)
+        for level, other_level in zip(self.__allan, other.__allan):
+            level.merge(other_level)
+        return self
+
+    @property
+    def variance(self) -> float:
+        return self.__m2/(self.count - 1) if self.count > 1 else math.nan
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    @property
+    def drift(self) -> float:
+        """Slope of the readings in units per reading"""
+        if self.count < 2:
+            return math.nan
+        return self.__cross/(self.count*(self.count**2 - 1)/12)
+
+    def allan_deviation(self) -> dict:
+        """Returns {averaging factor: Allan deviation} of the factors with at least one difference"""
+        return {level.factor: level.deviation() for level in self.__allan if level.differences}
+
+    def summary(self) -> dict:
+        return {'count': self.count, 'overloads': self.overloads, 'mean': self.mean, 'std': self.std,
+                'min': self.minimum, 'max': self.maximum, 'drift': self.drift,
+                'allan_deviation': self.allan_deviation()}
+
+    def __combine(self, count, mean, m2, cross, minimum, maximum) -> None:
+        """Chan's parallel update with a block of `count` readings which follows the current ones"""
+        total = self.count + count
+        delta = mean - self.mean
+        # Index offset between the centres of both blocks
+        shift = total/2
+        self.__cross += cross + delta*shift*self.count*count/total
+        self.__m2 += m2 + delta**2*self.count*count/total
+        self.mean += delta*count/total
+        self.count = total
+        self.minimum = min(self.minimum, minimum)
+        self.maximum = max(self.maximum, maximum)
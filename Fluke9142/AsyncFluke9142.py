@@ -0,0 +1,6 @@
+from SCPIInstrument.AsyncSCPIInstrument import AsyncSCPIBatching, AsyncSCPIInstrument
+from Fluke9142.Fluke9142 import Fluke9142
+
+class AsyncFluke9142(AsyncSCPIBatching, AsyncSCPIInstrument, Fluke9142):
+    """asyncio variant of Fluke9142, every method is a coroutine,
+    e.g. await bath.get_reference_temperature()."""
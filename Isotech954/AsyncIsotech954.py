@@ -0,0 +1,6 @@
+from SCPIInstrument.AsyncSCPIInstrument import AsyncSCPIInstrument
+from Isotech954.Isotech954 import Isotech954
+
+class AsyncIsotech954(AsyncSCPIInstrument, Isotech954):
+    """asyncio variant of Isotech954, every method is a coroutine,
+    e.g. await switch.switch_to_channel(1)."""
@@ -0,0 +1,9 @@
+from SCPIInstrument.AsyncSCPIInstrument import AsyncSCPIBatching, AsyncSCPIInstrument
+from RigolDS1054Z.RigolDS1054Z import RigolDS1054Z
+
+class AsyncRigolDS1054Z(AsyncSCPIBatching, AsyncSCPIInstrument, RigolDS1054Z):
+    """asyncio variant of RigolDS1054Z, every method is a coroutine,
+    e.g. await scope.get_waveform_data_into(buffer).
+    Use the raw socket resource of the oscilloscope, e.g. 'TCPIP::192.168.123.2::5555::SOCKET'."""
+
+    invalidate_preamble = RigolDS1054Z.invalidate_preamble
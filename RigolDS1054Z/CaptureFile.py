@@ -0,0 +1,228 @@
+import json
+import os
+import struct
+import numpy as np
+from RigolDS1054Z.Decimation import EnvelopePyramid, lttb
+
+CAPTURE_MAGIC = b'RIGOLCAP'
+CAPTURE_VERSION = 1
+# Bytes reserved at the beginning of the file for magic, version and JSON header.
+# Channel data blocks start at multiples of this size.
+HEADER_SIZE = 4096
+# Number of rows formatted at once when a capture is exported to CSV
+CSV_BLOCK_ROWS = 100_000
+
+def envelope_filename(filename) -> str:
+    """Name of the file with envelope pyramids stored next to the capture"""
+    return f'{filename}.envelope.npz'
+
+def write_csv(filename, time, voltage, fmt = '%.9g') -> None:
+    """Writes time and one column per channel into a CSV file.
+    Rows are formatted in blocks, so the voltage arrays can be memory mapped.
+
+    Parameters
+    ----------
+    time : type - numpy array or list
+    voltage : type - list of arrays or numpy array with shape (channels, points)
+    """
+    time = np.asarray(time)
+    with open(filename, 'w') as f:
+        for start in range(0, len(time), CSV_BLOCK_ROWS):
+            stop = start + CSV_BLOCK_ROWS
+            block = np.column_stack([time[start:stop]] + [np.asarray(v[start:stop]) for v in voltage])
+            np.savetxt(f, block, fmt=fmt, delimiter=',')
+
+class CaptureWriter:
+    """Writes raw waveform samples of several channels into a binary capture file.
+
+    File layout:
+        - 8 bytes magic 'RIGOLCAP', uint32 version, uint32 header length,
+        - JSON header with the name, dtype, points, data offset and waveform preamble
+          of every channel and optional metadata, padded to HEADER_SIZE bytes,
+        - raw samples of every channel, each block aligned to HEADER_SIZE bytes.
+
+    Samples are written through a memory map returned by begin_channel, so
+    data can be read from the oscilloscope directly into the file."""
+
+    def __init__(self, filename, metadata = None) -> None:
+        self.filename = filename
+        self.metadata = {} if metadata is None else metadata
+        self.channels = []
+        self.__maps = []
+        self.__end = HEADER_SIZE
+        with open(filename, 'wb') as f:
+            f.truncate(HEADER_SIZE)
+        self.__write_header()
+
+    def begin_channel(self, name, preamble, points, dtype = np.uint8) -> np.memmap:
+        """Reserves space for a channel and returns writable memory map of its samples.
+
+        Parameters
+        ----------
+        name : type - str - channel name e.g. 'CHAN1'
+        preamble : type - WaveformPreamble
+        points : type - int
+        dtype : type - numpy dtype - np.uint8 for BYTE, '<u2' for WORD, np.float64 for ASC
+
+        Returns
+        -------
+        numpy memmap - (points,) array backed by the file.
+        """
+        dtype = np.dtype(dtype)
+        offset = self.__end
+        size = points*dtype.itemsize
+        self.__end = offset + -(-size//HEADER_SIZE)*HEADER_SIZE
+        with open(self.filename, 'r+b') as f:
+            f.truncate(offset + size)
+        self.channels.append({'name': name, 'dtype': dtype.str, 'points': points,
+                              'offset': offset, 'preamble': preamble._asdict()})
+        self.__write_header()
+        data = np.memmap(self.filename, dtype=dtype, mode='r+', offset=offset, shape=(points,))
+        self.__maps.append(data)
+        return data
+
+    def add_channel(self, name, preamble, data) -> None:
+        """Writes an array of raw samples as a new channel."""
+        data = np.asarray(data)
+        self.begin_channel(name, preamble, len(data), data.dtype)[:] = data
+
+    def close(self) -> None:
+        """Flushes written samples to the file."""
+        for data in self.__maps:
+            data.flush()
+        self.__maps = []
+
+    def __write_header(self) -> None:
+        header = json.dumps({'channels': self.channels, 'metadata': self.metadata}).encode()
+        if len(header) > HEADER_SIZE - 16:
+            raise ValueError('Too many channels for the capture header')
+        with open(self.filename, 'r+b') as f:
+            f.write(CAPTURE_MAGIC + struct.pack('<II', CAPTURE_VERSION, len(header)) + header)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+class CaptureFile:
+    """Reads a capture written by CaptureWriter. Samples are memory mapped,
+    only the accessed part of the file is loaded. Levels of the envelope file
+    are also read when they are used, close() releases the envelope file."""
+
+    def __init__(self, filename) -> None:
+        self.filename = filename
+        with open(filename, 'rb') as f:
+            magic = f.read(8)
+            version, length = struct.unpack('<II', f.read(8))
+            if magic != CAPTURE_MAGIC or version != CAPTURE_VERSION:
+                raise ValueError(f'{filename} is not a Rigol capture file')
+            header = json.loads(f.read(length))
+        self.__channels = {channel['name']: channel for channel in header['channels']}
+        self.metadata = header.get('metadata', {})
+        self.__envelopes = None
+        self.__pyramids = {}
+
+    @property
+    def channels(self) -> list:
+        """Names of the stored channels"""
+        return list(self.__channels)
+
+    def preamble(self, channel) -> dict:
+        """Waveform preamble of the channel"""
+        return self.__channels[channel]['preamble']
+
+    def raw(self, channel) -> np.memmap:
+        """Read only memory map of raw channel samples"""
+        info = self.__channels[channel]
+        return np.memmap(self.filename, dtype=np.dtype(info['dtype']), mode='r',
+                         offset=info['offset'], shape=(info['points'],))
+
+    def voltage(self, channel, start = 0, stop = None, dtype = np.float64) -> np.ndarray:
+        """Scaled voltage of samples start to stop of the channel"""
+        raw = self.raw(channel)[start:stop]
+        if raw.dtype.kind == 'f':
+            return raw.astype(dtype)
+        p = self.preamble(channel)
+        voltage = np.subtract(raw, float(p['y_origin'] + p['y_reference']), dtype=dtype)
+        voltage *= p['y_increment']
+        return voltage
+
+    def time(self, start = 0, stop = None, channel = None) -> np.ndarray:
+        """Time of samples start to stop, x_origin + n*x_increment"""
+        channel = self.channels[0] if channel is None else channel
+        p = self.preamble(channel)
+        stop = self.__channels[channel]['points'] if stop is None else min(stop, self.__channels[channel]['points'])
+        return p['x_origin'] + np.arange(start, stop)*p['x_increment']
+
+    def envelope(self, channel, start = 0, stop = None, width = 1000):
+        """Min/max envelope of samples start to stop with at least `width` bins,
+        taken from the stored pyramid. Raw samples are used if the range is too
+        short for the pyramid. Without an envelope file the raw samples are reduced
+        to 2*width points with lttb, min and max are then the same samples.
+
+        Returns
+        -------
+        numpy array time, numpy array min voltage, numpy array max voltage.
+        """
+        info = self.__channels[channel]
+        stop = info['points'] if stop is None else min(stop, info['points'])
+        pyramid = self.pyramid(channel)
+        reduced = None if pyramid is None else pyramid.envelope(start, stop, width)
+        if reduced is None:
+            voltage = self.voltage(channel, start, stop)
+            time = self.time(start, stop, channel)
+            if pyramid is None and len(voltage) > 2*width:
+                selected = lttb(voltage, 2*width, time)
+                time, voltage = time[selected], voltage[selected]
+            return time, voltage, voltage
+        index, mins, maxs = reduced
+        p = self.preamble(channel)
+        if mins.dtype.kind != 'f':
+            offset = float(p['y_origin'] + p['y_reference'])
+            mins = (mins - offset)*p['y_increment']
+            maxs = (maxs - offset)*p['y_increment']
+        return p['x_origin'] + index*p['x_increment'], mins, maxs
+
+    def pyramid(self, channel) -> EnvelopePyramid:
+        """Envelope pyramid of the channel, or None if it was not stored"""
+        if self.__envelopes is None:
+            name = envelope_filename(self.filename)
+            self.__envelopes = np.load(name) if os.path.exists(name) else {}
+        if f'{channel}_factor' not in self.__envelopes:
+            return None
+        if channel not in self.__pyramids:
+            self.__pyramids[channel] = EnvelopePyramid.from_arrays(self.__envelopes, f'{channel}_')
+        return self.__pyramids[channel]
+
+    def close(self) -> None:
+        """Closes the envelope file, pyramids returned before can not load further levels"""
+        if isinstance(self.__envelopes, np.lib.npyio.NpzFile):
+            self.__envelopes.close()
+        self.__envelopes = None
+        self.__pyramids = {}
+
+    def to_csv(self, filename, channels = None) -> None:
+        """Exports scaled channels into a CSV file"""
+        channels = self.channels if channels is None else channels
+        write_csv(filename, self.time(channel=channels[0]), [_VoltageView(self, ch) for ch in channels])
+
+    def __repr__(self) -> str:
+        size = os.path.getsize(self.filename)
+        return f'CaptureFile({self.filename!r}, channels={self.channels}, {size} bytes)'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+class _VoltageView:
+    """Scales slices of a stored channel on access, used for block wise CSV export"""
+
+    def __init__(self, capture, channel) -> None:
+        self.__capture = capture
+        self.__channel = channel
+
+    def __getitem__(self, index):
+        return self.__capture.voltage(self.__channel, index.start, index.stop)
@@ -0,0 +1,158 @@
+import numpy as np
+
+def lttb(y, n_out, x = None) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets downsampling.
+
+    Parameters
+    ----------
+    y : type - numpy array
+    n_out : type - int - number of returned points, at least 3
+    x : type - numpy array - optional sample positions, indices are used if omitted
+
+    Returns
+    -------
+    numpy array - indices of the selected samples.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.arange(n, dtype=np.float64) if x is None else np.asarray(x, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[stop:next_stop].mean() if next_stop > stop else x[-1]
+        next_y = y[stop:next_stop].mean() if next_stop > stop else y[-1]
+        area = np.abs((x[a] - next_x)*(y[start:stop] - y[a]) - (x[a] - x[start:stop])*(next_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+class EnvelopePyramid:
+    """Min/max envelope of a waveform at several zoom levels.
+
+    Level k holds minimum and maximum of consecutive bins of factor**(k+1)
+    samples. Samples can be added in chunks of any size as they are read from
+    the oscilloscope, call finish after the last chunk."""
+
+    def __init__(self, factor = 16, levels = 6) -> None:
+        self.factor = factor
+        self.levels = levels
+        self.points = 0
+        self.__mins = [[] for _ in range(levels)]
+        self.__maxs = [[] for _ in range(levels)]
+        self.__pending = [None]*levels
+        self.__source = None
+        self.__prefix = ''
+
+    def update(self, data) -> None:
+        """Adds next chunk of samples"""
+        data = np.asarray(data)
+        self.points += len(data)
+        self.__push(0, data, data)
+
+    def finish(self) -> None:
+        """Closes the last incomplete bin of every level"""
+        for k in range(self.levels):
+            pending = self.__pending[k]
+            self.__pending[k] = None
+            if pending is not None and len(pending[0]):
+                bin_min = pending[0].min(keepdims=True)
+                bin_max = pending[1].max(keepdims=True)
+                self.__append(k, bin_min, bin_max)
+                self.__push(k + 1, bin_min, bin_max)
+
+    def bin_size(self, level) -> int:
+        """Number of samples in one bin of the level"""
+        return self.factor**(level + 1)
+
+    def level(self, level):
+        """Returns min and max arrays of the level"""
+        mins, maxs = self.__mins[level], self.__maxs[level]
+        if not mins and self.__source is not None:
+            mins.append(self.__source[f'{self.__prefix}min_{level}'])
+            maxs.append(self.__source[f'{self.__prefix}max_{level}'])
+        if len(mins) != 1:
+            empty = np.empty(0)
+            mins[:] = [np.concatenate(mins) if mins else empty]
+            maxs[:] = [np.concatenate(maxs) if maxs else empty]
+        return mins[0], maxs[0]
+
+    def choose_level(self, points, width) -> int:
+        """Returns the coarsest level that still has at least `width` bins in
+        `points` samples, or None if raw samples should be used."""
+        for k in reversed(range(self.levels)):
+            if points//self.bin_size(k) >= width:
+                return k
+        return None
+
+    def envelope(self, start = 0, stop = None, width = 1000):
+        """Min/max envelope of samples start to stop with at least `width` bins.
+
+        Returns
+        -------
+        numpy array index - index of the first sample in every bin,
+        numpy array min, numpy array max.
+        None if the range is too short for any level.
+        """
+        stop = self.points if stop is None else min(stop, self.points)
+        k = self.choose_level(stop - start, width)
+        if k is None:
+            return None
+        size = self.bin_size(k)
+        first, last = start//size, -(-stop//size)
+        mins, maxs = self.level(k)
+        return np.arange(first, last)*size, mins[first:last], maxs[first:last]
+
+    def save(self, file, prefix = '') -> None:
+        """Stores the pyramid as arrays of a .npz file, see save_pyramids"""
+        save_pyramids(file, {prefix: self})
+
+    def arrays(self, prefix = '') -> dict:
+        """Returns levels as named arrays"""
+        arrays = {f'{prefix}factor': np.array(self.factor), f'{prefix}points': np.array(self.points)}
+        for k in range(self.levels):
+            arrays[f'{prefix}min_{k}'], arrays[f'{prefix}max_{k}'] = self.level(k)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix = ''):
+        """Builds pyramid from arrays written by save. Levels are read lazily
+        when arrays is an opened .npz file."""
+        levels = sum(1 for key in arrays.keys() if key.startswith(f'{prefix}min_'))
+        pyramid = cls(int(arrays[f'{prefix}factor']), levels)
+        pyramid.points = int(arrays[f'{prefix}points'])
+        pyramid.__source = arrays
+        pyramid.__prefix = prefix
+        return pyramid
+
+    def __push(self, k, mins, maxs) -> None:
+        if k >= self.levels:
+            return
+        pending = self.__pending[k]
+        if pending is not None:
+            mins = np.concatenate((pending[0], mins))
+            maxs = np.concatenate((pending[1], maxs))
+        full = len(mins)//self.factor*self.factor
+        self.__pending[k] = (mins[full:].copy(), maxs[full:].copy())
+        if full:
+            bin_min = mins[:full].reshape(-1, self.factor).min(axis=1)
+            bin_max = maxs[:full].reshape(-1, self.factor).max(axis=1)
+            self.__append(k, bin_min, bin_max)
+            self.__push(k + 1, bin_min, bin_max)
+
+    def __append(self, k, mins, maxs) -> None:
+        self.__mins[k].append(mins)
+        self.__maxs[k].append(maxs)
+
+def save_pyramids(file, pyramids) -> None:
+    """Stores several pyramids, e.g. {'CHAN1': pyramid}, into one .npz file"""
+    arrays = {}
+    for name, pyramid in pyramids.items():
+        arrays.update(pyramid.arrays(f'{name}_' if name else ''))
+    np.savez(file, **arrays)
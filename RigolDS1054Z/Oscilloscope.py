@@ -1,5 +1,30 @@
 from RigolDS1054Z.RigolDS1054Z import RigolDS1054Z
-from time import sleep
+from RigolDS1054Z.CaptureFile import CaptureWriter, write_csv, envelope_filename
+from RigolDS1054Z.Decimation import EnvelopePyramid, save_pyramids
+from RigolDS1054Z.SegmentBuffer import Segment, SegmentBuffer, CaptureStatistics
+from datetime import datetime
+from time import sleep, monotonic
+from queue import Queue
+from threading import Thread
+import numpy as np
+
+# Largest number of points that can be read with one :WAV:DATA? in RAW mode
+MAX_CHUNK_POINTS = {'BYTE': 250_000, 'WORD': 125_000, 'ASC': 15_625}
+# Data types of the decoded waveform points for every return format
+FORMAT_DTYPES = {'BYTE': np.dtype(np.uint8), 'WORD': np.dtype('<u2'), 'ASC': np.dtype(np.float64)}
+# Upper bound of characters per point in ASC format, e.g. '-1.234567e-01,'
+ASC_POINT_SIZE = 16
+FORMAT_NAMES = {'BYTE': 'BYTE', 'WORD': 'WORD', 'ASC': 'ASC', 'ASCii': 'ASC', 'AUTO': 'AUTO'}
+
+def parse_ascii_values(data) -> np.ndarray:
+    """Parses comma separated numbers into a float64 array,
+    raises ValueError if any of them is not a number"""
+    text = bytes(data).decode('ascii').strip().strip(',')
+    if not text:
+        return np.empty(0, dtype=np.float64)
+    return np.array(text.split(','), dtype=np.float64)
+
+CHANNEL_FIELDS = ('x_increment', 'x_origin', 'x_reference', 'y_increment', 'y_origin', 'y_reference')
 
 class Channel:
     def __init__(self) -> None:
@@ -11,56 +36,38 @@ class Channel:
         self.y_reference = None
 
 class Oscilloscope:
-    def __init__(self) -> None:
+    def __init__(self, dev_info = 'TCPIP::192.168.123.2::INSTR', read_termination = '\n', timeout = 100_000, transport = 'VISA') -> None:
         self.format = None
         self.type = None
         self.points = None 
         self.count_avg = None
+        self.preamble = None
         self.channel1 = Channel()
         self.channel2 = Channel()
         self.channel3 = Channel()
         self.channel4 = Channel()
         self.active_channel = None
-        self.rigol = RigolDS1054Z('TCPIP::192.168.123.2::INSTR', read_termination='\n', timeout=100_000)
+        self.rigol = RigolDS1054Z(dev_info, read_termination=read_termination, timeout=timeout, transport=transport)
 
     def get_info(self,channel):
-        data = self.rigol.get_waveform_parameters().split(',')
-        self.format = self.get_format(data[0])
-        self.type = self.get_type(data[1])
-        self.points = float(data[2])
-        self.count_avg = float(data[3])
-        if channel == 'CHAN1':
-            self.channel1.x_increment = float(data[4])
-            self.channel1.x_origin = float(data[5])
-            self.channel1.x_reference = float(data[6])
-            self.channel1.y_increment = float(data[7])
-            self.channel1.y_origin = float(data[8])
-            self.channel1.y_reference = float(data[9])
-            self.active_channel = self.channel1
-        elif channel == 'CHAN2':
-            self.channel2.x_increment = float(data[4])
-            self.channel2.x_origin = float(data[5])
-            self.channel2.x_reference = float(data[6])
-            self.channel2.y_increment = float(data[7])
-            self.channel2.y_origin = float(data[8])
-            self.channel2.y_reference = float(data[9])
-            self.active_channel = self.channel2
-        elif channel == 'CHAN3':
-            self.channel3.x_increment = float(data[4])
-            self.channel3.x_origin = float(data[5])
-            self.channel3.x_reference = float(data[6])
-            self.channel3.y_increment = float(data[7])
-            self.channel3.y_origin = float(data[8])
-            self.channel3.y_reference = float(data[9])
-            self.active_channel = self.channel3
-        elif channel == 'CHAN4':
-            self.channel4.x_increment = float(data[4])
-            self.channel4.x_origin = float(data[5])
-            self.channel4.x_reference = float(data[6])
-            self.channel4.y_increment = float(data[7])
-            self.channel4.y_origin = float(data[8])
-            self.channel4.y_reference = float(data[9])
-            self.active_channel = self.channel4
+        self.preamble = preamble = self.rigol.get_waveform_preamble()
+        if preamble is None:
+            return
+        self.format = self.get_format(preamble.format)
+        self.type = self.get_type(preamble.type)
+        self.points = preamble.points
+        self.count_avg = preamble.count
+        active_channel = self.get_channel(channel)
+        if active_channel is not None:
+            for field in CHANNEL_FIELDS:
+                setattr(active_channel, field, getattr(preamble, field))
+            self.active_channel = active_channel
+
+    def get_channel(self, channel) -> Channel:
+        """Returns scaling parameters of the channel ('CHAN1' to 'CHAN4')."""
+        channels = {'CHAN1': self.channel1, 'CHAN2': self.channel2,
+                    'CHAN3': self.channel3, 'CHAN4': self.channel4}
+        return channels.get(channel)
 
     def get_format(self,data) -> str:
         if data == 0:
@@ -82,13 +89,36 @@ class Oscilloscope:
         else:
             return None
         
-    def get_screen_data(self,channel):
+    def get_screen_data(self,channel, format = 'BYTE'):
+        """Reads waveform data displayed on the screen.
+
+        Parameters
+        ----------
+        channel : type - str
+            - CHAN1, CHAN2, CHAN3, CHAN4 or MATH
+        format : type - str
+            - BYTE, WORD, ASC or AUTO, see choose_format
+
+        Returns
+        -------
+        numpy array - raw samples (voltage for ASC format), or None.
+        """
         #self.rigol.stop()
-        self.rigol.set_waveform_channel(channel)
-        self.rigol.set_reading_mode('NORM')
-        self.rigol.set_return_format_waveform('BYTE')
-        self.get_info(channel)
-        return self.rigol.get_waveform_data()
+        points, format = self.prepare_reading(channel, 'NORM', format)
+        out = np.empty(points, dtype=FORMAT_DTYPES[format])
+        return self.read_waveform_window(out, points, format)
+
+    def choose_format(self, channel, mode) -> str:
+        """Chooses return format with the fewest transferred bytes per useful bit.
+        Samples are 8 bit, so BYTE carries them without overhead and WORD never pays
+        off. In average and high resolution acquisition the voltage of screen data is
+        computed with more than 8 bits, which only ASC preserves."""
+        if channel.startswith('D') or mode not in ('NORM', 'NORMal'):
+            return 'BYTE'
+        acquisition = self.rigol.get_acquisition_mode()
+        if acquisition is not None and acquisition.strip() in ('AVER', 'HRES'):
+            return 'ASC'
+        return 'BYTE'
     
     
     def convert_data_to_v_t(self, data):
@@ -102,48 +132,307 @@ class Oscilloscope:
             time.append(t)
             t+=t_inc
         return voltage,time
+
+    def convert_data_to_arrays(self, data, channels = None, dtype = np.float64, out = None):
+        """Converts raw waveform bytes into voltage and time arrays.
+
+        Parameters
+        ----------
+        data : type - bytes, bytearray, list or numpy array, or a list of them
+            Raw samples of one channel, or one buffer per channel. All buffers
+            must have the same number of points.
+        channels : type - str or list of str
+            Channel names ('CHAN1' to 'CHAN4') whose scaling is applied to the
+            buffers. If omitted, scaling of the active channel is used.
+        dtype : type - numpy dtype
+            - np.float64 or np.float32
+        out : type - numpy array
+            Optional array of the voltage shape in which the result is written.
+
+        Returns
+        -------
+        numpy array voltage - shape (points,) for one buffer, (channels, points) otherwise,
+        numpy array time - x_origin + n*x_increment, shared by all channels.
+        """
+        single = channels is None or isinstance(channels, str)
+        if single:
+            data = [data]
+            channels = [channels]
+        scaling = [self.active_channel if ch is None else self.get_channel(ch) for ch in channels]
+
+        points = len(data[0])
+        if out is None:
+            voltage = np.empty((len(data), points), dtype=dtype)
+        else:
+            voltage = out.reshape(len(data), points)
+        for i, (raw, ch) in enumerate(zip(data, scaling)):
+            if isinstance(raw, (bytes, bytearray, memoryview)):
+                raw = np.frombuffer(raw, dtype=np.uint8)
+            if isinstance(raw, np.ndarray) and raw.dtype.kind == 'f':
+                # ASC format already returns voltage
+                voltage[i] = raw
+                continue
+            np.subtract(raw, float(ch.y_origin + ch.y_reference), out=voltage[i], casting='unsafe')
+            voltage[i] *= ch.y_increment
+
+        ch = scaling[0]
+        time = (ch.x_origin + np.arange(points)*ch.x_increment).astype(dtype, copy=False)
+        if single:
+            return voltage[0], time
+        return voltage, time
     
-    def get_memory_data(self, channel):
-        #print(self.rigol.get_reading_mode())
-        print(f'Preuzimam podatke sa {channel}')
+    def get_memory_data(self, channel, out = None, format = 'BYTE'):
+        """Reads the whole internal memory of the channel in RAW mode.
+        The oscilloscope has to be in the stop state. Memory is read in the largest
+        window allowed for the return format and written into one preallocated buffer.
+
+        Parameters
+        ----------
+        channel : type - str
+            - CHAN1, CHAN2, CHAN3 or CHAN4
+        out : type - numpy array
+            Optional buffer with at least as many points as the memory depth,
+            of the type given in FORMAT_DTYPES.
+        format : type - str
+            - BYTE, WORD, ASC or AUTO, see choose_format
+
+        Returns
+        -------
+        numpy array - raw samples (voltage for ASC format), or None if the reading failed.
+        """
+        points, format = self.prepare_reading(channel, 'RAW', format)
+        if out is None:
+            out = np.empty(points, dtype=FORMAT_DTYPES[format])
+        return self.read_waveform_window(out, points, format)
+
+    def prepare_reading(self, channel, mode = 'RAW', format = 'BYTE'):
+        """Selects the channel, reading mode and return format.
+
+        Returns
+        -------
+        int points - number of points available for reading,
+        str format - BYTE, WORD or ASC.
+        """
+        if format not in FORMAT_NAMES:
+            raise ValueError(f'Unsupported waveform format {format}')
+        format = FORMAT_NAMES[format]
+        if format == 'AUTO':
+            format = self.choose_format(channel, mode)
         self.rigol.set_waveform_channel(channel)
-        self.rigol.set_reading_mode('RAW')
-        self.rigol.set_return_format_waveform('BYTE')
-        self.rigol.set_start_point_waveform_data(1)
-        print('Prvi deo')
-        self.rigol.set_stop_point_waveform_data(125000)
-        voltage = (self.rigol.get_waveform_data())
-        print('Drugi deo')
-        self.rigol.set_start_point_waveform_data(125001)
-        self.rigol.set_stop_point_waveform_data(250000)
-        voltage.extend(self.rigol.get_waveform_data())
-        print('Treci deo')
-        #self.rigol.set_start_point_waveform_data(250001)
-        # self.rigol.set_stop_point_waveform_data(375000)
-        # voltage.extend(self.rigol.get_waveform_data())
-        # self.rigol.set_start_point_waveform_data(375001)
-        # self.rigol.set_stop_point_waveform_data(500000)
-        # voltage.extend(self.rigol.get_waveform_data())
-        # self.rigol.set_start_point_waveform_data(500001)
-        # self.rigol.set_stop_point_waveform_data(625000)
-        # voltage.extend(self.rigol.get_waveform_data())
-        # self.rigol.set_start_point_waveform_data(625001)
-        # self.rigol.set_stop_point_waveform_data(750000)
-        # voltage.extend(self.rigol.get_waveform_data())
-        # self.rigol.set_start_point_waveform_data(750001)
-        # self.rigol.set_stop_point_waveform_data(875000)
-        # voltage.extend(self.rigol.get_waveform_data())        
-        # self.rigol.set_start_point_waveform_data(875001)
-        # self.rigol.set_stop_point_waveform_data(1000000)
-        # voltage.extend(self.rigol.get_waveform_data())
+        self.rigol.set_reading_mode(mode)
+        self.rigol.set_return_format_waveform(format)
         self.get_info(channel)
-        return voltage
+        return self.get_memory_points(), format
+
+    def save_capture(self, filename, channels, format = 'BYTE', envelope = True) -> bool:
+        """Reads internal memory of the channels straight into a binary capture file.
+        Raw samples and waveform preamble of every channel are stored, the file can
+        be read with RigolDS1054Z.CaptureFile.CaptureFile. Min/max envelope pyramid
+        of every channel is built while the chunks arrive and stored next to the
+        capture, see RigolDS1054Z.Decimation.
+        The oscilloscope has to be in the stop state.
+
+        Parameters
+        ----------
+        filename : type - str
+        channels : type - list of str
+            - e.g. ['CHAN1', 'CHAN2', 'CHAN3']
+        format : type - str
+            - BYTE, WORD, ASC or AUTO
+        envelope : type - bool - build and store envelope pyramid
+
+        Returns
+        -------
+        bool status
+        """
+        pyramids = {}
+        with CaptureWriter(filename) as writer:
+            for channel in channels:
+                points, channel_format = self.prepare_reading(channel, 'RAW', format)
+                preamble = self.preamble
+                if preamble is None:
+                    return False
+                data = writer.begin_channel(channel, preamble, points, FORMAT_DTYPES[channel_format])
+                on_chunk = None
+                if envelope:
+                    pyramids[channel] = EnvelopePyramid()
+                    on_chunk = pyramids[channel].update
+                if self.read_waveform_window(data, points, channel_format, on_chunk) is None:
+                    return False
+        for pyramid in pyramids.values():
+            pyramid.finish()
+        if pyramids:
+            save_pyramids(envelope_filename(filename), pyramids)
+        return True
+
+    def acquire_channels(self, channels, dtype = np.float64, format = 'BYTE'):
+        """Reads the internal memory of several channels and converts it to voltage.
+        Transfer of the next channel runs in a separate thread while the previous
+        channel is scaled, so the link is not idle during conversion.
+        The oscilloscope has to be in the stop state.
+
+        Parameters
+        ----------
+        channels : type - list of str
+            - e.g. ['CHAN1', 'CHAN2', 'CHAN3']
+        dtype : type - numpy dtype
+            - np.float64 or np.float32
+        format : type - str
+            - BYTE, WORD, ASC or AUTO
+
+        Returns
+        -------
+        numpy array voltage - shape (channels, points),
+        numpy array time - time axis shared by all channels.
+        Both are None if reading of any channel failed.
+        """
+        transfers = Queue(maxsize=1)
+
+        def read_channels():
+            try:
+                for channel in channels:
+                    data = self.get_memory_data(channel, format=format)
+                    transfers.put((channel, data))
+                    if data is None:
+                        return
+            finally:
+                transfers.put((None, None))
+
+        reader = Thread(target=read_channels, daemon=True)
+        reader.start()
+        voltage = None
+        time = None
+        for i in range(len(channels)):
+            channel, data = transfers.get()
+            if data is None:
+                reader.join()
+                print(f'Can not acquire {channels[i]}')
+                return None, None
+            if voltage is None:
+                voltage = np.empty((len(channels), len(data)), dtype=dtype)
+            _, channel_time = self.convert_data_to_arrays(data[:voltage.shape[1]], channel, dtype, voltage[i])
+            if time is None:
+                time = channel_time
+        reader.join()
+        return voltage, time
+
+    def capture_segments(self, n, channels, capacity = 16, directory = None, timeout = 10, format = 'BYTE'):
+        """Repeatedly arms single trigger, waits for the acquisition and reads
+        internal memory of the channels into a bounded segment buffer.
+
+        Parameters
+        ----------
+        n : type - int - number of segments
+        channels : type - list of str
+            - e.g. ['CHAN1', 'CHAN2']
+        capacity : type - int - number of segments kept in memory
+        directory : type - str
+            Directory where the oldest segments are written when the buffer is full.
+            Without it the oldest segments are dropped.
+        timeout : type - float - maximum time to wait for each trigger in seconds
+        format : type - str
+            - BYTE, WORD, ASC or AUTO
+
+        Returns
+        -------
+        SegmentBuffer - captured segments,
+        CaptureStatistics - achieved segments per second and dead time, i.e. time
+                            between the end of an acquisition and arming the next one.
+        """
+        segments = SegmentBuffer(capacity, directory)
+        dead_time = 0
+        finished = None
+        started = monotonic()
+        count = 0
+        for index in range(n):
+            if finished is not None:
+                dead_time += monotonic() - finished
+            if not self.rigol.single_and_wait(timeout):
+                break
+            finished = monotonic()
+            segment = self.read_segment(index, channels, format)
+            if segment is None:
+                break
+            segments.push(segment)
+            count += 1
+        elapsed = monotonic() - started
+        statistics = CaptureStatistics(count, elapsed, count/elapsed if elapsed else 0.0,
+                                       dead_time, dead_time/(count - 1) if count > 1 else 0.0)
+        return segments, statistics
+
+    def read_segment(self, index, channels, format = 'BYTE') -> Segment:
+        """Reads internal memory and preamble of the channels after a finished
+        acquisition. Returns None if reading of any channel failed."""
+        timestamp = datetime.now()
+        data = {}
+        preambles = {}
+        for channel in channels:
+            data[channel] = self.get_memory_data(channel, format=format)
+            preambles[channel] = self.preamble
+            if data[channel] is None or preambles[channel] is None:
+                return None
+        return Segment(index, timestamp, preambles, data)
+
+    def get_memory_points(self) -> int:
+        """Returns number of points in the internal memory. Points reported by
+        the waveform preamble are used, and the memory depth is queried if they
+        are not available."""
+        if self.points:
+            return int(self.points)
+        mdep = self.rigol.get_memory_depth()
+        try:
+            return int(float(mdep))
+        except (TypeError, ValueError):
+            print('Can not determine memory depth of Rigol DS1054Z')
+            return 0
+
+    def read_waveform_window(self, out, points, format = 'BYTE', on_chunk = None):
+        """Reads points 1 to `points` of the selected source in consecutive
+        windows of the largest size allowed for the format. If given, on_chunk
+        is called with every window of out as soon as it is read.
+
+        Raises ValueError if out is not a contiguous 1-D array of at least
+        `points` elements with the dtype of the format (FORMAT_DTYPES).
+
+        Returns
+        -------
+        numpy array out, or None if the reading failed.
+        """
+        if format not in FORMAT_DTYPES:
+            raise ValueError(f'Unsupported waveform format {format}')
+        if not isinstance(out, np.ndarray) or out.ndim != 1 or not out.flags.c_contiguous:
+            raise ValueError('out has to be a contiguous 1-D numpy array')
+        if len(out) < points:
+            raise ValueError(f'out holds {len(out)} points, {points} are read')
+        if out.dtype != FORMAT_DTYPES[format]:
+            raise ValueError(f'out has dtype {out.dtype}, {format} format needs {FORMAT_DTYPES[format]}')
+        chunk = MAX_CHUNK_POINTS[format]
+        if format == 'ASC':
+            text = bytearray(min(chunk, points)*ASC_POINT_SIZE)
+        for start in range(0, points, chunk):
+            stop = min(start + chunk, points)
+            self.rigol.set_start_point_waveform_data(start + 1)
+            self.rigol.set_stop_point_waveform_data(stop)
+            if format == 'ASC':
+                received = self.rigol.get_waveform_data_into(text)
+                try:
+                    values = parse_ascii_values(memoryview(text)[:received or 0])
+                except (UnicodeDecodeError, ValueError):
+                    values = ()
+                complete = len(values) == stop - start
+                if complete:
+                    out[start:stop] = values
+            else:
+                received = self.rigol.get_waveform_data_into(out, start*out.itemsize)
+                complete = received == (stop - start)*out.itemsize
+            if not complete:
+                print(f'Memory reading stopped at point {start + 1} of {points}')
+                return None
+            if on_chunk is not None:
+                on_chunk(out[start:stop])
+        return out
 
     def write_to_csv(self, filename, time, voltage):
-        with open(filename,'w') as f:
-            for i in range(len(voltage[0])):
-                f.write(f'{time[i]}')
-                for j in range(len(voltage)):
-                    f.write(f',{voltage[j][i]}')
-                f.write('\n')
-        
\ No newline at end of file
+        """Writes time and voltage of one or more channels into a CSV file.
+        For large captures prefer save_capture, which keeps raw samples."""
+        write_csv(filename, time, voltage)
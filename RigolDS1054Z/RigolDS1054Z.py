@@ -1,69 +1,54 @@
-import pyvisa
 import time
-
-class RigolDS1054Z:
+from typing import NamedTuple
+from SCPIInstrument.SCPIInstrument import SCPIBatching, SCPIInstrument, io_method
+
+class WaveformPreamble(NamedTuple):
+    """Parsed response of :WAV:PRE?"""
+    format: int
+    type: int
+    points: int
+    count: int
+    x_increment: float
+    x_origin: float
+    x_reference: float
+    y_increment: float
+    y_origin: float
+    y_reference: float
+
+class RigolDS1054Z(SCPIBatching, SCPIInstrument):
     """
     Set dev_info:
     - TCP/IP connection  e.g ['TCPIP::169.254.1.2::3490'])
     Note: If instrument could not be recognized with standdar TCPIP settings, try with raw socket
     e.g. ['TCPIP::169.254.1.2::3490:SOCKET']
     - usb connection  (dev_info set to ['usb_dev_info'] e.g [''])
-    - serial connection (dev_info set_to ['COM port',] e.g ['ASRL/dev/ttyUSB0::INSTR'])"""
-
-    def __init__(self, dev_info, read_termination = '\r\n', write_termination = '\r\n', delay = 0.05, timeout = 10_000) -> None:
-        
-        self.__instrument_connected = False
-        
-        rm = pyvisa.ResourceManager()
-        try:
-            self.__inst = rm.open_resource(dev_info, write_termination=write_termination, read_termination=read_termination)
-            self.__instrument_connected = True
-            self.__inst.timeout = timeout
-            self.__delay = delay
-        except:
-            print('Check connection with Rigol DS1054Z')
-    
-    def __get_data(self,query) -> str:
-        if self.__instrument_connected:
-            try:
-                recv = self.__inst.query(query)
-                time.sleep(self.__delay)
-                return recv
-            except Exception as e:
-                print('Can not query data from the instrument')
-            
-        else:
-            print('Rigol DS1054Z is not connected')
-        return None
-
-    def __get_bytes(self,query) -> bytes:
-        if self.__instrument_connected:
-            try:
-                self.__write_data(query)
-                recv = self.__inst.read_binary_values(datatype='B', expect_termination = False )
-                time.sleep(self.__delay)
-                return recv
-            except Exception as e:
-                print('Can not query data from the instrument')
-            
-        else:
-            print('Rigol DS1054Z is not connected')
-        return None
-
-
-    def __write_data(self, data) -> bool:
-        if self.__instrument_connected:
-            try:
-                self.__inst.write(data)
-                time.sleep(self.__delay)
-                return True
-            except Exception as e: 
-                print('Can not send data to the Rigol DS1054Z')
-                print('Reason:', e)
-            
-        else:
-            print('Rigol DS1054Z is not connected')
-        return False
+    - serial connection (dev_info set_to ['COM port',] e.g ['ASRL/dev/ttyUSB0::INSTR'])
+    Set pacing:
+    - OPC (default) - no waiting after queries, *OPC? after commands which take long
+      (*RST, AUT, :ACQ:MDEP, :SING),
+    - ADAPTIVE - as OPC, with a minimum interval between commands derived from timed *OPC?,
+    - FIXED - sleep `delay` seconds after every command,
+    - NONE - no waiting.
+    Set transport:
+    - VISA (default) - resource is opened with pyvisa,
+    - SOCKET - TCPIP::host::5555::SOCKET resource over a raw TCP socket, without VISA.
+    Redundant setting commands can be skipped with enable_state_cache()."""
+
+    name = 'Rigol DS1054Z'
+    opc_commands = ('*RST', 'AUT', ':ACQ:MDEP', ':SING')
+    state_invalidating_commands = ('*RST', '*CLS', 'AUT', 'SING')
+    # Commands after which cached waveform preambles are discarded, they change
+    # points, x or y scaling of the waveform (channel and timebase scale and
+    # offset, acquisition). The reading window (:WAV:STAR, :WAV:STOP) does not
+    # change the preamble.
+    preamble_invalidating_commands = ('*RST', 'AUT', 'RUN', 'STOP', 'SING', 'ACQ', 'CHAN', 'MATH', 'TIM')
+
+    def __init__(self, dev_info, read_termination = '\r\n', write_termination = '\r\n', delay = 0.05, timeout = 10_000, pacing = 'OPC', transport = 'VISA') -> None:
+        self.__preamble_cache = {}
+        self.__waveform_source = None
+        self.__reading_mode = None
+        self.__return_format = None
+        super().__init__(dev_info, read_termination, write_termination, delay, timeout, pacing, transport)
 
     def get_enable_register(self) -> str:
         """Query the enable register for the standard event status register set.
@@ -75,7 +60,7 @@ class RigolDS1054Z:
         -------
         str status - The query returns an integer which equals the sum of the weights of all the bits that have
                      already been set in the register."""
-        return self.__get_data('*ESE?')
+        return self._get_data('*ESE?')
 
     def set_enable_register(self, value) -> bool:
         """Set the enable register for the standard event status register set.
@@ -88,7 +73,7 @@ class RigolDS1054Z:
         Returns
         -------
         bool status"""
-        return self.__get_data(f'*ESE {value}')
+        return self._get_data(f'*ESE {value}')
     
     def clear_event_register(self) -> str:
         """Query and clear the event register for the standard event status register.
@@ -101,7 +86,7 @@ class RigolDS1054Z:
         str status - The query returns an integer which equals the sum of the weights of all the bits in the
                      register."""
         
-        return self.__get_data('*ESR?')
+        return self._get_data('*ESR?')
 
     def get_info(self) -> str:
         """Query the ID string of the instrument.
@@ -113,7 +98,7 @@ class RigolDS1054Z:
                      <serial number>: the serial number of the instrument.
                      <software version>: the software version of the instrument.        
         """
-        return self.__get_data('*IDN?')
+        return self._get_data('*IDN?')
     
     def get_operation_complete_bit(self) -> str:
         """The *OPC command is used to set the Operation Complete bit (bit 0) in the standard
@@ -124,7 +109,7 @@ class RigolDS1054Z:
         -------
         str status - The query returns 1 if the current operation is finished; otherwise, returns 0.
         """
-        return self.__get_data('*OPC?')
+        return self._get_data('*OPC?')
 
     def reset_instrument(self) -> bool:
         """Restore the instrument to the default state.
@@ -132,7 +117,7 @@ class RigolDS1054Z:
         Returns
         -------
         bool status"""
-        return self.__write_data('*RST')
+        return self._write_data('*RST')
 
     def self_test(self) -> bool:
         """Perform self-test. Returns “0” if the test succeeds,
@@ -142,7 +127,7 @@ class RigolDS1054Z:
         -------
         bool status
         """
-        return self.__write_data('*TST')
+        return self._write_data('*TST')
 
     def auto_scale(self)->bool:
         """
@@ -155,7 +140,7 @@ class RigolDS1054Z:
         -------
         bool status
         """
-        return self.__write_data('AUT')
+        return self._write_data('AUT')
     
     def clear_display(self)->bool:
         """
@@ -168,7 +153,7 @@ class RigolDS1054Z:
         bool status
 
         """
-        return self.__write_data('CLE')
+        return self._write_data('CLE')
 
     def run(self)->bool:
         """
@@ -179,7 +164,7 @@ class RigolDS1054Z:
         bool status
 
         """
-        return self.__write_data(':RUN')
+        return self._write_data(':RUN')
 
     def stop(self)->bool:
         """
@@ -191,7 +176,7 @@ class RigolDS1054Z:
         bool status
 
         """
-        return self.__write_data(':STOP')
+        return self._write_data(':STOP')
     
     def single(self)->bool:
         """
@@ -205,7 +190,74 @@ class RigolDS1054Z:
         bool status
 
         """
-        return self.__write_data(':SING')
+        return self._write_data(':SING')
+
+    @io_method
+    def single_and_wait(self, timeout = 10)->bool:
+        """
+        Set the oscilloscope to the single trigger mode and wait until the acquisition
+        is finished and the oscilloscope is in the stop state.
+
+        Parameters
+        ----------
+        timeout : type - float - maximum time to wait for the trigger in seconds
+
+        Returns
+        -------
+        bool status - False if the acquisition did not finish before timeout.
+        """
+        if not (yield self.single()):
+            return False
+        # Once :SING is processed the STOP state belongs to the new acquisition,
+        # with OPC pacing single() already waited for it with *OPC?.
+        if not self._pacing.needs_opc(':SING'):
+            yield self.get_operation_complete_bit()
+        return (yield self.wait_for_trigger_state('STOP', timeout))
+
+    def get_trigger_status(self)->str:
+        """
+        Query the current trigger status.
+
+        Returns
+        -------
+        str - TD, WAIT, RUN, AUTO, or STOP.
+        """
+        return self._get_data(':TRIG:STAT?')
+
+    @io_method
+    def wait_for_trigger_state(self, state = 'STOP', timeout = 10, poll_interval = 0.005, max_poll_interval = 0.2)->bool:
+        """
+        Poll the trigger status until it matches the state. The polling interval starts
+        at poll_interval and is doubled up to max_poll_interval after every query.
+
+        Parameters
+        ----------
+        state : type - str or tuple of str
+            - TD, WAIT, RUN, AUTO or STOP
+        timeout : type - float - maximum time to wait in seconds
+
+        Returns
+        -------
+        bool status - False if the state was not reached before timeout.
+        """
+        states = (state,) if isinstance(state, str) else tuple(state)
+        if (yield self._poll_trigger_status(states, timeout, poll_interval, max_poll_interval)):
+            return True
+        print(f'Rigol DS1054Z did not reach trigger state {"/".join(states)} in {timeout} s')
+        return False
+
+    @io_method
+    def _poll_trigger_status(self, states, timeout, poll_interval = 0.005, max_poll_interval = 0.2) -> bool:
+        deadline = time.monotonic() + timeout
+        while True:
+            status = yield self._get_data(':TRIG:STAT?', delay=0)
+            if status is not None and status.strip() in states:
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            yield self._sleep(min(poll_interval, remaining))
+            poll_interval = min(2*poll_interval, max_poll_interval)
 
     def force_trigger(self)->bool:
         """
@@ -218,7 +270,7 @@ class RigolDS1054Z:
         bool status
 
         """
-        return self.__write_data(':TFOR')
+        return self._write_data(':TFOR')
     
     def set_average_acquisition_mode(self, count)->bool:
         """Set or query the number of averages under the average acquisition mode.
@@ -229,7 +281,7 @@ class RigolDS1054Z:
         -------
         bool status"""
         
-        return self.__write_data(f':ACQ:AVER {count}')
+        return self._write_data(f':ACQ:AVER {count}')
 
     def get_average_acquisition_mode(self)->str:
         """
@@ -240,7 +292,7 @@ class RigolDS1054Z:
         str - number of averages under the average acquisition mode.
 
         """
-        return self.__get_data(':ACQ:AVER?')
+        return self._get_data(':ACQ:AVER?')
 
     def set_memory_depth(self, mdep)->bool:
         """Set the memory depth of the oscilloscope (namely the number of waveform
@@ -279,7 +331,7 @@ class RigolDS1054Z:
         -------
         bool status"""
         
-        return self.__write_data(f':ACQ:MDEP {mdep}')
+        return self._write_data(f':ACQ:MDEP {mdep}')
 
     def get_memory_depth(self)->str:
         """
@@ -290,7 +342,7 @@ class RigolDS1054Z:
         str - number of memory depth in pts.
 
         """
-        return self.__get_data(':ACQ:MDEP?')
+        return self._get_data(':ACQ:MDEP?')
     
     def set_acquisition_mode(self, mode)->bool:
         """
@@ -325,7 +377,7 @@ class RigolDS1054Z:
         bool status"""
         
         if mode in ['NORM','NORMal','AVERages','AVER','PEAK','HRES','HRESolution']:
-            return self.__write_data(f':ACQ:TYPE {mode}')
+            return self._write_data(f':ACQ:TYPE {mode}')
         else:
             return False
         
@@ -337,7 +389,7 @@ class RigolDS1054Z:
         -------
         str - NORM, AVER, PEAK, or HRES.
         """
-        return self.__get_data(':ACQ:TYPE?')
+        return self._get_data(':ACQ:TYPE?')
 
     def get_sampling_rate(self)->str:
         """
@@ -347,8 +399,9 @@ class RigolDS1054Z:
         -------
         str -  the sample rate in scientific notation.
         """
-        return self.__get_data(':ACQ:SRAT?')
+        return self._get_data(':ACQ:SRAT?')
 
+    @io_method
     def set_waveform_channel(self, source)->bool:
         """
         Set the channel of which the waveform data will be read.
@@ -375,7 +428,9 @@ class RigolDS1054Z:
         if source in ['D0','D1','D2','D3','D4','D5','D6','D7','D8','D9','D10','D11',
                       'D12','D13','D14','D15','CHAN1','CHANnel1','CHAN2','CHANnel2',
                       'CHAN3','CHANnel3','CHAN4','CHANnel4','MATH']:
-            return self.__write_data(f':WAV:SOUR {source}')
+            status = yield self._write_data(f':WAV:SOUR {source}')
+            self.__waveform_source = source if status else None
+            return status
         else:
             return False
 
@@ -388,8 +443,9 @@ class RigolDS1054Z:
         str - The query returns D0, D1, D2, D3, D4, D5, D6, D7, D8, D9, D10, D11, D12, D13, D14,
               D15, CHAN1, CHAN2, CHAN3, CHAN4, or MATH.
         """
-        return self.__get_data(':WAV:SOUR?')
+        return self._get_data(':WAV:SOUR?')
 
+    @io_method
     def set_reading_mode(self,mode)->bool:
         """
         Set the reading mode .
@@ -410,7 +466,9 @@ class RigolDS1054Z:
         """
 
         if mode in ['NORMal','NORM','MAXimum','MAX','RAW']:
-            return self.__write_data(f':WAV:MODE {mode}')
+            status = yield self._write_data(f':WAV:MODE {mode}')
+            self.__reading_mode = mode if status else None
+            return status
         else:
             return False
         
@@ -423,8 +481,9 @@ class RigolDS1054Z:
         -------
         str - The query returns NORM, MAX, or RAW.
         """
-        return self.__get_data(':WAV:MODE?')
+        return self._get_data(':WAV:MODE?')
 
+    @io_method
     def set_return_format_waveform(self, format)->bool:
         """
         Set the return format of the waveform data.
@@ -443,7 +502,9 @@ class RigolDS1054Z:
         """
 
         if format in ['WORD','BYTE','ASCii','ASC']:
-            return self.__write_data(f':WAV:FORM {format}')
+            status = yield self._write_data(f':WAV:FORM {format}')
+            self.__return_format = format if status else None
+            return status
         else:
             return False
         
@@ -456,7 +517,7 @@ class RigolDS1054Z:
         -------
         str - The query returns WORD, BYTE, or ASC.
         """
-        return self.__get_data(':WAV:FORM?')
+        return self._get_data(':WAV:FORM?')
     
     def get_waveform_data(self)->list:
         """
@@ -466,7 +527,23 @@ class RigolDS1054Z:
         -------
         bytes - waveform data.
         """
-        return self.__get_bytes(':WAV:DATA?')
+        return self._get_bytes(':WAV:DATA?')
+
+    def get_waveform_data_into(self, buffer, offset = 0) -> int:
+        """
+        Read the waveform data directly into a preallocated buffer, without
+        converting every sample to a Python object.
+
+        Parameters
+        ----------
+        buffer : type - bytearray, numpy array or memoryview
+        offset : type - int - byte offset in the buffer where data is written
+
+        Returns
+        -------
+        int - number of bytes written into the buffer, or None.
+        """
+        return self._get_block_into(':WAV:DATA?', buffer, offset)
 
 
     def get_waveform_parameters(self)->str:
@@ -493,7 +570,71 @@ class RigolDS1054Z:
             direction.
             <yreference>: the vertical reference position in the Y direction.
         """
-        return self.__get_data(':WAV:PRE?')
+        return self._get_data(':WAV:PRE?')
+
+    @io_method
+    def get_waveform_preamble(self) -> WaveformPreamble:
+        """
+        Return parsed waveform parameters of the selected source, reading mode and
+        return format. Parameters are cached and :WAV:PRE? is queried again only
+        after the acquisition settings are changed through this class, see
+        invalidate_preamble. With enable_state_cache() repeated reads of an
+        unchanged setup send only :WAV:DATA?.
+
+        Returns
+        -------
+        WaveformPreamble - parsed waveform parameters, or None.
+        """
+        preamble = self._cached_preamble()
+        if preamble is None:
+            preamble = self._store_preamble((yield self.get_waveform_parameters()))
+        return preamble
+
+    def _cached_preamble(self) -> WaveformPreamble:
+        key = (self.__waveform_source, self.__reading_mode, self.__return_format)
+        return self.__preamble_cache.get(key)
+
+    def _store_preamble(self, data) -> WaveformPreamble:
+        """Parses response of :WAV:PRE? and caches it for the selected source"""
+        try:
+            data = data.split(',')
+            preamble = WaveformPreamble(*(int(float(value)) for value in data[:4]),
+                                        *(float(value) for value in data[4:10]))
+        except (AttributeError, TypeError, ValueError):
+            print('Can not parse waveform parameters')
+            return None
+        if self.__waveform_source is not None:
+            key = (self.__waveform_source, self.__reading_mode, self.__return_format)
+            self.__preamble_cache[key] = preamble
+        return preamble
+
+    def invalidate_preamble(self) -> None:
+        """Discard cached waveform parameters. Called before every write of the
+        preamble_invalidating_commands; call it after the settings are changed on
+        the front panel."""
+        self.__preamble_cache.clear()
+
+    def _before_write(self, data) -> None:
+        commands = [command.strip().lstrip(':').upper() for command in data.split(';')]
+        if any(command.startswith(self.preamble_invalidating_commands) for command in commands):
+            self.invalidate_preamble()
+        # *RST selects the default waveform source, mode and format
+        if any(command.startswith('*RST') for command in commands):
+            self.__forget_waveform_settings()
+
+    def _command_failed(self) -> None:
+        super()._command_failed()
+        self.invalidate_preamble()
+        self.__forget_waveform_settings()
+
+    def _batch_discarded(self) -> None:
+        self.invalidate_preamble()
+        self.__forget_waveform_settings()
+
+    def __forget_waveform_settings(self) -> None:
+        self.__waveform_source = None
+        self.__reading_mode = None
+        self.__return_format = None
 
     def set_start_point_waveform_data(self, start_point)->bool:
         """
@@ -509,7 +650,7 @@ class RigolDS1054Z:
         -------
         bool status
         """
-        return self.__write_data(f':WAV:STAR {start_point}')
+        return self._write_data(f':WAV:STAR {start_point}')
 
     def get_start_point_waveform_data(self)->str:
         """
@@ -519,7 +660,7 @@ class RigolDS1054Z:
         -------
         str - returns an integer that represents starting point.
         """
-        return self.__get_data(':WAV:FORM?')
+        return self._get_data(':WAV:FORM?')
 
     def set_stop_point_waveform_data(self, stop_point)->bool:
         """
@@ -535,7 +676,7 @@ class RigolDS1054Z:
         -------
         bool status
         """
-        return self.__write_data(f':WAV:STOP {stop_point}')
+        return self._write_data(f':WAV:STOP {stop_point}')
 
     def get_stop_point_waveform_data(self)->str:
         """
@@ -545,11 +686,4 @@ class RigolDS1054Z:
         -------
         str - returns an integer that represents stop point.
         """
-        return self.__get_data(':WAV:STOP?')
-
-    @staticmethod
-    def list_instruments()->str:
-        rm = pyvisa.ResourceManager()
-        return rm.list_resources()
-
-    
\ No newline at end of file
+        return self._get_data(':WAV:STOP?')
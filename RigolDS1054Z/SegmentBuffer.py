@@ -0,0 +1,73 @@
+import os
+from collections import deque
+from datetime import datetime
+from typing import NamedTuple
+from RigolDS1054Z.CaptureFile import CaptureWriter
+
+class Segment(NamedTuple):
+    """One triggered acquisition"""
+    index: int
+    timestamp: datetime
+    preambles: dict
+    data: dict
+
+class CaptureStatistics(NamedTuple):
+    """Timing of a segmented capture"""
+    segments: int
+    elapsed: float
+    segments_per_second: float
+    dead_time: float
+    mean_dead_time: float
+
+class SegmentBuffer:
+    """Bounded in-memory buffer of captured segments.
+
+    When the buffer is full the oldest segment is written to the directory as a
+    capture file (see RigolDS1054Z.CaptureFile) before the new one is stored.
+    Without a directory the oldest segment is dropped and counted in `dropped`."""
+
+    def __init__(self, capacity = 16, directory = None) -> None:
+        self.capacity = capacity
+        self.directory = directory
+        self.spilled = []
+        self.dropped = 0
+        self.__segments = deque()
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def push(self, segment) -> None:
+        """Stores the segment, spilling or dropping the oldest one if the buffer is full"""
+        if len(self.__segments) >= self.capacity:
+            oldest = self.__segments.popleft()
+            if self.directory is None:
+                self.dropped += 1
+            else:
+                self.spill(oldest)
+        self.__segments.append(segment)
+
+    def pop(self) -> Segment:
+        """Removes and returns the oldest segment kept in memory"""
+        return self.__segments.popleft()
+
+    def spill(self, segment) -> str:
+        """Writes the segment into the directory and returns the file name"""
+        filename = os.path.join(self.directory, f'segment_{segment.index:06d}.cap')
+        metadata = {'index': segment.index, 'timestamp': segment.timestamp.isoformat()}
+        with CaptureWriter(filename, metadata) as writer:
+            for channel, data in segment.data.items():
+                writer.add_channel(channel, segment.preambles[channel], data)
+        self.spilled.append(filename)
+        return filename
+
+    def flush(self) -> None:
+        """Writes all segments kept in memory into the directory"""
+        while self.__segments:
+            self.spill(self.__segments.popleft())
+
+    @property
+    def segments(self) -> list:
+        """Segments kept in memory, oldest first"""
+        return list(self.__segments)
+
+    def __len__(self) -> int:
+        return len(self.__segments)
@@ -0,0 +1,319 @@
+import asyncio
+import functools
+import inspect
+import time
+from contextlib import asynccontextmanager
+from SCPIInstrument.SCPIInstrument import SCPIBatching, SCPIInstrument
+from SCPIInstrument.SocketTransport import parse_socket_resource
+
+# Longest reply line, a full Fluke 8846A memory of 5000 readings is about 80 kB
+LINE_LIMIT = 2**20
+
+def _tracked(coroutine_function):
+    """Registers coroutines of the transport calls, so that _awaitable can tell
+    when a driver method did not return the coroutine it created"""
+    @functools.wraps(coroutine_function)
+    def wrapper(self, *args, **kwargs):
+        coroutine = coroutine_function(self, *args, **kwargs)
+        if self._io_calls is not None:
+            self._io_calls.append(coroutine)
+        return coroutine
+    return wrapper
+
+def _awaitable(method):
+    """Wraps a driver method so that the coroutine returned from the transport is
+    awaited. Raises TypeError when the method used a reply of the instrument (or
+    dropped a transport call) instead of returning it, such methods have to be
+    written as io_method."""
+    async def call(self, args, kwargs):
+        self._io_calls = []
+        try:
+            result = method(self, *args, **kwargs)
+        except Exception as e:
+            calls, self._io_calls = self._io_calls, None
+            for coroutine in calls:
+                coroutine.close()
+            if calls:
+                raise TypeError(f'{method.__qualname__} uses replies of the instrument, '
+                                'write it as io_method or override it in the async driver') from e
+            raise
+        calls, self._io_calls = self._io_calls, None
+        dropped = [coroutine for coroutine in calls if coroutine is not result]
+        if dropped:
+            for coroutine in calls:
+                coroutine.close()
+            raise TypeError(f'{method.__qualname__} does not return the result of its transport call, '
+                            'write it as io_method or override it in the async driver')
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        coroutine = call(self, args, kwargs)
+        if self._io_calls is not None:
+            self._io_calls.append(coroutine)
+        return coroutine
+    return wrapper
+
+class AsyncSCPIBatching(SCPIBatching):
+    """asyncio variant of SCPIBatching, mixed into the async drivers before
+    AsyncSCPIInstrument, e.g. class AsyncFluke8846A(AsyncSCPIBatching, AsyncSCPIInstrument, Fluke8846A)"""
+
+    @asynccontextmanager
+    async def batch(self):
+        """Async variant of SCPIBatching.batch, used as `async with dmm.batch():`"""
+        if self._batch is not None:
+            yield self
+            return
+        self._batch = []
+        try:
+            yield self
+        except:
+            # Collected commands are discarded, they were not recorded in the state cache
+            self._batch = None
+            self._batch_discarded()
+            raise
+        await self._flush_batch()
+        self._batch = None
+        await self.get_errors()
+
+class AsyncSCPIInstrument(SCPIInstrument):
+    """asyncio variant of SCPIInstrument using non-blocking sockets.
+
+    Async drivers are declared as e.g.
+        class AsyncFluke9142(AsyncSCPIInstrument, Fluke9142)
+    drivers of SCPIBatching instruments also mix in AsyncSCPIBatching.
+    Every public method of the driver becomes a coroutine, e.g. await dmm.fetch_data().
+    Driver methods which use replies of the instrument are written as io_method
+    and run by the same code in both drivers; a wrapped method which uses a reply
+    without being an io_method raises TypeError. Generators, e.g. Fluke8846A.stream,
+    are overridden with async generators. Commands of one instrument are serialized with a lock, so one event
+    loop can drive several instruments at once.
+
+    Only 'TCPIP::host::port::SOCKET' resources are supported. The connection is
+    opened on the first command or with await connect(). Without a read or write
+    termination '\\n' is used."""
+
+    # Local methods which do not talk to the instrument stay synchronous
+    enable_state_cache = SCPIInstrument.enable_state_cache
+    add_sink = SCPIInstrument.add_sink
+    remove_sink = SCPIInstrument.remove_sink
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        for name, attribute in list(cls.__dict__.items()):
+            if inspect.iscoroutinefunction(attribute):
+                setattr(cls, name, _tracked(attribute))
+        for name in dir(cls):
+            if name.startswith('_'):
+                continue
+            owner = next(klass for klass in cls.__mro__ if name in klass.__dict__)
+            attribute = owner.__dict__[name]
+            if issubclass(owner, (AsyncSCPIInstrument, AsyncSCPIBatching)) or not inspect.isfunction(attribute):
+                continue
+            if inspect.isgeneratorfunction(attribute):
+                raise TypeError(f'{cls.__name__} has to override generator {owner.__name__}.{name} '
+                                'with an async generator')
+            setattr(cls, name, _awaitable(attribute))
+
+    def _connect(self, dev_info, read_termination, write_termination, timeout) -> None:
+        self._address = parse_socket_resource(dev_info)
+        self._read_termination = (read_termination or '\n').encode()
+        self._write_termination = (write_termination or '\n').encode()
+        self._timeout = None if timeout is None else timeout/1000
+        self._reader = None
+        self._writer = None
+        self._lock = asyncio.Lock()
+        # Coroutines created by the driver method being wrapped, see _awaitable
+        self._io_calls = None
+        if self._address is None:
+            print(f'Async {self.name} driver supports only TCPIP::host::port::SOCKET resources')
+
+    @_tracked
+    async def connect(self) -> bool:
+        """Opens the socket connection"""
+        if self._instrument_connected:
+            return True
+        if self._address is None:
+            return False
+        try:
+            self._reader, self._writer = await asyncio.wait_for(asyncio.open_connection(*self._address, limit=LINE_LIMIT), self._timeout)
+            self._instrument_connected = True
+        except Exception:
+            print(f'Check connection with {self.name}')
+        return self._instrument_connected
+
+    @_tracked
+    async def _get_data(self, query, delay = None) -> str:
+        await self._flush_batch()
+        cached = self._state_lookup(query)
+        if cached is not None:
+            return cached
+        if await self.connect():
+            timer = self._timer('query', query)
+            try:
+                async with self._lock:
+                    wait = self._pacing.wait_time()
+                    await asyncio.sleep(wait)
+                    timer.slept(wait)
+                    await self.__send(query)
+                    timer.sent(len(query) + len(self._write_termination))
+                    recv = await self.__read_line()
+                    timer.first_byte()
+                    timer.received(len(recv) + len(self._read_termination))
+                    self._pacing.record()
+                    self._state_store(query, recv)
+                    sleep = self._pacing.delay_after() if delay is None else delay
+                    timer.finish(self._sinks, sleep_after=sleep)
+                    await asyncio.sleep(sleep)
+                return recv
+            except Exception as e:
+                timer.finish(self._sinks, e)
+                self._command_failed()
+                print('Can not query data from the instrument')
+
+        else:
+            self._not_connected('query', query)
+        return None
+
+    @_tracked
+    async def _get_bytes(self, query) -> list:
+        buffer = bytearray()
+        length = await self._get_block_into(query, buffer)
+        return None if length is None else list(buffer)
+
+    @_tracked
+    async def _get_block_into(self, query, buffer, offset = 0) -> int:
+        """Sends the query and reads the IEEE 488.2 definite length block of the
+        response into the buffer starting at byte offset. A bytearray is extended
+        to the needed size. Returns number of data bytes or None."""
+        await self._flush_batch()
+        if await self.connect():
+            timer = self._timer('block', query)
+            try:
+                async with self._lock:
+                    wait = self._pacing.wait_time()
+                    await asyncio.sleep(wait)
+                    timer.slept(wait)
+                    await self.__send(query)
+                    timer.sent(len(query) + len(self._write_termination))
+                    header = await self.__read_exactly(2)
+                    timer.first_byte()
+                    if header[:1] != b'#':
+                        timer.finish(self._sinks, ValueError('Invalid binary block header'))
+                        print(f'Invalid binary block header received from {self.name}')
+                        return None
+                    length = int(await self.__read_exactly(int(header[1:2])))
+                    data = await self.__read_exactly(length)
+                    end = await asyncio.wait_for(self._reader.readuntil(self._read_termination[-1:]), self._timeout)
+                    timer.received(2 + int(header[1:2]) + length + len(end))
+                    self._pacing.record()
+                if isinstance(buffer, bytearray) and len(buffer) < offset + length:
+                    buffer.extend(bytes(offset + length - len(buffer)))
+                view = memoryview(buffer).cast('B')
+                if offset + length > len(view):
+                    timer.finish(self._sinks, ValueError('Buffer is too small'))
+                    print('Buffer is too small for the received data')
+                    return None
+                view[offset:offset + length] = data
+                sleep = self._pacing.delay_after()
+                timer.finish(self._sinks, sleep_after=sleep)
+                await asyncio.sleep(sleep)
+                return length
+            except Exception as e:
+                timer.finish(self._sinks, e)
+                self._command_failed()
+                print('Can not query data from the instrument')
+
+        else:
+            self._not_connected('block', query)
+        return None
+
+    @_tracked
+    async def _write_data(self, data) -> bool:
+        self._before_write(data)
+        # Commands of a batch are all sent, the state cache does not know the
+        # values queued before them
+        if self._batch is not None:
+            self._batch.append(data)
+            return True
+        if self._state_unchanged(data):
+            return True
+        if await self.connect():
+            timer = self._timer('write', data)
+            try:
+                async with self._lock:
+                    wait = self._pacing.wait_time()
+                    await asyncio.sleep(wait)
+                    timer.slept(wait)
+                    await self.__send(data)
+                    timer.sent(len(data) + len(self._write_termination))
+                    if self._pacing.opc_due(data):
+                        start = time.monotonic()
+                        await self.__send('*OPC?')
+                        await self.__read_line()
+                        self._pacing.record_opc(data, time.monotonic() - start)
+                    self._pacing.record()
+                self._state_record(data)
+                sleep = self._pacing.delay_after()
+                timer.finish(self._sinks, sleep_after=sleep)
+                await asyncio.sleep(sleep)
+                return True
+            except Exception as e:
+                timer.finish(self._sinks, e)
+                self._command_failed()
+                print(f'Can not send data to the {self.name}')
+                print('Reason:', e)
+
+        else:
+            self._command_failed()
+            self._not_connected('write', data)
+        return False
+
+    @_tracked
+    async def _flush_batch(self) -> bool:
+        if not self._batch:
+            return True
+        commands, self._batch = self._batch, []
+        return await self._write_commands(commands)
+
+    @_tracked
+    async def close_connection(self) -> None:
+        """Close connection"""
+        if self._instrument_connected:
+            self._writer.close()
+            await self._writer.wait_closed()
+            self._instrument_connected = False
+
+    @_tracked
+    async def _run(self, steps):
+        """Runs the generator of an io_method, awaiting the yielded transport calls"""
+        try:
+            call = next(steps)
+            while True:
+                try:
+                    result = await call if inspect.isawaitable(call) else call
+                except Exception as e:
+                    call = steps.throw(e)
+                    continue
+                call = steps.send(result)
+        except StopIteration as stop:
+            return stop.value
+
+    @_tracked
+    async def _sleep(self, seconds) -> None:
+        await asyncio.sleep(seconds)
+
+    async def __send(self, data) -> None:
+        self._writer.write(data.encode() + self._write_termination)
+        await self._writer.drain()
+
+    async def __read_line(self) -> str:
+        line = await asyncio.wait_for(self._reader.readuntil(self._read_termination[-1:]), self._timeout)
+        if line.endswith(self._read_termination):
+            return line[:-len(self._read_termination)].decode()
+        return line[:-1].decode()
+
+    async def __read_exactly(self, count) -> bytes:
+        return await asyncio.wait_for(self._reader.readexactly(count), self._timeout)
@@ -0,0 +1,182 @@
+import json
+import math
+import time
+from typing import NamedTuple
+
+# Latency histogram bins per decade, from HISTOGRAM_MIN to HISTOGRAM_MAX seconds
+HISTOGRAM_BINS_PER_DECADE = 20
+HISTOGRAM_MIN = 1e-6
+HISTOGRAM_MAX = 1e3
+HISTOGRAM_SIZE = HISTOGRAM_BINS_PER_DECADE*round(math.log10(HISTOGRAM_MAX/HISTOGRAM_MIN)) + 1
+
+class CommandRecord(NamedTuple):
+    """Timing of one command sent to an instrument, times in seconds.
+
+    send - writing the message, wait - from the end of sending to the first
+    received byte (or to the end of the reply where the transport can not tell
+    the first byte, i.e. VISA line reads), transfer - from the first to the last
+    received byte, sleep - pacing waits before and after the command."""
+    timestamp: float
+    instrument: str
+    kind: str
+    command: str
+    send: float
+    wait: float
+    transfer: float
+    sleep: float
+    bytes_sent: int
+    bytes_received: int
+    success: bool
+    error: str
+
+    @property
+    def header(self) -> str:
+        """Command header without parameters, used to group the records"""
+        return self.command.split(' ', 1)[0]
+
+    @property
+    def total(self) -> float:
+        return self.send + self.wait + self.transfer + self.sleep
+
+class CommandTimer:
+    """Collects timing of one command and passes the record to the sinks"""
+
+    __slots__ = ('instrument', 'kind', 'command', 'timestamp', 'start', 'sent_at', 'first_byte_at',
+                 'sleep', 'bytes_sent', 'bytes_received')
+
+    def __init__(self, instrument, kind, command) -> None:
+        self.instrument = instrument
+        self.kind = kind
+        self.command = command
+        self.timestamp = time.time()
+        self.start = time.perf_counter()
+        self.sent_at = None
+        self.first_byte_at = None
+        self.sleep = 0.0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def slept(self, seconds) -> None:
+        """Records pacing wait before sending"""
+        self.sleep += seconds
+
+    def sent(self, size) -> None:
+        self.sent_at = time.perf_counter()
+        self.bytes_sent += size
+
+    def first_byte(self, at = None) -> None:
+        """Marks the arrival of the first byte of the reply, now if `at` is not given"""
+        if self.first_byte_at is None:
+            self.first_byte_at = time.perf_counter() if at is None else at
+
+    def received(self, size) -> None:
+        self.bytes_received += size
+
+    def finish(self, sinks, error = None, sleep_after = 0.0) -> None:
+        """Passes the record to the sinks. Called before the pacing sleep after
+        the command, whose length is given as sleep_after."""
+        end = time.perf_counter()
+        sent_at = end if self.sent_at is None else self.sent_at
+        first_byte_at = end if self.first_byte_at is None else max(sent_at, min(self.first_byte_at, end))
+        send = max(0.0, sent_at - self.start - self.sleep)
+        record = CommandRecord(self.timestamp, self.instrument, self.kind, self.command, send,
+                               first_byte_at - sent_at, end - first_byte_at, self.sleep + sleep_after,
+                               self.bytes_sent, self.bytes_received, error is None,
+                               None if error is None else repr(error))
+        for sink in sinks:
+            sink(record)
+
+class _NullTimer:
+    """Timer used while no sink is attached, all methods do nothing"""
+
+    def slept(self, seconds) -> None:
+        pass
+
+    def sent(self, size) -> None:
+        pass
+
+    def first_byte(self, at = None) -> None:
+        pass
+
+    def received(self, size) -> None:
+        pass
+
+    def finish(self, sinks, error = None, sleep_after = 0.0) -> None:
+        pass
+
+NULL_TIMER = _NullTimer()
+
+def histogram_bin(seconds) -> int:
+    """Index of the latency histogram bin"""
+    if seconds <= HISTOGRAM_MIN:
+        return 0
+    return min(math.floor(HISTOGRAM_BINS_PER_DECADE*math.log10(seconds/HISTOGRAM_MIN)), HISTOGRAM_SIZE - 1)
+
+class HistogramSink:
+    """In-memory sink with a log-spaced latency histogram and totals per command header"""
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.commands = {}
+
+    def __call__(self, record) -> None:
+        stats = self.commands.get(record.header)
+        if stats is None:
+            stats = self.commands[record.header] = {
+                'count': 0, 'errors': 0, 'bytes_sent': 0, 'bytes_received': 0, 'send': 0.0,
+                'wait': 0.0, 'transfer': 0.0, 'sleep': 0.0, 'total': 0.0, 'max': 0.0,
+                'histogram': [0]*HISTOGRAM_SIZE}
+        total = record.total
+        stats['count'] += 1
+        stats['errors'] += not record.success
+        stats['bytes_sent'] += record.bytes_sent
+        stats['bytes_received'] += record.bytes_received
+        for phase in ('send', 'wait', 'transfer', 'sleep'):
+            stats[phase] += getattr(record, phase)
+        stats['total'] += total
+        stats['max'] = max(stats['max'], total)
+        stats['histogram'][histogram_bin(total)] += 1
+
+    def percentile(self, header, q) -> float:
+        """Latency in seconds below which q percent of the commands finished,
+        estimated as the upper edge of the histogram bin"""
+        histogram = self.commands[header]['histogram']
+        limit = q/100*sum(histogram)
+        count = 0
+        for i, n in enumerate(histogram):
+            count += n
+            if count >= limit and n:
+                return min(HISTOGRAM_MIN*10**((i + 1)/HISTOGRAM_BINS_PER_DECADE), self.commands[header]['max'])
+        return 0.0
+
+    def summary(self) -> dict:
+        """Returns {header: {count, errors, bytes, mean and percentile latencies in ms, time per phase}}"""
+        summary = {}
+        for header, stats in self.commands.items():
+            count = stats['count']
+            summary[header] = {
+                'count': count, 'errors': stats['errors'],
+                'bytes_sent': stats['bytes_sent'], 'bytes_received': stats['bytes_received'],
+                'mean_ms': 1e3*stats['total']/count,
+                'p50_ms': 1e3*self.percentile(header, 50), 'p99_ms': 1e3*self.percentile(header, 99),
+                'max_ms': 1e3*stats['max'],
+                **{f'{phase}_ms': 1e3*stats[phase]/count for phase in ('send', 'wait', 'transfer', 'sleep')}}
+        return summary
+
+class JSONLinesSink:
+    """Appends every record as one JSON line to the file"""
+
+    def __init__(self, filename) -> None:
+        self.filename = filename
+        self.__file = open(filename, 'a')
+
+    def __call__(self, record) -> None:
+        self.__file.write(json.dumps(record._asdict()) + '\n')
+
+    def flush(self) -> None:
+        self.__file.flush()
+
+    def close(self) -> None:
+        self.__file.close()
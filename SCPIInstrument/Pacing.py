@@ -0,0 +1,107 @@
+import time
+
+PACING_MODES = ('FIXED', 'NONE', 'OPC', 'ADAPTIVE')
+
+class PacingPolicy:
+    """Decides how long to wait around commands sent to an instrument.
+
+    Modes:
+        - FIXED - sleep `delay` after every command, as the drivers used to do.
+        - NONE - never wait.
+        - OPC - queries do not wait, the reply means the command is finished.
+                Writes starting with one of `opc_commands` are followed by *OPC?.
+        - ADAPTIVE - OPC, and commands are spaced by a minimum interval derived
+                     from timed *OPC? round-trips. Every ADAPTIVE_PROBE commands,
+                     and after a failed one, a write is followed by *OPC?, the
+                     round-trip is averaged into opc_time (exponentially weighted
+                     with ADAPTIVE_SMOOTHING). The interval is opc_time times a
+                     backoff factor, which is doubled after every failed command
+                     and halved after ADAPTIVE_SUCCESSES consecutive successful
+                     ones, limited to min_interval and max_interval.
+    """
+
+    ADAPTIVE_SUCCESSES = 20
+    ADAPTIVE_PROBE = 20
+    ADAPTIVE_SMOOTHING = 0.2
+    ADAPTIVE_MAX_BACKOFF = 64
+
+    def __init__(self, mode = 'OPC', delay = 0.05, opc_commands = (), min_interval = 0.0, max_interval = 1.0) -> None:
+        if mode not in PACING_MODES:
+            raise ValueError(f'Pacing mode should be one of {PACING_MODES}')
+        self.mode = mode
+        self.delay = delay
+        self.opc_commands = tuple(command.lstrip(':').upper() for command in opc_commands)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        # Exponentially weighted average of *OPC? round-trips in seconds
+        self.opc_time = None
+        self.__backoff = 1
+        self.__last_command = 0.0
+        self.__successes = 0
+        self.__since_probe = 0
+
+    def wait_time(self) -> float:
+        """Seconds to wait before the next command can be sent"""
+        if self.mode != 'ADAPTIVE':
+            return 0.0
+        return max(0.0, self.__last_command + self.interval - time.monotonic())
+
+    def needs_opc(self, message) -> bool:
+        """True if completion of the written message should be awaited with *OPC?.
+        Every command of a ';' separated message is checked."""
+        if self.mode not in ('OPC', 'ADAPTIVE') or not self.opc_commands:
+            return False
+        return any(command.strip().lstrip(':').upper().startswith(self.opc_commands)
+                   for command in message.split(';'))
+
+    def opc_due(self, message) -> bool:
+        """True if the written message should be followed by *OPC?, because it
+        needs_opc or, in ADAPTIVE mode, the round-trip should be timed"""
+        if self.needs_opc(message):
+            return True
+        return self.mode == 'ADAPTIVE' and (self.opc_time is None or self.__since_probe >= self.ADAPTIVE_PROBE)
+
+    def record_opc(self, message, seconds) -> None:
+        """Records the *OPC? round-trip after the message. Messages which
+        needs_opc take long to finish and are not used for the average."""
+        if self.mode != 'ADAPTIVE' or self.needs_opc(message):
+            return
+        self.__since_probe = 0
+        if self.opc_time is None:
+            self.opc_time = seconds
+        else:
+            self.opc_time += self.ADAPTIVE_SMOOTHING*(seconds - self.opc_time)
+        self.__update_interval()
+
+    def delay_after(self) -> float:
+        """Seconds to sleep after a command"""
+        return self.delay if self.mode == 'FIXED' else 0.0
+
+    def record(self, success = True) -> None:
+        """Records that a command was finished, successfully or not"""
+        self.__last_command = time.monotonic()
+        if self.mode != 'ADAPTIVE':
+            return
+        self.__since_probe += 1
+        if not success:
+            self.__successes = 0
+            self.__since_probe = self.ADAPTIVE_PROBE
+            self.__backoff = min(2*self.__backoff, self.ADAPTIVE_MAX_BACKOFF)
+            self.__update_interval()
+            return
+        self.__successes += 1
+        if self.__successes >= self.ADAPTIVE_SUCCESSES:
+            self.__successes = 0
+            self.__backoff = max(self.__backoff//2, 1)
+            self.__update_interval()
+
+    def before_command(self) -> float:
+        """Sleeps until the next command can be sent, returns the slept seconds"""
+        wait = self.wait_time()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def __update_interval(self) -> None:
+        self.interval = min(max((self.opc_time or 0.0)*self.__backoff, self.min_interval), self.max_interval)
@@ -0,0 +1,444 @@
+import functools
+import time
+from contextlib import contextmanager
+from SCPIInstrument.Pacing import PacingPolicy
+from SCPIInstrument.SocketTransport import SocketResource
+from SCPIInstrument.Instrumentation import CommandTimer, NULL_TIMER
+try:
+    import pyvisa
+except ImportError:
+    pyvisa = None
+
+# Number of bytes requested from VISA at once while reading binary blocks
+BLOCK_READ_SIZE = 1_048_576
+
+_resource_manager = None
+# Open sessions shared by all drivers, resource string -> [resource, number of users]
+_sessions = {}
+TRANSPORTS = ('VISA', 'SOCKET')
+
+def get_resource_manager():
+    """Returns the pyvisa ResourceManager shared by all instruments in the process"""
+    global _resource_manager
+    if pyvisa is None:
+        raise ImportError('pyvisa is needed for VISA resources, use transport SOCKET for TCPIP::host::port::SOCKET')
+    if _resource_manager is None:
+        _resource_manager = pyvisa.ResourceManager()
+    return _resource_manager
+
+def open_session(dev_info, read_termination = None, write_termination = None, timeout = None, transport = 'VISA'):
+    """Opens the resource, or returns the already opened session of the same
+    resource string. Settings of the first opened session are kept.
+    With transport SOCKET the resource is opened as SocketResource without VISA."""
+    if dev_info in _sessions:
+        _sessions[dev_info][1] += 1
+        return _sessions[dev_info][0]
+    if transport not in TRANSPORTS:
+        raise ValueError(f'Transport should be one of {TRANSPORTS}')
+    if transport == 'SOCKET':
+        inst = SocketResource(dev_info, read_termination, write_termination, timeout)
+        _sessions[dev_info] = [inst, 1]
+        return inst
+    settings = {}
+    if read_termination is not None:
+        settings['read_termination'] = read_termination
+    if write_termination is not None:
+        settings['write_termination'] = write_termination
+    inst = get_resource_manager().open_resource(dev_info, **settings)
+    if timeout is not None:
+        inst.timeout = timeout
+    _sessions[dev_info] = [inst, 1]
+    return inst
+
+def close_session(dev_info) -> None:
+    """Closes the session when its last user closes the connection"""
+    if dev_info not in _sessions:
+        return
+    _sessions[dev_info][1] -= 1
+    if _sessions[dev_info][1] == 0:
+        _sessions.pop(dev_info)[0].close()
+
+def io_method(method):
+    """Decorator of driver methods which use replies of the instrument.
+
+    The method is written as a generator which yields every transport call and
+    receives its result, e.g.
+        @io_method
+        def fetch_readings(self):
+            data = yield self._get_data('FETC?')
+            return parse_readings(data)
+    SCPIInstrument runs it synchronously, AsyncSCPIInstrument awaits the yielded
+    coroutines, so the async driver does not repeat the method."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return self._run(method(self, *args, **kwargs))
+    wrapper.io_method = True
+    return wrapper
+
+def join_commands(commands, max_length) -> list:
+    """Joins commands into as few ';' separated messages as fit into max_length
+    characters. Commands after ';' are prefixed with ':' so that every header is
+    resolved from the root of the command tree."""
+    messages = []
+    message = ''
+    for command in commands:
+        part = command if command.startswith((':', '*')) else ':' + command
+        if message and len(message) + 1 + len(part) <= max_length:
+            message += ';' + part
+        else:
+            if message:
+                messages.append(message)
+            message = command
+    if message:
+        messages.append(message)
+    return messages
+
+class SCPIInstrument:
+    """Connection and SCPI primitives shared by the instrument drivers.
+
+    Drivers define `name` used in messages and `opc_commands` awaited with *OPC?
+    (see SCPIInstrument.Pacing), and implement their commands with _get_data,
+    _write_data, _get_bytes and _get_block_into. Drivers of instruments which
+    accept ';' joined SCPI commands mix in SCPIBatching.
+    Sessions are shared: instruments opened with the same dev_info use one
+    VISA session from one ResourceManager.
+    With transport='SOCKET' a 'TCPIP::host::port::SOCKET' resource is connected
+    with a raw TCP socket (see SCPIInstrument.SocketTransport), pyvisa is not needed."""
+
+    name = 'instrument'
+    opc_commands = ()
+    # Longest message sent by batch, limited by the instrument input buffer
+    max_message_length = 256
+    # Commands after which the state cache is discarded
+    state_invalidating_commands = ('*RST', '*CLS')
+    # Subtrees of related settings, a write below one of them discards the cached
+    # settings below it, e.g. resolution changes NPLC of the same function
+    state_subtrees = ()
+
+    def __init__(self, dev_info, read_termination = None, write_termination = None, delay = 0.05, timeout = None, pacing = 'NONE', transport = 'VISA') -> None:
+
+        self._instrument_connected = False
+        self._dev_info = dev_info
+        self._pacing = PacingPolicy(pacing, delay, self.opc_commands)
+        self._batch = None
+        self._state = None
+        self._sinks = []
+        self._transport = transport
+        self._connect(dev_info, read_termination, write_termination, timeout)
+
+    def _connect(self, dev_info, read_termination, write_termination, timeout) -> None:
+        try:
+            self._inst = open_session(dev_info, read_termination, write_termination, timeout, self._transport)
+            self._instrument_connected = True
+        except:
+            print(f'Check connection with {self.name}')
+
+    def _get_data(self, query, delay = None) -> str:
+        self._flush_batch()
+        cached = self._state_lookup(query)
+        if cached is not None:
+            return cached
+        if self._instrument_connected:
+            timer = self._timer('query', query)
+            try:
+                timer.slept(self._pacing.before_command())
+                self._inst.write(query)
+                timer.sent(len(query) + len(self._inst.write_termination or ''))
+                recv = self._inst.read()
+                timer.first_byte(self._first_byte_time())
+                timer.received(len(recv) + len(self._inst.read_termination or ''))
+                self._pacing.record()
+                self._state_store(query, recv)
+                sleep = self._pacing.delay_after() if delay is None else delay
+                timer.finish(self._sinks, sleep_after=sleep)
+                time.sleep(sleep)
+                return recv
+            except Exception as e:
+                timer.finish(self._sinks, e)
+                self._command_failed()
+                print('Can not query data from the instrument')
+
+        else:
+            self._not_connected('query', query)
+        return None
+
+    def _get_bytes(self, query) -> list:
+        buffer = bytearray()
+        length = self._get_block_into(query, buffer)
+        return None if length is None else list(buffer)
+
+    def _get_block_into(self, query, buffer, offset = 0) -> int:
+        """Sends the query and reads the IEEE 488.2 definite length block
+        (#NXXXXXXXXX<data>) of the response into the buffer starting at byte offset.
+        A bytearray is extended to the needed size. Returns number of data bytes or None."""
+        self._flush_batch()
+        if self._instrument_connected:
+            timer = self._timer('block', query)
+            try:
+                timer.slept(self._pacing.before_command())
+                self._inst.write(query)
+                timer.sent(len(query) + len(self._inst.write_termination or ''))
+                header = self._inst.read_bytes(2)
+                timer.first_byte(self._first_byte_time())
+                if header[:1] != b'#':
+                    timer.finish(self._sinks, ValueError('Invalid binary block header'))
+                    print(f'Invalid binary block header received from {self.name}')
+                    return None
+                length = int(self._inst.read_bytes(int(header[1:2])))
+                timer.received(2 + int(header[1:2]) + length)
+                if isinstance(buffer, bytearray) and len(buffer) < offset + length:
+                    buffer.extend(bytes(offset + length - len(buffer)))
+                view = memoryview(buffer).cast('B')[offset:]
+                fits = length <= len(view)
+                position = 0
+                if fits and isinstance(self._inst, SocketResource):
+                    position = self._inst.read_into(view[:length])
+                while position < length:
+                    data = self._inst.read_bytes(min(length - position, BLOCK_READ_SIZE))
+                    if fits:
+                        view[position:position + len(data)] = data
+                    position += len(data)
+                if self._inst.read_termination:
+                    timer.received(len(self._inst.read_bytes(len(self._inst.read_termination), break_on_termchar=True)))
+                self._pacing.record()
+                sleep = self._pacing.delay_after()
+                timer.finish(self._sinks, None if fits else ValueError('Buffer is too small'), sleep)
+                time.sleep(sleep)
+                if not fits:
+                    print('Buffer is too small for the received data')
+                    return None
+                return length
+            except Exception as e:
+                timer.finish(self._sinks, e)
+                self._command_failed()
+                print('Can not query data from the instrument')
+
+        else:
+            self._not_connected('block', query)
+        return None
+
+    def _write_data(self, data) -> bool:
+        self._before_write(data)
+        # Commands of a batch are all sent, the state cache does not know the
+        # values queued before them
+        if self._batch is not None:
+            self._batch.append(data)
+            return True
+        if self._state_unchanged(data):
+            return True
+        if self._instrument_connected:
+            timer = self._timer('write', data)
+            try:
+                timer.slept(self._pacing.before_command())
+                self._inst.write(data)
+                timer.sent(len(data) + len(self._inst.write_termination or ''))
+                if self._pacing.opc_due(data):
+                    start = time.monotonic()
+                    self._inst.query('*OPC?')
+                    self._pacing.record_opc(data, time.monotonic() - start)
+                self._pacing.record()
+                sleep = self._pacing.delay_after()
+                self._state_record(data)
+                timer.finish(self._sinks, sleep_after=sleep)
+                time.sleep(sleep)
+                return True
+            except Exception as e:
+                timer.finish(self._sinks, e)
+                self._command_failed()
+                print(f'Can not send data to the {self.name}')
+                print('Reason:', e)
+
+        else:
+            self._command_failed()
+            self._not_connected('write', data)
+        return False
+
+    def _run(self, steps):
+        """Runs the generator of an io_method, results of the transport calls are sent back"""
+        try:
+            result = next(steps)
+            while True:
+                result = steps.send(result)
+        except StopIteration as stop:
+            return stop.value
+
+    def _sleep(self, seconds) -> None:
+        """Sleep usable in io_method, `yield self._sleep(seconds)`"""
+        time.sleep(seconds)
+
+    def _before_write(self, data) -> None:
+        """Called with every message passed to _write_data, drivers override it
+        to track settings changed by the message"""
+        pass
+
+    def add_sink(self, sink) -> None:
+        """Attaches a sink which receives a CommandRecord with timing, byte counts
+        and error of every command (see SCPIInstrument.Instrumentation), e.g.
+        HistogramSink(), JSONLinesSink('commands.jsonl') or any callable.
+        Without sinks the commands are not timed."""
+        self._sinks.append(sink)
+
+    def remove_sink(self, sink) -> None:
+        self._sinks.remove(sink)
+
+    def _timer(self, kind, command):
+        return CommandTimer(self.name, kind, command) if self._sinks else NULL_TIMER
+
+    def _first_byte_time(self) -> float:
+        """Arrival time of the first byte of the last reply if the transport knows it"""
+        return self._inst.first_byte_time if isinstance(self._inst, SocketResource) else None
+
+    def _not_connected(self, kind, command) -> None:
+        self._timer(kind, command).finish(self._sinks, ConnectionError(f'{self.name} is not connected'))
+        print(f'{self.name} is not connected')
+
+    def enable_state_cache(self, enabled = True) -> None:
+        """Enables or disables the cache of written settings.
+
+        With the cache enabled, a setting command ('HEADER value') is not sent again
+        when the same value was already written, and a query of the setting
+        ('HEADER?') is answered from the last reply as long as the setting was not
+        changed. The cache is discarded after the state_invalidating_commands
+        (e.g. *RST, *CLS) and after any failed command. A changed setting in one
+        of the state_subtrees discards the other cached settings of the subtree.
+        Settings changed on the front panel are not seen, use it only while the
+        instrument is in the remote mode."""
+        self._state = {} if enabled else None
+
+    def _state_unchanged(self, data) -> bool:
+        """Returns True if the setting is already set to the written value"""
+        if self._state is None or self._state_invalidated(data):
+            return False
+        key, value = self._state_setting(data)
+        return key in self._state and self._state[key][0] == value
+
+    def _state_record(self, data) -> None:
+        """Records the setting after the command was sent successfully"""
+        if self._state is None or self._state_invalidated(data):
+            return
+        key, value = self._state_setting(data)
+        if key is None or (key in self._state and self._state[key][0] == value):
+            return
+        for subtree in self._state_subtrees(key):
+            for related in [other for other in self._state if other.startswith(subtree)]:
+                del self._state[related]
+        self._state[key] = (value, None)
+
+    def _state_setting(self, data) -> tuple:
+        """Header and value of a single setting command, (None, None) for other messages"""
+        header, _, value = data.strip().lstrip(':').partition(' ')
+        if ';' in data or not value or header.endswith('?'):
+            return None, None
+        return header.upper(), value.strip()
+
+    def _state_subtrees(self, key) -> list:
+        """Prefixes of the state_subtrees which contain the setting"""
+        return [f'{subtree}:' for subtree in self.state_subtrees if key.startswith(f'{subtree}:')]
+
+    def _state_lookup(self, query) -> str:
+        """Returns cached reply to the setting query, or None"""
+        if self._state is None or self._state_invalidated(query):
+            return None
+        entry = self._state.get(query.strip().lstrip(':').upper()[:-1])
+        return None if entry is None else entry[1]
+
+    def _state_invalidated(self, message) -> bool:
+        """Discards the cache if the message contains one of state_invalidating_commands"""
+        if any(command.strip().lstrip(':').upper().startswith(self.state_invalidating_commands)
+               for command in message.split(';')):
+            self._state.clear()
+            return True
+        return False
+
+    def _state_store(self, query, reply) -> None:
+        if self._state is None or not query.strip().endswith('?'):
+            return
+        key = query.strip().lstrip(':').upper()[:-1]
+        if key in self._state:
+            self._state[key] = (self._state[key][0], reply)
+
+    def _command_failed(self) -> None:
+        self._pacing.record(False)
+        if self._state is not None:
+            self._state.clear()
+
+    def _flush_batch(self) -> bool:
+        if not self._batch:
+            return True
+        commands, self._batch = self._batch, []
+        return self._write_commands(commands)
+
+    @io_method
+    def _write_commands(self, commands) -> bool:
+        """Writes the commands joined into as few messages as fit into max_message_length"""
+        batch, self._batch = self._batch, None
+        status = True
+        for message in join_commands(commands, self.max_message_length):
+            status = (yield self._write_data(message)) and status
+        if status:
+            for command in commands:
+                self._state_record(command)
+        self._batch = batch
+        return status
+
+    def close_connection(self) -> None:
+        """Close connection"""
+        if self._instrument_connected:
+            close_session(self._dev_info)
+            self._instrument_connected = False
+
+    @staticmethod
+    def list_instruments()->str:
+        return get_resource_manager().list_resources()
+
+class SCPIBatching:
+    """batch() and the SYST:ERR? error queue of instruments which accept ';' joined
+    SCPI commands, mixed into their drivers, e.g. class Fluke8846A(SCPIBatching, SCPIInstrument)"""
+
+    @contextmanager
+    def batch(self):
+        """Collects commands written inside the with block and sends them as few
+        ';' joined messages when the block ends, followed by one error queue check.
+        Queries inside the block send the collected commands first.
+
+        e.g.
+            with dmm.batch():
+                dmm.set_dc_current('6E-1', 'MAX')
+                dmm.set_trigger_source('EXT')
+        """
+        if self._batch is not None:
+            yield self
+            return
+        self._batch = []
+        try:
+            yield self
+        except:
+            # Collected commands are discarded, they were not recorded in the state cache
+            self._batch = None
+            self._batch_discarded()
+            raise
+        self._flush_batch()
+        self._batch = None
+        self.get_errors()
+
+    def _batch_discarded(self) -> None:
+        """Called when a batch raised and its collected commands were not sent,
+        drivers forget settings they remembered when the commands were queued"""
+        pass
+
+    @io_method
+    def get_errors(self, max_errors = 20) -> list:
+        """Reads the error queue until it is empty.
+
+        Returns
+        -------
+        list of str - errors reported by the instrument, e.g. ['-113,"Undefined header"'].
+        """
+        errors = []
+        for _ in range(max_errors):
+            error = yield self._get_data('SYST:ERR?')
+            if error is None or error.strip().lstrip('+').startswith('0'):
+                break
+            errors.append(error.strip())
+            print(f'{self.name} error: {error.strip()}')
+        return errors
@@ -0,0 +1,124 @@
+import socket
+import time
+
+# Size of the reusable receive buffer, large binary blocks are received directly into the destination
+RECV_SIZE = 65_536
+
+def parse_socket_resource(dev_info):
+    """Returns host and port of a 'TCPIP::host::port::SOCKET' resource string, or None"""
+    parts = dev_info.split('::')
+    if len(parts) != 4 or not parts[0].upper().startswith('TCPIP') or parts[3].upper() != 'SOCKET':
+        return None
+    return parts[1], int(parts[2])
+
+class SocketResource:
+    """Raw TCP connection to a 'TCPIP::host::port::SOCKET' resource without VISA.
+
+    Implements the part of the pyvisa resource interface used by SCPIInstrument
+    (write, read, query, read_bytes, timeout in ms, close) and read_into, which
+    receives a binary block directly into a caller's buffer.
+    The socket stays open until close() and has TCP_NODELAY set, so short
+    commands are not delayed by Nagle's algorithm. Without a read or write
+    termination '\\n' is used."""
+
+    def __init__(self, dev_info, read_termination = None, write_termination = None, timeout = None) -> None:
+        address = parse_socket_resource(dev_info)
+        if address is None:
+            raise ValueError(f'{dev_info} is not a TCPIP::host::port::SOCKET resource')
+        self.read_termination = read_termination or '\n'
+        self.write_termination = write_termination or '\n'
+        self.__buffer = bytearray(RECV_SIZE)
+        self.__start = 0
+        self.__end = 0
+        # perf_counter time of the first byte received after the last write
+        self.first_byte_time = None
+        self.__awaiting_reply = False
+        self.__socket = socket.create_connection(address, None if timeout is None else timeout/1000)
+        self.__socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    @property
+    def timeout(self) -> float:
+        """Timeout in milliseconds, None waits forever"""
+        timeout = self.__socket.gettimeout()
+        return None if timeout is None else timeout*1000
+
+    @timeout.setter
+    def timeout(self, value) -> None:
+        self.__socket.settimeout(None if value is None else value/1000)
+
+    def write(self, message) -> int:
+        data = (message + self.write_termination).encode()
+        self.__socket.sendall(data)
+        self.first_byte_time = None
+        self.__awaiting_reply = True
+        return len(data)
+
+    def read(self) -> str:
+        """Reads up to the last character of read termination and strips the termination"""
+        termchar = self.read_termination.encode()[-1:]
+        line = bytearray()
+        while True:
+            index = self.__buffer.find(termchar, self.__start, self.__end)
+            if index >= 0:
+                line += self.__buffer[self.__start:index + 1]
+                self.__start = index + 1
+                break
+            line += self.__buffer[self.__start:self.__end]
+            self.__fill()
+        line = line.decode()
+        if line.endswith(self.read_termination):
+            return line[:-len(self.read_termination)]
+        return line[:-1]
+
+    def query(self, message) -> str:
+        self.write(message)
+        return self.read()
+
+    def read_bytes(self, count, break_on_termchar = False) -> bytes:
+        """Reads count bytes, or less if break_on_termchar and the termination character is received"""
+        termchar = self.read_termination.encode()[-1:]
+        data = bytearray()
+        while len(data) < count:
+            if self.__start == self.__end:
+                self.__fill()
+            stop = min(self.__end, self.__start + count - len(data))
+            if break_on_termchar:
+                index = self.__buffer.find(termchar, self.__start, stop)
+                if index >= 0:
+                    data += self.__buffer[self.__start:index + 1]
+                    self.__start = index + 1
+                    break
+            data += self.__buffer[self.__start:stop]
+            self.__start = stop
+        return bytes(data)
+
+    def read_into(self, view) -> int:
+        """Fills the writable memoryview with received bytes and returns its length.
+        Only bytes already buffered are copied, the rest is received in place."""
+        view = memoryview(view).cast('B')
+        buffered = min(self.__end - self.__start, len(view))
+        view[:buffered] = self.__buffer[self.__start:self.__start + buffered]
+        self.__start += buffered
+        position = buffered
+        while position < len(view):
+            received = self.__socket.recv_into(view[position:])
+            if received == 0:
+                raise ConnectionError('Connection closed by the instrument')
+            self.__received()
+            position += received
+        return position
+
+    def close(self) -> None:
+        self.__socket.close()
+
+    def __fill(self) -> None:
+        self.__start = 0
+        self.__end = self.__socket.recv_into(self.__buffer)
+        if self.__end == 0:
+            raise ConnectionError('Connection closed by the instrument')
+        self.__received()
+
+    def __received(self) -> None:
+        if self.__awaiting_reply:
+            self.first_byte_time = time.perf_counter()
+            self.__awaiting_reply = False
@@ -0,0 +1,209 @@
+import random
+import socketserver
+import threading
+import time
+from collections import deque
+
+VOWELS = 'AEIOU'
+
+def short_header(header) -> str:
+    """Returns the SCPI short form of a command header, e.g.
+    ':SENSe:CURRent:AC:BANDwidth?' -> 'SENS:CURR:AC:BAND?'.
+    A node is shortened to 4 letters, or 3 if the fourth letter is a vowel,
+    numeric suffixes (CHAN1, FETC2) are kept."""
+    header = header.strip().lstrip(':').upper()
+    if header.startswith('*'):
+        return header
+    query = header.endswith('?')
+    nodes = []
+    for node in header.rstrip('?').split(':'):
+        name = node.rstrip('0123456789')
+        suffix = node[len(name):]
+        if len(name) > 4:
+            name = name[:3] if name[3] in VOWELS else name[:4]
+        nodes.append(name + suffix)
+    return ':'.join(nodes) + ('?' if query else '')
+
+class LinkModel:
+    """Timing of the connection between the computer and the simulated instrument.
+
+    Every message waits `latency` seconds plus a random jitter with standard
+    deviation `jitter`, and replies are sent at `bandwidth` bytes per second
+    (None for unlimited)."""
+
+    def __init__(self, latency = 0.0, bandwidth = None, jitter = 0.0, seed = None) -> None:
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.jitter = jitter
+        self.__random = random.Random(seed)
+
+    def delay(self, size = 0) -> float:
+        """Seconds needed to answer a message with a reply of `size` bytes"""
+        delay = self.latency
+        if self.jitter:
+            delay += abs(self.__random.gauss(0, self.jitter))
+        if self.bandwidth:
+            delay += size/self.bandwidth
+        return delay
+
+# Typical links, latency in s and bandwidth in bytes/s
+LINK_MODELS = {
+    'IDEAL': dict(latency=0.0, bandwidth=None, jitter=0.0),
+    'LAN': dict(latency=0.0005, bandwidth=10e6, jitter=0.0002),
+    'USB': dict(latency=0.001, bandwidth=4e6, jitter=0.0005),
+    'SERIAL': dict(latency=0.005, bandwidth=11_520, jitter=0.001),
+}
+
+class SimulatedInstrument:
+    """Base of the simulated instruments.
+
+    Messages are split into ';' separated commands and dispatched by the short
+    form of their header to handlers registered with register(header, handler).
+    A handler gets the argument string and returns the reply (str or bytes) or
+    None. Commands without a handler which carry a value ('HEADER value') are
+    stored as settings and answered by 'HEADER?'. Unknown commands put
+    -113,"Undefined header" into the error queue read by SYST:ERR?."""
+
+    idn = 'SIMULATED,INSTRUMENT,0,0'
+    # Termination of replies sent by the instrument
+    termination = '\n'
+
+    def __init__(self, time_scale = 1.0, seed = None) -> None:
+        self.time_scale = time_scale
+        self.seed = seed
+        self.lock = threading.Lock()
+        self.settings = {}
+        self.errors = deque(maxlen=20)
+        self.commands = {}
+        self.register('*IDN?', lambda args: self.idn)
+        self.register('*OPC?', lambda args: '1')
+        self.register('*OPC', lambda args: None)
+        self.register('*TST', lambda args: None)
+        self.register('*TST?', lambda args: '0')
+        self.register('*RST', lambda args: self.reset())
+        self.register('*CLS', lambda args: self.errors.clear())
+        self.register('SYST:ERR?', lambda args: self.errors.popleft() if self.errors else '+0,"No error"')
+        self.reset()
+
+    def register(self, header, handler) -> None:
+        self.commands[short_header(header)] = handler
+
+    def reset(self) -> None:
+        """Restores the power-on settings"""
+        self.settings.clear()
+
+    def now(self) -> float:
+        """Simulated time in seconds, time_scale times faster than the real time"""
+        return time.monotonic()*self.time_scale
+
+    def sleep(self, seconds) -> None:
+        """Waits for simulated seconds"""
+        if seconds > 0:
+            time.sleep(seconds/self.time_scale)
+
+    def execute(self, message) -> bytes:
+        """Executes a message and returns the reply without termination, or None"""
+        replies = []
+        with self.lock:
+            for command in message.split(';'):
+                header, _, args = command.strip().partition(' ')
+                if not header:
+                    continue
+                try:
+                    reply = self.dispatch(short_header(header), args.strip())
+                except (ValueError, IndexError):
+                    self.errors.append('-222,"Data out of range"')
+                    reply = None
+                if reply is not None:
+                    replies.append(reply if isinstance(reply, bytes) else reply.encode())
+        return b';'.join(replies) if replies else None
+
+    def dispatch(self, header, args):
+        if header in self.commands:
+            return self.commands[header](args)
+        if header.endswith('?') and header[:-1] in self.settings:
+            return self.settings[header[:-1]]
+        if args and not header.endswith('?'):
+            self.settings[header] = args
+            return None
+        self.errors.append('-113,"Undefined header"')
+        return None
+
+class SCPIServer:
+    """TCP server which exposes a simulated instrument as a raw socket resource.
+
+    e.g.
+        with SCPIServer(SimFluke8846A(), link=LinkModel(**LINK_MODELS['LAN'])) as server:
+            dmm = Fluke8846A(server.resource, transport='SOCKET')
+
+    Messages are terminated with '\\n' ('\\r\\n' is accepted), replies with the
+    termination of the instrument. Port 0 selects a free port."""
+
+    def __init__(self, instrument, host = '127.0.0.1', port = 0, link = None) -> None:
+        self.instrument = instrument
+        self.link = LinkModel() if link is None else link
+        self.messages = 0
+        self.bytes_sent = 0
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self) -> None:
+                termination = server.instrument.termination.encode()
+                for line in self.rfile:
+                    message = line.rstrip(b'\r\n').decode(errors='replace')
+                    if not message:
+                        continue
+                    reply = server.instrument.execute(message)
+                    size = 0 if reply is None else len(reply) + len(termination)
+                    time.sleep(server.link.delay(size))
+                    server.messages += 1
+                    if reply is not None:
+                        self.wfile.write(reply + termination)
+                        self.wfile.flush()
+                        server.bytes_sent += size
+
+        self.__server = socketserver.ThreadingTCPServer((host, port), Handler, bind_and_activate=False)
+        self.__server.allow_reuse_address = True
+        self.__server.daemon_threads = True
+        self.__thread = None
+
+    @property
+    def address(self) -> tuple:
+        return self.__server.server_address
+
+    @property
+    def resource(self) -> str:
+        """Resource string of the server, e.g. 'TCPIP::127.0.0.1::5025::SOCKET'"""
+        host, port = self.address[:2]
+        return f'TCPIP::{host}::{port}::SOCKET'
+
+    def start(self) -> str:
+        """Starts serving in a background thread and returns the resource string"""
+        self.__server.server_bind()
+        self.__server.server_activate()
+        self.__thread = threading.Thread(target=self.__server.serve_forever, daemon=True)
+        self.__thread.start()
+        return self.resource
+
+    def stop(self) -> None:
+        if self.__thread is not None:
+            self.__server.shutdown()
+            self.__thread.join()
+            self.__thread = None
+        self.__server.server_close()
+
+    def serve_forever(self) -> None:
+        """Serves in the calling thread until interrupted"""
+        self.__server.server_bind()
+        self.__server.server_activate()
+        try:
+            self.__server.serve_forever()
+        finally:
+            self.__server.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.stop()
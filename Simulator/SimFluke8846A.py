@@ -0,0 +1,275 @@
+import math
+import numpy as np
+from Simulator.SCPIServer import SimulatedInstrument
+
+# Readings kept in the meter memory
+MEMORY_SIZE = 5000
+LINE_FREQUENCY = 50
+# Time needed for one reading on top of the integration time, s
+READING_OVERHEAD = 0.0003
+OVERLOAD = 9.9E37
+# Noise of one reading as a fraction of the range for every NPLC setting
+NPLC_NOISE = {0.02: 1e-4, 0.2: 1e-5, 1: 3e-6, 10: 1e-6, 100: 3e-7}
+FUNCTIONS = {
+    'VOLT:DC': (0.1, 1, 10, 100, 1000),
+    'VOLT:AC': (0.1, 1, 10, 100, 750),
+    'CURR:DC': (1e-4, 1e-3, 1e-2, 0.1, 0.4, 1, 3, 10),
+    'CURR:AC': (1e-4, 1e-3, 1e-2, 0.1, 0.4, 1, 3, 10),
+    'RES': (10, 100, 1e3, 1e4, 1e5, 1e6, 1e7, 1e8, 1e9),
+    'FRES': (10, 100, 1e3, 1e4, 1e5, 1e6, 1e7, 1e8, 1e9),
+    'FREQ': (0.1, 1, 10, 100, 750),
+    'PER': (0.1, 1, 10, 100, 750),
+    'CAP': (1e-9, 1e-8, 1e-7, 1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 0.1),
+    'TEMP': (1000,),
+    'CONT': (1000,),
+    'DIOD': (10,),
+    'VOLT:DC:RAT': (10,),
+}
+# Measured signal of every function
+SIGNALS = {'VOLT:DC': 1.0, 'VOLT:AC': 0.5, 'CURR:DC': 1.3e-4, 'CURR:AC': 1.0e-3, 'RES': 100.0,
+           'FRES': 100.0, 'FREQ': 50.0, 'PER': 0.02, 'CAP': 1e-7, 'TEMP': 23.0, 'CONT': 0.1,
+           'DIOD': 0.6, 'VOLT:DC:RAT': 1.0}
+# Parameters of a function set with [SENS:]<function>:<parameter>
+PARAMETERS = ('RANG:AUTO', 'RANG', 'RES', 'NPLC', 'BAND', 'TRAN:FRTD:R0')
+
+def format_readings(values) -> str:
+    return ','.join(f'{value:+.8E}' for value in values)
+
+class SimFluke8846A(SimulatedInstrument):
+    """Simulated Fluke 8846A multimeter.
+
+    Readings are taken at NPLC/LINE_FREQUENCY + READING_OVERHEAD s after INIT
+    into a MEMORY_SIZE readings memory, their noise depends on range and NPLC
+    (NPLC_NOISE). FETC? waits for the end of the acquisition, R? removes
+    readings from the memory during it and DATA:POIN? returns their number.
+    Readings which do not fit into the full memory are lost and counted in
+    `lost`. FETC2? returns the secondary display (frequency of the signal).
+    With probability `overload_probability` a reading is an overload 9.9E37.
+    External and bus triggers are taken immediately."""
+
+    idn = 'FLUKE,8846A,0000000,08/02/10-11:53'
+    termination = '\r\n'
+
+    def __init__(self, signals = None, frequency = 50.0, overload_probability = 0.0, time_scale = 1.0, seed = None) -> None:
+        self.signals = dict(SIGNALS, **(signals or {}))
+        self.frequency = frequency
+        self.overload_probability = overload_probability
+        self.random = np.random.default_rng(seed)
+        super().__init__(time_scale, seed)
+        self.register('CONF?', lambda args: f'"{self.function} {self.range():+.8E},{self.resolution():+.8E}"')
+        self.register('FUNC?', lambda args: f'"{self.function}"')
+        self.register('TRIG:COUN', self.__set_trigger_count)
+        self.register('TRIG:COUN?', lambda args: f'{self.trigger_count:+.8E}')
+        self.register('SAMP:COUN', self.__set_sample_count)
+        self.register('SAMP:COUN?', lambda args: f'{self.sample_count:+d}')
+        self.register('INIT', lambda args: self.initiate())
+        self.register('ABOR', lambda args: self.abort())
+        self.register('*TRG', lambda args: None)
+        self.register('FETC?', lambda args: self.fetch())
+        self.register('FETC1?', lambda args: self.fetch())
+        self.register('FETC2?', lambda args: self.fetch(secondary=True))
+        self.register('READ?', lambda args: self.initiate() or self.fetch())
+        self.register('DATA:POIN?', lambda args: str(self.points()))
+        self.register('R?', self.remove)
+        self.register('SYST:LOC', lambda args: None)
+        self.register('SYST:REM', lambda args: None)
+
+    def reset(self) -> None:
+        super().reset()
+        self.function = 'VOLT:DC'
+        self.parameters = {function: {'RANG': 10.0 if function == 'VOLT:DC' else ranges[-1],
+                                      'RANG:AUTO': 'ON', 'NPLC': 10.0}
+                           for function, ranges in FUNCTIONS.items()}
+        self.trigger_count = 1
+        self.sample_count = 1
+        self.settings['TRIG:SOUR'] = 'IMM'
+        self.settings['TRIG:DEL'] = '+1.00000000E-03'
+        self.lost = 0
+        self.__memory = np.empty(0)
+        self.__start = None
+        self.__total = 0
+        self.__produced = 0
+
+    def dispatch(self, header, args):
+        query = header.endswith('?')
+        path = header.rstrip('?')
+        if path.startswith('CONF:') and not query:
+            return self.configure(path[5:], args)
+        if path.startswith('MEAS:') and query:
+            self.configure(path[5:], args)
+            self.initiate()
+            return self.fetch()
+        function, parameter = self.__function_parameter(path[5:] if path.startswith('SENS:') else path)
+        if function is not None:
+            return self.__parameter(function, parameter, args, query)
+        return super().dispatch(header, args)
+
+    def configure(self, function, args) -> None:
+        """CONF:<function> [range[, resolution]]"""
+        function = 'VOLT:DC' if function == 'VOLT' else 'CURR:DC' if function == 'CURR' else function
+        function = function.replace('TEMP:FRTD', 'TEMP').replace('TEMP:RTD', 'TEMP')
+        if function not in FUNCTIONS:
+            self.errors.append('-113,"Undefined header"')
+            return
+        values = [value.strip() for value in args.split(',') if value.strip()]
+        self.function = function
+        self.__set_range(function, values[0] if values else 'DEF')
+        self.__set_resolution(function, values[1] if len(values) > 1 else 'DEF')
+        self.trigger_count = 1
+        self.sample_count = 1
+        self.settings['TRIG:SOUR'] = 'IMM'
+        self.abort()
+
+    def range(self, function = None) -> float:
+        function = self.function if function is None else function
+        return self.parameters[function]['RANG']
+
+    def nplc(self, function = None) -> float:
+        function = self.function if function is None else function
+        return self.parameters[function]['NPLC']
+
+    def resolution(self, function = None) -> float:
+        return self.range(function)*NPLC_NOISE[self.nplc(function)]
+
+    def reading_time(self) -> float:
+        """Simulated seconds needed for one reading"""
+        return self.nplc()/LINE_FREQUENCY + READING_OVERHEAD
+
+    def initiate(self) -> None:
+        self.__memory = np.empty(0)
+        self.__start = self.now()
+        self.__total = self.trigger_count*self.sample_count
+        self.__produced = 0
+
+    def abort(self) -> None:
+        self.__update()
+        self.__total = self.__produced
+
+    def points(self) -> int:
+        """Number of readings in the memory"""
+        self.__update()
+        return len(self.__memory)
+
+    def fetch(self, secondary = False) -> str:
+        """Waits for the end of the acquisition and returns the readings in memory"""
+        if self.__start is None:
+            self.errors.append('-230,"Data stale"')
+            return ''
+        if math.isinf(self.__total):
+            self.errors.append('-221,"Settings conflict"')
+            return ''
+        self.sleep(self.__start + self.__total*self.reading_time() - self.now())
+        self.__update()
+        if secondary:
+            values = self.frequency*(1 + 1e-5*self.random.standard_normal(len(self.__memory)))
+            return format_readings(values)
+        return format_readings(self.__memory)
+
+    def remove(self, args) -> bytes:
+        """R? [count] - removes up to count oldest readings and returns them as a definite length block"""
+        self.__update()
+        count = len(self.__memory) if not args else min(int(float(args)), len(self.__memory))
+        values, self.__memory = self.__memory[:count], self.__memory[count:]
+        text = format_readings(values).encode()
+        length = str(len(text)).encode()
+        return b'#' + str(len(length)).encode() + length + text
+
+    def __update(self) -> None:
+        """Moves readings taken since the last update into the memory"""
+        if self.__start is None:
+            return
+        produced = min(self.__total, max(0, math.floor((self.now() - self.__start)/self.reading_time())))
+        new = int(produced - self.__produced)
+        if new <= 0:
+            return
+        self.__produced = produced
+        keep = min(new, MEMORY_SIZE - len(self.__memory))
+        self.lost += new - keep
+        self.__memory = np.concatenate([self.__memory, self.__readings(keep)])
+
+    def __readings(self, count) -> np.ndarray:
+        signal = self.signals[self.function]
+        noise = self.range()*NPLC_NOISE[self.nplc()]
+        values = signal + noise*self.random.standard_normal(count)
+        overload = abs(signal) > 1.2*self.range()
+        if self.overload_probability:
+            overload = overload | (self.random.random(count) < self.overload_probability)
+        return np.where(overload, OVERLOAD, values)
+
+    def __function_parameter(self, path):
+        for function in sorted(FUNCTIONS, key=len, reverse=True):
+            if path.startswith(function + ':'):
+                parameter = path[len(function) + 1:]
+                if parameter in PARAMETERS:
+                    return function, parameter
+        for alias, function in (('VOLT', 'VOLT:DC'), ('CURR', 'CURR:DC')):
+            if path.startswith(alias + ':') and path[len(alias) + 1:] in PARAMETERS:
+                return function, path[len(alias) + 1:]
+        return None, None
+
+    def __parameter(self, function, parameter, args, query):
+        if query:
+            if parameter == 'RES':
+                return f'{self.resolution(function):+.8E}'
+            value = self.parameters[function].get(parameter, 0.0)
+            if parameter == 'RANG:AUTO':
+                return '1' if value == 'ON' else '0'
+            return value if isinstance(value, str) else f'{value:+.8E}'
+        if parameter == 'RANG':
+            self.__set_range(function, args)
+        elif parameter == 'RES':
+            self.__set_resolution(function, args)
+        elif parameter == 'NPLC':
+            self.__set_nplc(function, args)
+        elif parameter == 'RANG:AUTO':
+            self.parameters[function][parameter] = 'ON' if args.upper() in ('ON', '1') else 'OFF'
+        else:
+            self.parameters[function][parameter] = float(args)
+        return None
+
+    def __set_range(self, function, value) -> None:
+        ranges = FUNCTIONS[function]
+        value = value.upper()
+        if value in ('DEF', 'AUTO'):
+            signal = abs(self.signals[function])
+            self.parameters[function]['RANG'] = next((r for r in ranges if signal <= r), ranges[-1])
+            self.parameters[function]['RANG:AUTO'] = 'ON'
+            return
+        if value == 'MIN':
+            selected = ranges[0]
+        elif value == 'MAX':
+            selected = ranges[-1]
+        else:
+            selected = next((r for r in ranges if float(value) <= r*1.0001), None)
+            if selected is None:
+                raise ValueError(value)
+        self.parameters[function]['RANG'] = selected
+        self.parameters[function]['RANG:AUTO'] = 'OFF'
+
+    def __set_resolution(self, function, value) -> None:
+        value = value.upper()
+        if value == 'MIN':
+            nplc = 100
+        elif value == 'MAX':
+            nplc = 0.02
+        elif value == 'DEF':
+            nplc = 10
+        else:
+            ratio = float(value)/self.range(function)
+            nplc = next((n for n in sorted(NPLC_NOISE) if NPLC_NOISE[n] <= ratio*1.0001), 100)
+        self.parameters[function]['NPLC'] = nplc
+
+    def __set_nplc(self, function, value) -> None:
+        value = value.upper()
+        nplc = {'MIN': 0.02, 'MAX': 100, 'DEF': 10}.get(value)
+        if nplc is None:
+            nplc = min(NPLC_NOISE, key=lambda n: abs(n - float(value)))
+        self.parameters[function]['NPLC'] = nplc
+
+    def __set_trigger_count(self, args) -> None:
+        value = args.upper()
+        self.trigger_count = math.inf if value == 'INF' else {'MIN': 1, 'MAX': 50000, 'DEF': 1}.get(value) or int(float(value))
+
+    def __set_sample_count(self, args) -> None:
+        value = args.upper()
+        self.sample_count = {'MIN': 1, 'MAX': 50000, 'DEF': 1}.get(value) or int(float(value))
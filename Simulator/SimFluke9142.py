@@ -0,0 +1,103 @@
+import math
+import random
+from Simulator.SCPIServer import SimulatedInstrument
+
+# Callendar-Van Dusen coefficients of a PT100 probe
+R0 = 100.0
+CVD_A = 3.9083e-3
+CVD_B = -5.775e-7
+CVD_C = -4.183e-12
+
+def pt100_resistance(temperature) -> float:
+    """Resistance of a PT100 probe at the temperature in deg C"""
+    t = temperature
+    c = CVD_C*(t - 100)*t**3 if t < 0 else 0.0
+    return R0*(1 + CVD_A*t + CVD_B*t**2 + c)
+
+class SimFluke9142(SimulatedInstrument):
+    """Simulated Fluke 9142 dry block calibrator.
+
+    With the output enabled the block temperature moves to the set point at
+    most `ramp_rate` deg C/s and settles exponentially with `time_constant` s.
+    With the output disabled it drifts to the ambient temperature. Stability
+    is the rate of change of the block temperature in deg C/min, SOUR:STAB:TEST?
+    reports 1 when it is below the stability limit."""
+
+    idn = 'FLUKE,9142,B00000,1.00'
+
+    def __init__(self, ambient = 23.0, ramp_rate = 0.3, time_constant = 60.0, noise = 0.002, time_scale = 1.0, seed = None) -> None:
+        self.ambient = ambient
+        self.ramp_rate = ramp_rate
+        self.time_constant = time_constant
+        self.noise = noise
+        self.random = random.Random(seed)
+        super().__init__(time_scale, seed)
+        self.register('READ?', lambda args: f'{self.__reading(self.temperature()):.3f}')
+        self.register('SENS1:DATA?', lambda args: f'{pt100_resistance(self.__reading(self.temperature())):.4f}')
+        self.register('SOUR:SENS:DATA?', self.__control_data)
+        self.register('SOUR:SPO', self.__set_setpoint)
+        self.register('SOUR:SPO?', lambda args: f'{self.setpoint:.2f}')
+        self.register('OUTP:STAT', self.__set_output)
+        self.register('OUTP:STAT?', lambda args: '1' if self.output else '0')
+        self.register('OUT:STAT?', lambda args: '1' if self.output else '0')
+        self.register('SOUR:STAB:LIM', self.__set_stability_limit)
+        self.register('SOUR:STAB:LIM?', lambda args: f'{self.stability_limit:.2f}')
+        self.register('SOUR:STAB:TEST?', lambda args: '1' if self.stability() < self.stability_limit else '0')
+        self.register('SOUR:STAB:DAT?', lambda args: f'{self.stability():.3f}')
+        self.register('SOUR:STAB:DATA?', lambda args: f'{self.stability():.3f}')
+        self.register('SYST:BEEP:IMM', lambda args: None)
+
+    def reset(self) -> None:
+        super().reset()
+        self.setpoint = 25.0
+        self.output = False
+        self.stability_limit = 0.05
+        self.__temperature = self.ambient
+        self.__rate = 0.0
+        self.__time = self.now()
+
+    def temperature(self) -> float:
+        """Block temperature at the current simulated time"""
+        now = self.now()
+        dt = now - self.__time
+        if dt <= 0:
+            return self.__temperature
+        target, tau = (self.setpoint, self.time_constant) if self.output else (self.ambient, 5*self.time_constant)
+        step = (target - self.__temperature)*(1 - math.exp(-dt/tau))
+        limit = self.ramp_rate*dt
+        step = max(-limit, min(limit, step))
+        self.__temperature += step
+        self.__rate = step/dt
+        self.__time = now
+        return self.__temperature
+
+    def stability(self) -> float:
+        """Rate of change of the block temperature in deg C/min"""
+        self.temperature()
+        return abs(self.__rate)*60 + abs(self.random.gauss(0, self.noise))
+
+    def __reading(self, temperature) -> float:
+        return temperature + self.random.gauss(0, self.noise)
+
+    def __control_data(self, args) -> str:
+        temperature = self.__reading(self.temperature())
+        if args.upper().startswith('RES'):
+            return f'{pt100_resistance(temperature):.4f}'
+        return f'{temperature:.3f}'
+
+    def __set_setpoint(self, args) -> None:
+        value = float(args)
+        if not -25 <= value <= 150:
+            raise ValueError(args)
+        self.temperature()
+        self.setpoint = value
+
+    def __set_output(self, args) -> None:
+        self.temperature()
+        self.output = args.strip().upper() in ('1', 'ON')
+
+    def __set_stability_limit(self, args) -> None:
+        value = float(args)
+        if not 0.01 <= value <= 9.99:
+            raise ValueError(args)
+        self.stability_limit = value
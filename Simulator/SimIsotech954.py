@@ -0,0 +1,31 @@
+import re
+from Simulator.SCPIServer import SimulatedInstrument
+
+CHANNEL_COMMAND = re.compile(r'C0([1-8])$')
+
+class SimIsotech954(SimulatedInstrument):
+    """Simulated Isotech 954 8 way selector switch.
+
+    C0<n> selects channel n after `switching_time` simulated seconds and sends
+    no reply. The selected channel is kept in `channel`, number of switchings
+    in `switch_count`."""
+
+    idn = 'ISOTECH,954,0,0'
+
+    def __init__(self, switching_time = 0.05, time_scale = 1.0, seed = None) -> None:
+        self.switching_time = switching_time
+        self.switch_count = 0
+        super().__init__(time_scale, seed)
+
+    def reset(self) -> None:
+        super().reset()
+        self.channel = 0
+
+    def dispatch(self, header, args):
+        match = CHANNEL_COMMAND.match(header)
+        if match:
+            self.sleep(self.switching_time)
+            self.channel = int(match.group(1))
+            self.switch_count += 1
+            return None
+        return super().dispatch(header, args)
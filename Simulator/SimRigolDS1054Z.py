@@ -0,0 +1,192 @@
+import numpy as np
+from Simulator.SCPIServer import SimulatedInstrument, short_header
+
+# Valid memory depths for the number of enabled channels
+MEMORY_DEPTHS = {1: (12000, 120000, 1200000, 12000000, 24000000),
+                 2: (6000, 60000, 600000, 6000000, 12000000),
+                 3: (3000, 30000, 300000, 3000000, 6000000),
+                 4: (3000, 30000, 300000, 3000000, 6000000)}
+SCREEN_POINTS = 1200
+HORIZONTAL_DIVISIONS = 12
+# Waveform codes per vertical division
+CODES_PER_DIVISION = 25
+Y_REFERENCE = 127
+# Largest number of points returned by one :WAV:DATA? for every format
+MAX_READ_POINTS = {'BYTE': 250_000, 'WORD': 125_000, 'ASC': 15_625}
+FORMAT_CODES = {'BYTE': 0, 'WORD': 1, 'ASC': 2}
+MODE_CODES = {'NORM': 0, 'MAX': 1, 'RAW': 2}
+# Shape, frequency in Hz and amplitude in V of the signal on every channel
+SIGNALS = {'CHAN1': ('SIN', 1e3, 2.0), 'CHAN2': ('SQU', 1e3, 1.0),
+           'CHAN3': ('TRI', 500.0, 3.0), 'CHAN4': ('SIN', 10e3, 0.5)}
+NOISE_TABLE_SIZE = 65536
+
+def definite_length_block(data) -> bytes:
+    """IEEE 488.2 block as sent by the oscilloscope, #9 and 9 digits of length"""
+    return b'#9' + f'{len(data):09d}'.encode() + data
+
+class SimRigolDS1054Z(SimulatedInstrument):
+    """Simulated Rigol DS1054Z oscilloscope.
+
+    Channels show the SIGNALS with Gaussian noise of `noise` V. :SING arms the
+    trigger, the status is WAIT for `trigger_wait` s, TD while the waveform
+    length (12 divisions of :TIM:SCAL) is acquired, and STOP afterwards; :TFOR
+    triggers at once. Every acquisition has new noise.
+    :WAV:DATA? returns the :WAV:STAR to :WAV:STOP window of the screen (NORM)
+    or of the memory (RAW, MAX in the stop state) as a #9 block, limited to
+    MAX_READ_POINTS of the format. Memory depth has to be one of MEMORY_DEPTHS
+    of the enabled channels (:CHAN<n>:DISP)."""
+
+    idn = 'RIGOL TECHNOLOGIES,DS1104Z,DS1ZA000000000,00.04.04.SP3'
+
+    def __init__(self, signals = None, noise = 0.02, trigger_wait = 0.01, time_scale = 1.0, seed = None) -> None:
+        self.signals = dict(SIGNALS, **(signals or {}))
+        self.noise = noise
+        self.trigger_wait = trigger_wait
+        self.__noise_table = np.random.default_rng(seed).standard_normal(NOISE_TABLE_SIZE)
+        super().__init__(time_scale, seed)
+        self.register(':RUN', lambda args: self.__set_state('RUN'))
+        self.register(':STOP', lambda args: self.__set_state('STOP'))
+        self.register(':SING', lambda args: self.__set_state('SING'))
+        self.register(':TFOR', lambda args: self.__force_trigger())
+        self.register('AUT', lambda args: self.__set_state('RUN'))
+        self.register('CLE', lambda args: None)
+        self.register(':TRIG:STAT?', lambda args: self.trigger_status())
+        self.register(':ACQ:MDEP', self.__set_memory_depth)
+        self.register(':ACQ:MDEP?', lambda args: 'AUTO' if self.memory_depth is None else str(self.memory_depth))
+        self.register(':ACQ:SRAT?', lambda args: f'{self.sample_rate():.6e}')
+        self.register(':WAV:SOUR', lambda args: self.__set_waveform('source', short_header(args)))
+        self.register(':WAV:MODE', lambda args: self.__set_waveform('mode', short_header(args), MODE_CODES))
+        self.register(':WAV:FORM', lambda args: self.__set_waveform('format', short_header(args), FORMAT_CODES))
+        self.register(':WAV:SOUR?', lambda args: self.waveform['source'])
+        self.register(':WAV:MODE?', lambda args: self.waveform['mode'])
+        self.register(':WAV:FORM?', lambda args: self.waveform['format'])
+        self.register(':WAV:STAR', lambda args: self.__set_waveform('start', int(args)))
+        self.register(':WAV:STOP', lambda args: self.__set_waveform('stop', int(args)))
+        self.register(':WAV:STAR?', lambda args: str(self.waveform['start']))
+        self.register(':WAV:STOP?', lambda args: str(self.waveform['stop']))
+        self.register(':WAV:PRE?', lambda args: self.preamble())
+        self.register(':WAV:DATA?', lambda args: self.waveform_data())
+
+    def reset(self) -> None:
+        super().reset()
+        self.settings.update({'TIM:SCAL': '1.000000e-03', 'TIM:OFFS': '0.000000e+00',
+                              'ACQ:TYPE': 'NORM', 'ACQ:AVER': '2', 'TRIG:SWE': 'AUTO'})
+        for n in range(1, 5):
+            self.settings.update({f'CHAN{n}:DISP': '1', f'CHAN{n}:SCAL': '1.000000e+00',
+                                  f'CHAN{n}:OFFS': '0.000000e+00'})
+        self.waveform = {'source': 'CHAN1', 'mode': 'NORM', 'format': 'BYTE', 'start': 1, 'stop': SCREEN_POINTS}
+        self.memory_depth = None
+        self.acquisition = 0
+        self.__state = 'RUN'
+        self.__armed = None
+        self.__triggered = None
+
+    def enabled_channels(self) -> int:
+        return max(1, sum(self.settings[f'CHAN{n}:DISP'] in ('1', 'ON') for n in range(1, 5)))
+
+    def points(self) -> int:
+        """Points in the memory"""
+        if self.memory_depth is None:
+            return MEMORY_DEPTHS[self.enabled_channels()][0]
+        return self.memory_depth
+
+    def sample_rate(self) -> float:
+        return self.points()/(HORIZONTAL_DIVISIONS*float(self.settings['TIM:SCAL']))
+
+    def trigger_status(self) -> str:
+        """TD, WAIT, RUN, AUTO or STOP at the current simulated time"""
+        if self.__state == 'RUN':
+            return 'AUTO' if self.settings['TRIG:SWE'] == 'AUTO' else 'RUN'
+        if self.__state == 'STOP':
+            return 'STOP'
+        now = self.now()
+        if self.__triggered is None and now >= self.__armed + self.trigger_wait:
+            self.__triggered = self.__armed + self.trigger_wait
+        if self.__triggered is None:
+            return 'WAIT'
+        if now < self.__triggered + HORIZONTAL_DIVISIONS*float(self.settings['TIM:SCAL']):
+            return 'TD'
+        self.__state = 'STOP'
+        self.acquisition += 1
+        return 'STOP'
+
+    def preamble(self) -> str:
+        scale = float(self.settings['TIM:SCAL'])
+        points, x_increment = self.__window_geometry()
+        y_increment = self.__channel_scale()/CODES_PER_DIVISION
+        y_origin = round(float(self.settings.get(f'{self.waveform["source"]}:OFFS', 0))/y_increment)
+        x_origin = -HORIZONTAL_DIVISIONS/2*scale + float(self.settings['TIM:OFFS'])
+        return (f'{FORMAT_CODES[self.waveform["format"]]},{MODE_CODES[self.waveform["mode"]]},{points},1,'
+                f'{x_increment:.6e},{x_origin:.6e},0,{y_increment:.6e},{y_origin},{Y_REFERENCE}')
+
+    def waveform_data(self) -> bytes:
+        points, _ = self.__window_geometry()
+        start = max(1, self.waveform['start'])
+        stop = min(self.waveform['stop'], points)
+        if stop - start + 1 > MAX_READ_POINTS[self.waveform['format']]:
+            self.errors.append('-222,"Data out of range"')
+            stop = start + MAX_READ_POINTS[self.waveform['format']] - 1
+        if self.__state == 'RUN':
+            self.acquisition += 1
+        codes = self.__codes(np.arange(start - 1, max(start - 1, stop)))
+        if self.waveform['format'] == 'WORD':
+            return definite_length_block(codes.astype('<u2').tobytes())
+        if self.waveform['format'] == 'ASC':
+            preamble = self.preamble().split(',')
+            voltage = (codes - float(preamble[8]) - Y_REFERENCE)*float(preamble[7])
+            return definite_length_block(''.join(f'{value:.6e},' for value in voltage).encode())
+        return definite_length_block(codes.tobytes())
+
+    def __window_geometry(self):
+        """Number of points and time between points of the selected waveform"""
+        length = HORIZONTAL_DIVISIONS*float(self.settings['TIM:SCAL'])
+        memory = self.waveform['mode'] == 'RAW' or (self.waveform['mode'] == 'MAX' and self.__state == 'STOP')
+        if memory:
+            return self.points(), length/self.points()
+        return SCREEN_POINTS, length/SCREEN_POINTS
+
+    def __channel_scale(self) -> float:
+        return float(self.settings.get(f'{self.waveform["source"]}:SCAL', 1.0))
+
+    def __codes(self, index) -> np.ndarray:
+        source = self.waveform['source']
+        if source not in self.signals:
+            return np.zeros(len(index), dtype=np.uint8)
+        shape, frequency, amplitude = self.signals[source]
+        preamble = self.preamble().split(',')
+        x_increment, x_origin, y_increment = float(preamble[4]), float(preamble[5]), float(preamble[7])
+        phase = frequency*(x_origin + index*x_increment) % 1.0
+        if shape == 'SQU':
+            wave = np.where(phase < 0.5, 1.0, -1.0)
+        elif shape == 'TRI':
+            wave = 1 - 4*np.abs(phase - 0.5)
+        else:
+            wave = np.sin(2*np.pi*phase)
+        noise = self.__noise_table[(index + 7919*self.acquisition) % NOISE_TABLE_SIZE]
+        voltage = amplitude*wave + self.noise*noise
+        codes = np.rint(voltage/y_increment) + float(preamble[8]) + Y_REFERENCE
+        return np.clip(codes, 0, 255).astype(np.uint8)
+
+    def __set_state(self, state) -> None:
+        self.__state = state
+        if state == 'SING':
+            self.__armed = self.now()
+            self.__triggered = None
+
+    def __force_trigger(self) -> None:
+        if self.__state == 'SING' and self.__triggered is None:
+            self.__triggered = self.now()
+
+    def __set_memory_depth(self, args) -> None:
+        if args.upper() == 'AUTO':
+            self.memory_depth = None
+            return
+        depth = int(float(args))
+        if depth not in MEMORY_DEPTHS[self.enabled_channels()]:
+            raise ValueError(args)
+        self.memory_depth = depth
+
+    def __set_waveform(self, name, value, valid = None) -> None:
+        if valid is not None and value not in valid:
+            raise ValueError(value)
+        self.waveform[name] = value
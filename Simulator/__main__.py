@@ -0,0 +1,38 @@
+"""Runs a simulated instrument on a TCP port, e.g.
+
+    python -m Simulator Fluke8846A --port 3490 --link LAN
+
+and connect to it with Fluke8846A('TCPIP::127.0.0.1::3490::SOCKET', transport='SOCKET')."""
+import argparse
+from Simulator.SCPIServer import SCPIServer, LinkModel, LINK_MODELS
+from Simulator.SimFluke8846A import SimFluke8846A
+from Simulator.SimFluke9142 import SimFluke9142
+from Simulator.SimIsotech954 import SimIsotech954
+from Simulator.SimRigolDS1054Z import SimRigolDS1054Z
+
+INSTRUMENTS = {'Fluke8846A': SimFluke8846A, 'Fluke9142': SimFluke9142,
+               'Isotech954': SimIsotech954, 'RigolDS1054Z': SimRigolDS1054Z}
+
+parser = argparse.ArgumentParser(prog='python -m Simulator', description='Simulated SCPI instrument')
+parser.add_argument('instrument', choices=INSTRUMENTS)
+parser.add_argument('--host', default='127.0.0.1')
+parser.add_argument('--port', type=int, default=5025)
+parser.add_argument('--link', choices=LINK_MODELS, default='IDEAL', help='typical link timing')
+parser.add_argument('--latency', type=float, help='latency of every message in s')
+parser.add_argument('--bandwidth', type=float, help='reply bandwidth in bytes/s')
+parser.add_argument('--jitter', type=float, help='standard deviation of the latency in s')
+parser.add_argument('--time-scale', type=float, default=1.0, help='speed up of the simulated time')
+parser.add_argument('--seed', type=int)
+args = parser.parse_args()
+
+link = dict(LINK_MODELS[args.link])
+for name in ('latency', 'bandwidth', 'jitter'):
+    if getattr(args, name) is not None:
+        link[name] = getattr(args, name)
+server = SCPIServer(INSTRUMENTS[args.instrument](time_scale=args.time_scale, seed=args.seed),
+                    args.host, args.port, LinkModel(**link, seed=args.seed))
+print(f'Simulated {args.instrument} at {server.resource}')
+try:
+    server.serve_forever()
+except KeyboardInterrupt:
+    pass
@@ -1,33 +1,36 @@
-from Fluke8846A.Fluke8846A import Fluke8846A
+from Fluke8846A.Fluke8846A import Fluke8846A, OVERLOAD
+from Fluke8846A.Statistics import ReadingStatistics
 import time
+import numpy as np
 
 instr = Fluke8846A('TCPIP::169.254.1.2::3490::SOCKET', read_termination='\n', write_termination='\n', timeout = 100_000)
 instr.clear_status()
 
-instr.clear_status()
-instr.set_dc_current('6E-1', 'MAX')
-#instr.set_ac_current(range = 'DEF', resolution='MAX')
-#instr.set_ac_current_bandwidth(200)
+with instr.batch():
+    instr.clear_status()
+    instr.set_dc_current('6E-1', 'MAX')
+    #instr.set_ac_current(range = 'DEF', resolution='MAX')
+    #instr.set_ac_current_bandwidth(200)
 
-instr.set_trigger_source('EXT')
-instr.set_trigger_delay()
-instr.switch_to_remote()
-instr.set_trigger_count(5000)
-instr.set_samples_per_trigger()
-instr.set_display_status('OFF')
+    instr.set_trigger_source('EXT')
+    instr.set_trigger_delay()
+    instr.switch_to_remote()
+    instr.set_trigger_count(5000)
+    instr.set_samples_per_trigger()
+    instr.set_display_status('OFF')
 
 instr.init_wait_for_triger()
-data = instr.fetch_data()
+# Overload readings are kept as +-9.9E37 in the csv file
+data = instr.fetch_data(as_array=True, overload=None)
 print(data)
 instr.set_display_status('ON')
 
-with open('500mA.csv', "w", newline='') as f:
-    try:
-        rows=data.strip().split(',')
-        
-        for i in rows:
-            f.write(i+'\n')
-    except:
-        print('Error')
+if data is not None:
+    np.savetxt('500mA.csv', data, fmt='%+.8E')
+    stats = ReadingStatistics()
+    stats.update(np.where(np.abs(data) >= OVERLOAD, np.nan, data))
+    print(stats.summary())
+else:
+    print('Error')
 
 
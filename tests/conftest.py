@@ -0,0 +1,49 @@
+import os
+import sys
+import pytest
+
+# The drivers are imported from the repository root, as the scripts do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Simulator.SCPIServer import SCPIServer
+from Simulator.SimFluke8846A import SimFluke8846A
+from Simulator.SimRigolDS1054Z import SimRigolDS1054Z
+from Fluke8846A.Fluke8846A import Fluke8846A
+from RigolDS1054Z.Oscilloscope import Oscilloscope
+
+def log_messages(instrument, messages):
+    """Appends every message executed by the simulated instrument to messages"""
+    execute = instrument.execute
+    def logged(message):
+        messages.append(message)
+        return execute(message)
+    instrument.execute = logged
+    return instrument
+
+@pytest.fixture
+def messages() -> list:
+    return []
+
+@pytest.fixture
+def fluke_server(messages):
+    with SCPIServer(log_messages(SimFluke8846A(time_scale=10, seed=1), messages)) as server:
+        yield server
+
+@pytest.fixture
+def dmm(fluke_server, messages):
+    dmm = Fluke8846A(fluke_server.resource, transport='SOCKET')
+    messages.clear()
+    yield dmm
+    dmm.close_connection()
+
+@pytest.fixture
+def rigol_server(messages):
+    with SCPIServer(log_messages(SimRigolDS1054Z(seed=1), messages)) as server:
+        yield server
+
+@pytest.fixture
+def osc(rigol_server, messages):
+    osc = Oscilloscope(rigol_server.resource, transport='SOCKET')
+    messages.clear()
+    yield osc
+    osc.rigol.close_connection()
@@ -0,0 +1,70 @@
+import asyncio
+from Simulator.SCPIServer import SCPIServer
+from Simulator.SimIsotech954 import SimIsotech954
+from Isotech954.Isotech954 import Isotech954
+from Isotech954.AsyncIsotech954 import AsyncIsotech954
+from Fluke8846A.AsyncFluke8846A import AsyncFluke8846A
+
+def writes(messages) -> list:
+    return [message for message in messages if not message.endswith('?')]
+
+def sent(dmm, messages) -> list:
+    """Commands executed by the simulator, after the written ones were processed"""
+    dmm.get_operation_complete_bit()
+    return writes(messages)
+
+def test_batch_sends_one_message(dmm, fluke_server, messages):
+    dmm.enable_state_cache()
+    with dmm.batch():
+        dmm.set_trigger_count(6)
+        dmm.set_samples_per_trigger(2)
+    # Errors of the batch are read when it is sent
+    assert messages[-1] == 'SYST:ERR?'
+    assert sent(dmm, messages) == ['TRIG:COUN 6;:SAMP:COUN 2']
+    assert (fluke_server.instrument.trigger_count, fluke_server.instrument.sample_count) == (6, 2)
+    # Settings of the sent batch are cached
+    assert dmm.set_trigger_count(6)
+    assert len(sent(dmm, messages)) == 1
+
+
+def test_batch_inside_batch_is_sent_with_it(dmm, messages):
+    with dmm.batch():
+        dmm.set_trigger_count(3)
+        with dmm.batch():
+            dmm.set_samples_per_trigger(4)
+        assert writes(messages) == []
+    assert sent(dmm, messages) == ['TRIG:COUN 3;:SAMP:COUN 4']
+
+def test_query_sends_collected_commands(dmm, messages):
+    with dmm.batch():
+        dmm.set_trigger_count(3)
+        assert float(dmm._get_data('TRIG:COUN?')) == 3
+
+def test_get_errors(dmm):
+    assert dmm._write_data('FOO:BAR')
+    assert dmm.get_errors() == ['-113,"Undefined header"']
+    assert dmm.get_errors() == []
+
+def test_async_batch(fluke_server, messages):
+    async def run():
+        dmm = AsyncFluke8846A(fluke_server.resource)
+        try:
+            async with dmm.batch():
+                await dmm.set_trigger_count(6)
+                await dmm.set_samples_per_trigger(2)
+            return await dmm.get_errors()
+        finally:
+            await dmm.close_connection()
+    assert asyncio.run(run()) == []
+    assert writes(messages) == ['TRIG:COUN 6;:SAMP:COUN 2']
+
+def test_switch_has_no_batch():
+    # The Isotech 954 is not a SCPI instrument
+    with SCPIServer(SimIsotech954()) as server:
+        switch = Isotech954(server.resource, transport='SOCKET')
+        try:
+            assert not hasattr(switch, 'batch') and not hasattr(switch, 'get_errors')
+            assert switch.switch_to_channel(3) == 3
+        finally:
+            switch.close_connection()
+    assert not hasattr(AsyncIsotech954, 'batch') and not hasattr(AsyncIsotech954, 'get_errors')
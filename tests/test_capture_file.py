@@ -0,0 +1,35 @@
+import os
+import numpy as np
+import pytest
+from RigolDS1054Z.CaptureFile import CaptureFile, envelope_filename
+
+CHANNELS = ['CHAN1', 'CHAN2']
+
+def test_save_capture(osc, tmp_path):
+    assert osc.rigol.stop()
+    filename = str(tmp_path/'capture.cap')
+    assert osc.save_capture(filename, CHANNELS, format='WORD')
+    assert os.path.exists(envelope_filename(filename))
+
+    with CaptureFile(filename) as capture:
+        assert capture.channels == CHANNELS
+        for channel in CHANNELS:
+            raw = osc.get_memory_data(channel, format='WORD')
+            p = osc.rigol.get_waveform_preamble()
+            assert capture.preamble(channel) == p._asdict()
+            np.testing.assert_array_equal(capture.raw(channel), raw)
+            voltage = capture.voltage(channel, 100, 200)
+            np.testing.assert_allclose(voltage, (raw[100:200] - p.y_origin - p.y_reference)*p.y_increment)
+        time = capture.time()
+        assert len(time) == len(raw) and time[1] - time[0] == pytest.approx(p.x_increment)
+
+        capture.to_csv(tmp_path/'capture.csv')
+        table = np.loadtxt(tmp_path/'capture.csv', delimiter=',')
+        assert table.shape == (len(raw), 3)
+        np.testing.assert_allclose(table[:, 2], capture.voltage('CHAN2'), rtol=1e-6)
+
+def test_not_a_capture(tmp_path):
+    filename = tmp_path/'other.cap'
+    filename.write_bytes(b'\0'*64)
+    with pytest.raises(ValueError):
+        CaptureFile(filename)
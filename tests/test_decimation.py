@@ -0,0 +1,64 @@
+import numpy as np
+from RigolDS1054Z.CaptureFile import CaptureFile, CaptureWriter, envelope_filename
+from RigolDS1054Z.Decimation import EnvelopePyramid, lttb, save_pyramids
+from RigolDS1054Z.RigolDS1054Z import WaveformPreamble
+
+POINTS = 100_000
+
+def samples() -> np.ndarray:
+    rng = np.random.default_rng(1)
+    return rng.integers(0, 256, POINTS).astype(np.uint8)
+
+def test_chunked_pyramid(tmp_path):
+    data = samples()
+    pyramid = EnvelopePyramid(factor=4, levels=5)
+    for start in range(0, POINTS, 7777):
+        pyramid.update(data[start:start + 7777])
+    pyramid.finish()
+    assert pyramid.points == POINTS
+    for k in range(pyramid.levels):
+        size = pyramid.bin_size(k)
+        padded = np.pad(data, (0, -POINTS % size), mode='edge').reshape(-1, size)
+        mins, maxs = pyramid.level(k)
+        np.testing.assert_array_equal(mins, padded.min(axis=1))
+        np.testing.assert_array_equal(maxs, padded.max(axis=1))
+
+    index, mins, maxs = pyramid.envelope(1000, 50_000, width=1000)
+    assert index[0] <= 1000 and index[-1] < 50_000 and len(mins) >= 1000
+    assert pyramid.envelope(0, 500, width=1000) is None
+
+    save_pyramids(tmp_path/'pyramid.npz', {'CHAN1': pyramid})
+    with np.load(tmp_path/'pyramid.npz') as arrays:
+        loaded = EnvelopePyramid.from_arrays(arrays, 'CHAN1_')
+        for k in range(pyramid.levels):
+            np.testing.assert_array_equal(loaded.level(k)[1], pyramid.level(k)[1])
+
+def test_lttb_keeps_ends_and_peaks():
+    y = np.zeros(10_000)
+    y[5_000] = 1.0
+    selected = lttb(y, 100)
+    assert len(selected) == 100 and selected[0] == 0 and selected[-1] == 9_999
+    assert 5_000 in selected
+    assert np.all(np.diff(selected) > 0)
+    np.testing.assert_array_equal(lttb(y[:50], 100), np.arange(50))
+
+def test_capture_envelope(tmp_path):
+    data = samples()
+    preamble = WaveformPreamble(0, 2, POINTS, 1, 1e-6, 0.0, 0, 0.01, 0, 127)
+    filename = str(tmp_path/'capture.cap')
+    with CaptureWriter(filename) as writer:
+        writer.add_channel('CHAN1', preamble, data)
+        writer.add_channel('CHAN2', preamble, data)
+    pyramid = EnvelopePyramid()
+    pyramid.update(data)
+    pyramid.finish()
+    save_pyramids(envelope_filename(filename), {'CHAN1': pyramid})
+
+    with CaptureFile(filename) as capture:
+        time, mins, maxs = capture.envelope('CHAN1', width=100)
+        assert len(time) == len(mins) >= 100
+        assert np.all(mins <= maxs)
+        assert mins.min() == capture.voltage('CHAN1').min()
+        # Without a stored pyramid the samples are reduced with lttb
+        time, mins, maxs = capture.envelope('CHAN2', width=100)
+        assert len(time) == 200 and mins is maxs
@@ -0,0 +1,31 @@
+import asyncio
+import numpy as np
+from Fluke8846A.AsyncFluke8846A import AsyncFluke8846A
+from Fluke8846A.MeasurementConfig import MeasurementConfig
+
+AC = MeasurementConfig('VOLT:AC', range=1, sample_count=20)
+
+def test_fetch_both_displays(dmm, messages):
+    assert dmm.apply_config(AC)
+    assert dmm.init_wait_for_triger()
+    messages.clear()
+    readings = dmm.fetch_both_displays()
+    assert readings.shape == (20, 2)
+    assert np.all(np.abs(readings[:, 0] - 0.5) < 0.01)
+    assert np.all(np.abs(readings[:, 1] - 50.0) < 0.01)
+    assert messages == ['FETC1?;:FETC2?']
+
+def test_displays_of_different_length(dmm):
+    assert dmm._both_displays('+1.0E+00,+2.0E+00;+5.0E+01', np.nan) is None
+    np.testing.assert_array_equal(dmm._both_displays('+1.0E+00;+9.9E+37', 0.0), [[1.0, 0.0]])
+
+def test_async_fetch_both_displays(fluke_server):
+    async def run():
+        dmm = AsyncFluke8846A(fluke_server.resource)
+        try:
+            assert await dmm.apply_config(AC)
+            assert await dmm.init_wait_for_triger()
+            return await dmm.fetch_both_displays()
+        finally:
+            await dmm.close_connection()
+    assert asyncio.run(run()).shape == (20, 2)
@@ -0,0 +1,51 @@
+import json
+import pytest
+from SCPIInstrument.Instrumentation import HistogramSink, JSONLinesSink, histogram_bin, HISTOGRAM_SIZE
+
+def test_command_records(dmm):
+    records = []
+    dmm.add_sink(records.append)
+    assert dmm.set_trigger_count(3)
+    assert dmm.get_operation_complete_bit()
+    dmm.remove_sink(records.append)
+    dmm.get_operation_complete_bit()
+
+    write, query = records
+    assert (write.kind, write.command, write.header) == ('write', 'TRIG:COUN 3', 'TRIG:COUN')
+    assert write.bytes_sent == len('TRIG:COUN 3\r\n') and write.bytes_received == 0
+    assert (query.kind, query.command) == ('query', '*OPC?')
+    assert query.bytes_received == len('1\r\n')
+    for record in records:
+        assert record.success and record.error is None
+        assert min(record.send, record.wait, record.transfer, record.sleep) >= 0
+        assert record.total == pytest.approx(record.send + record.wait + record.transfer + record.sleep)
+
+def test_failed_command_is_recorded(dmm):
+    records = []
+    dmm.add_sink(records.append)
+    dmm.close_connection()
+    assert dmm.get_operation_complete_bit() is None
+    assert not records[-1].success and 'ConnectionError' in records[-1].error
+
+def test_histogram_sink(dmm):
+    sink = HistogramSink()
+    dmm.add_sink(sink)
+    for _ in range(10):
+        assert dmm.get_operation_complete_bit()
+    summary = sink.summary()['*OPC?']
+    assert summary['count'] == 10 and summary['errors'] == 0
+    assert 0 < summary['p50_ms'] <= summary['p99_ms'] <= summary['max_ms']
+    assert summary['bytes_received'] == 10*len('1\r\n')
+    assert histogram_bin(0) == 0 and histogram_bin(1e9) == HISTOGRAM_SIZE - 1
+    sink.reset()
+    assert sink.summary() == {}
+
+def test_json_lines_sink(dmm, tmp_path):
+    sink = JSONLinesSink(tmp_path/'commands.jsonl')
+    dmm.add_sink(sink)
+    assert dmm.set_trigger_count(2)
+    assert dmm.get_operation_complete_bit()
+    sink.close()
+    lines = [json.loads(line) for line in open(tmp_path/'commands.jsonl')]
+    assert [line['command'] for line in lines] == ['TRIG:COUN 2', '*OPC?']
+    assert lines[0]['instrument'] == dmm.name
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from Fluke8846A.MeasurementConfig import MeasurementConfig
+
+FAST = MeasurementConfig('VOLT:DC', range=10, nplc=0.02)
+
+def test_apply_config(dmm, fluke_server, messages):
+    config = MeasurementConfig('CURR:DC', range=0.1, nplc=1, trigger_count=5, sample_count=2)
+    assert dmm.apply_config(config)
+    dmm.get_operation_complete_bit()
+    writes = [message for message in messages if not message.endswith('?')]
+    assert writes == ['CONF:CURR:DC 0.1;:SENS:CURR:DC:NPLC 1;:TRIG:COUN 5;:SAMP:COUN 2']
+    sim = fluke_server.instrument
+    assert (sim.function, sim.trigger_count, sim.sample_count) == ('CURR:DC', 5, 2)
+    assert sim.parameters['CURR:DC']['NPLC'] == 1
+    assert dmm.get_active_config() == config
+
+    messages.clear()
+    assert dmm.apply_config(config)
+    dmm.get_operation_complete_bit()
+    assert messages == ['*OPC?']
+
+    assert dmm.set_trigger_count(3)
+    assert dmm.get_active_config() is None
+    messages.clear()
+    assert dmm.apply_config(config)
+    dmm.get_operation_complete_bit()
+    assert len(messages) > 1
+    assert sim.trigger_count == 5
+
+def test_apply_invalid_config(dmm, messages):
+    assert not dmm.apply_config(MeasurementConfig('VOLT:AC', nplc=1))
+    dmm.get_operation_complete_bit()
+    assert messages == ['*OPC?']
+
+def test_fetch_applied_config(dmm):
+    assert dmm.apply_config(FAST._replace(sample_count=10))
+    assert dmm.init_wait_for_triger()
+    readings = dmm.fetch_data(as_array=True)
+    assert len(readings) == 10
+    assert np.all(np.abs(readings - 1.0) < 0.01)
+
+def test_config_of_discarded_batch(dmm, fluke_server):
+    with pytest.raises(RuntimeError):
+        with dmm.batch():
+            assert dmm.apply_config(MeasurementConfig('CURR:DC', range=0.1, nplc=1))
+            raise RuntimeError
+    dmm.get_operation_complete_bit()
+    assert fluke_server.instrument.function == 'VOLT:DC'
+    assert dmm.get_active_config() is None
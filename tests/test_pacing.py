@@ -0,0 +1,63 @@
+import time
+import pytest
+from SCPIInstrument.Pacing import PacingPolicy
+from Fluke8846A.Fluke8846A import Fluke8846A
+
+def test_opc_after_long_commands(dmm, messages):
+    assert dmm.set_trigger_count(2)
+    assert dmm._write_data('CONF:VOLT:DC 10')
+    assert dmm._write_data('TRIG:COUN 3;:CONF:RES 100')
+    assert messages == ['TRIG:COUN 2', 'CONF:VOLT:DC 10', '*OPC?', 'TRIG:COUN 3;:CONF:RES 100', '*OPC?']
+
+def test_modes_without_opc():
+    for mode in ('FIXED', 'NONE'):
+        pacing = PacingPolicy(mode, delay=0.2, opc_commands=('CONF',))
+        assert not pacing.needs_opc('CONF:VOLT:DC') and not pacing.opc_due('CONF:VOLT:DC')
+        pacing.record()
+        assert pacing.wait_time() == 0.0
+    assert PacingPolicy('FIXED', delay=0.2).delay_after() == 0.2
+    assert PacingPolicy('OPC', delay=0.2).delay_after() == 0.0
+    with pytest.raises(ValueError):
+        PacingPolicy('SLEEP')
+
+def test_adaptive_interval():
+    pacing = PacingPolicy('ADAPTIVE', opc_commands=('CONF',), max_interval=0.5)
+    assert pacing.opc_due('TRIG:COUN 2')
+    pacing.record_opc('CONF:VOLT:DC', 0.3)
+    assert pacing.opc_time is None
+    pacing.record_opc('TRIG:COUN 2', 0.01)
+    assert pacing.opc_time == 0.01 and pacing.interval == 0.01
+    pacing.record_opc('TRIG:COUN 2', 0.02)
+    assert pacing.opc_time == pytest.approx(0.012)
+    for _ in range(PacingPolicy.ADAPTIVE_PROBE - 1):
+        pacing.record()
+        assert not pacing.opc_due('TRIG:COUN 2')
+    pacing.record()
+    assert pacing.opc_due('TRIG:COUN 2')
+
+    # Failed commands double the interval until max_interval, successes halve it
+    pacing.record(False)
+    assert pacing.interval == pytest.approx(0.024)
+    for _ in range(10):
+        pacing.record(False)
+    assert pacing.interval == 0.5
+    for _ in range(PacingPolicy.ADAPTIVE_SUCCESSES):
+        pacing.record()
+    assert pacing.interval == pytest.approx(pacing.opc_time*PacingPolicy.ADAPTIVE_MAX_BACKOFF/2)
+    pacing.record_opc('TRIG:COUN 2', 0.0)
+    assert 0 < pacing.wait_time() <= pacing.interval
+
+def test_adaptive_driver(fluke_server, messages):
+    dmm = Fluke8846A(fluke_server.resource, transport='SOCKET', pacing='ADAPTIVE')
+    try:
+        messages.clear()
+        assert dmm.set_trigger_count(2)
+        assert messages == ['TRIG:COUN 2', '*OPC?']
+        assert dmm._pacing.opc_time > 0
+        started = time.monotonic()
+        for count in range(3, 8):
+            assert dmm.set_trigger_count(count)
+        assert time.monotonic() - started >= 4*dmm._pacing.interval
+        assert messages.count('*OPC?') == 1
+    finally:
+        dmm.close_connection()
@@ -0,0 +1,84 @@
+import pytest
+
+def test_preamble_is_cached(osc, messages):
+    rigol = osc.rigol
+    assert rigol.set_waveform_channel('CHAN1')
+    assert rigol.set_reading_mode('NORM')
+    assert rigol.set_return_format_waveform('BYTE')
+    first = rigol.get_waveform_preamble()
+    assert rigol.get_waveform_preamble() is first
+    assert messages.count(':WAV:PRE?') == 1
+
+    for command in (':TIM:SCAL 0.0005', ':TIM:OFFS 0.001', ':CHAN1:SCAL 2', ':CHAN1:OFFS 0.5'):
+        count = messages.count(':WAV:PRE?')
+        assert rigol._write_data(command)
+        rigol.get_waveform_preamble()
+        assert messages.count(':WAV:PRE?') == count + 1, command
+    preamble = rigol.get_waveform_preamble()
+    assert preamble.x_increment == first.x_increment/2
+    assert preamble.y_increment == 2*first.y_increment
+
+    # The reading window does not change the preamble
+    count = messages.count(':WAV:PRE?')
+    assert rigol.set_start_point_waveform_data(1)
+    assert rigol.set_stop_point_waveform_data(600)
+    assert rigol.get_waveform_preamble() is preamble
+    assert messages.count(':WAV:PRE?') == count
+
+    # Preambles of other sources are cached separately
+    assert rigol.set_waveform_channel('CHAN2')
+    rigol.get_waveform_preamble()
+    assert rigol.set_waveform_channel('CHAN1')
+    count = messages.count(':WAV:PRE?')
+    assert rigol.get_waveform_preamble() == preamble
+    assert messages.count(':WAV:PRE?') == count
+
+def test_repeated_reads_send_only_data_query(osc, messages):
+    osc.rigol.enable_state_cache()
+    assert osc.rigol.stop()
+    first = osc.get_memory_data('CHAN1')
+    messages.clear()
+    second = osc.get_memory_data('CHAN1')
+    assert messages == [':WAV:DATA?']
+    assert (first == second).all()
+
+def test_repeated_reads_reuse_preamble(osc, messages):
+    assert osc.rigol.stop()
+    osc.get_memory_data('CHAN1')
+    messages.clear()
+    osc.get_memory_data('CHAN1')
+    assert ':WAV:PRE?' not in messages
+
+def test_rejected_source_is_not_recorded(osc, messages):
+    rigol = osc.rigol
+    assert rigol.set_waveform_channel('CHAN2')
+    rigol.get_waveform_preamble()
+    assert not rigol.set_waveform_channel('CHAN5')
+    count = messages.count(':WAV:PRE?')
+    rigol.get_waveform_preamble()
+    assert messages.count(':WAV:PRE?') == count
+
+def test_reset_forgets_source(osc, messages):
+    rigol = osc.rigol
+    assert rigol.set_waveform_channel('CHAN2')
+    assert rigol.reset_instrument()
+    # The preamble read after *RST is of CHAN1, it must not be cached for CHAN2
+    assert rigol.get_waveform_preamble() is not None
+    assert rigol.set_waveform_channel('CHAN2')
+    count = messages.count(':WAV:PRE?')
+    rigol.get_waveform_preamble()
+    assert messages.count(':WAV:PRE?') == count + 1
+
+def test_source_of_discarded_batch(osc, messages):
+    rigol = osc.rigol
+    assert rigol.set_waveform_channel('CHAN1')
+    rigol.get_waveform_preamble()
+    with pytest.raises(RuntimeError):
+        with rigol.batch():
+            assert rigol.set_waveform_channel('CHAN2')
+            raise RuntimeError
+    # CHAN1 is still the source, its preamble must not be cached as the one of CHAN2
+    count = messages.count(':WAV:PRE?')
+    rigol.get_waveform_preamble()
+    rigol.get_waveform_preamble()
+    assert messages.count(':WAV:PRE?') == count + 2
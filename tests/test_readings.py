@@ -0,0 +1,21 @@
+import numpy as np
+import pytest
+from Fluke8846A.Fluke8846A import parse_readings
+from Fluke8846A.MeasurementConfig import MeasurementConfig
+
+def test_parse_readings():
+    readings = parse_readings('+1.00000000E-03,-9.90000000E+37,+2.00000000E+00\r\n')
+    np.testing.assert_array_equal(readings, [1e-3, np.nan, 2.0])
+    np.testing.assert_array_equal(parse_readings('+1.0E+00,+9.9E+37', overload=None), [1.0, 9.9e37])
+    assert len(parse_readings('')) == 0
+    assert parse_readings(None) is None
+    with pytest.raises(ValueError):
+        parse_readings('+1.0E+00,+2.0E+0X,+3.0E+00')
+
+def test_fetch_as_array(dmm):
+    assert dmm.apply_config(MeasurementConfig('VOLT:DC', range=10, nplc=0.02, sample_count=50))
+    assert dmm.init_wait_for_triger()
+    text = dmm.fetch_data()
+    readings = dmm.fetch_data(as_array=True)
+    assert readings.dtype == np.float64 and len(readings) == 50
+    np.testing.assert_array_equal(readings, [float(value) for value in text.split(',')])
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+from RigolDS1054Z.Oscilloscope import MAX_CHUNK_POINTS
+
+DEPTH = 300_000
+
+def capture(osc) -> None:
+    assert osc.rigol.set_memory_depth(DEPTH)
+    assert osc.rigol.single_and_wait()
+
+def test_chunked_raw_readout(osc, messages):
+    capture(osc)
+    messages.clear()
+    chunks = []
+    data = osc.get_memory_data('CHAN1', format='BYTE')
+    assert data.dtype == np.uint8 and len(data) == DEPTH
+    assert messages.count(':WAV:DATA?') == -(-DEPTH//MAX_CHUNK_POINTS['BYTE'])
+    assert osc.rigol.get_errors() == []
+
+    # WORD windows are half as long and split the memory at other points
+    out = np.empty(DEPTH, dtype='<u2')
+    points, format = osc.prepare_reading('CHAN1', 'RAW', 'WORD')
+    assert osc.read_waveform_window(out, points, format, on_chunk=lambda chunk: chunks.append(len(chunk))) is out
+    assert chunks == [125_000, 125_000, 50_000]
+    np.testing.assert_array_equal(out, data)
+
+def test_raw_readout_into_wrong_buffer(osc):
+    capture(osc)
+    points, format = osc.prepare_reading('CHAN1', 'RAW', 'BYTE')
+    for out in (np.empty(points - 1, dtype=np.uint8), np.empty(points, dtype=np.float64),
+                np.empty((points, 2), dtype=np.uint8)[:, 0], list(range(points))):
+        with pytest.raises(ValueError):
+            osc.read_waveform_window(out, points, format)
@@ -0,0 +1,31 @@
+import numpy as np
+from RigolDS1054Z.CaptureFile import CaptureFile
+
+CHANNELS = ['CHAN1', 'CHAN2']
+
+def test_capture_segments(osc, tmp_path):
+    segments, statistics = osc.capture_segments(3, CHANNELS, capacity=2, directory=tmp_path)
+    assert statistics.segments == 3 and statistics.segments_per_second > 0
+    assert len(segments) == 2 and segments.dropped == 0
+    assert [segment.index for segment in segments.segments] == [1, 2]
+    for segment in segments.segments:
+        for channel in CHANNELS:
+            assert len(segment.data[channel]) == segment.preambles[channel].points
+
+    # The oldest segment was written into the directory
+    assert len(segments.spilled) == 1
+    capture = CaptureFile(segments.spilled[0])
+    assert capture.channels == CHANNELS and capture.metadata['index'] == 0
+
+    assert segments.pop().index == 1
+    newest = segments.segments[0]
+    segments.flush()
+    assert len(segments) == 0 and len(segments.spilled) == 2
+    capture = CaptureFile(segments.spilled[1])
+    np.testing.assert_array_equal(capture.raw('CHAN2'), newest.data['CHAN2'])
+    assert capture.preamble('CHAN2') == newest.preambles['CHAN2']._asdict()
+
+def test_segments_without_directory_are_dropped(osc):
+    segments, statistics = osc.capture_segments(3, ['CHAN1'], capacity=1)
+    assert statistics.segments == 3
+    assert len(segments) == 1 and segments.dropped == 2 and segments.spilled == []
@@ -0,0 +1,59 @@
+import socket
+import threading
+import numpy as np
+import pytest
+from SCPIInstrument.SocketTransport import SocketResource, parse_socket_resource, RECV_SIZE
+
+POINTS = 100_000
+
+@pytest.fixture
+def payload() -> bytes:
+    return np.random.default_rng(2).integers(0, 65536, POINTS).astype('<u2').tobytes()
+
+@pytest.fixture
+def server(payload):
+    """Replies to every line with '1' and a definite length block of the payload,
+    the connection is closed after the block if the line is 'LAST?'"""
+    listener = socket.create_server(('127.0.0.1', 0))
+    def serve():
+        connection, _ = listener.accept()
+        with connection, connection.makefile('rb') as lines:
+            for line in lines:
+                length = str(len(payload)).encode()
+                connection.sendall(b'1\n#' + str(len(length)).encode() + length + payload + b'\n')
+                if line.strip() == b'LAST?':
+                    connection.sendall(b'#9')
+                    break
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    yield f'TCPIP::127.0.0.1::{listener.getsockname()[1]}::SOCKET'
+    listener.close()
+
+def test_parse_socket_resource():
+    assert parse_socket_resource('TCPIP0::10.0.0.2::5555::SOCKET') == ('10.0.0.2', 5555)
+    assert parse_socket_resource('TCPIP::10.0.0.2::INSTR') is None
+    with pytest.raises(ValueError):
+        SocketResource('ASRL/dev/ttyUSB0::INSTR')
+
+def test_read_into(server, payload):
+    resource = SocketResource(server, timeout=2000)
+    try:
+        for _ in range(2):
+            assert resource.query('DATA?') == '1'
+            assert resource.first_byte_time is not None
+            assert resource.read_bytes(2) == b'#6'
+            length = int(resource.read_bytes(6))
+            # The start of the block is already buffered, the rest is received in place
+            out = np.empty(length//2, dtype='<u2')
+            assert resource.read_into(out) == length > RECV_SIZE
+            assert out.tobytes() == payload
+            assert resource.read_bytes(10, break_on_termchar=True) == b'\n'
+
+        assert resource.query('LAST?') == '1'
+        resource.read_bytes(8)
+        out = bytearray(len(payload) + 10)
+        with pytest.raises(ConnectionError):
+            resource.read_into(out)
+        assert out[:len(payload)] == payload
+    finally:
+        resource.close()
@@ -0,0 +1,102 @@
+import asyncio
+import pytest
+from Fluke8846A.AsyncFluke8846A import AsyncFluke8846A
+
+def writes(messages) -> list:
+    return [message for message in messages if not message.endswith('?')]
+
+def sent(dmm, messages) -> list:
+    """Commands executed by the simulator, after the written ones were processed"""
+    dmm.get_operation_complete_bit()
+    return writes(messages)
+
+def test_repeated_setting_is_sent_once(dmm, fluke_server, messages):
+    dmm.enable_state_cache()
+    assert dmm.set_trigger_count(5)
+    assert dmm.set_trigger_count(5)
+    assert sent(dmm, messages) == ['TRIG:COUN 5']
+    assert dmm.set_trigger_count(6)
+    assert sent(dmm, messages) == ['TRIG:COUN 5', 'TRIG:COUN 6']
+    assert fluke_server.instrument.trigger_count == 6
+
+def test_raising_batch_does_not_poison_cache(dmm, fluke_server, messages):
+    dmm.enable_state_cache()
+    with pytest.raises(RuntimeError):
+        with dmm.batch():
+            dmm.set_trigger_count(7)
+            raise RuntimeError('aborted')
+    assert sent(dmm, messages) == []
+    assert fluke_server.instrument.trigger_count == 1
+    assert dmm.set_trigger_count(7)
+    assert sent(dmm, messages) == ['TRIG:COUN 7']
+    assert fluke_server.instrument.trigger_count == 7
+
+def test_async_raising_batch_does_not_poison_cache(fluke_server, messages):
+    async def run():
+        dmm = AsyncFluke8846A(fluke_server.resource)
+        dmm.enable_state_cache()
+        try:
+            with pytest.raises(RuntimeError):
+                async with dmm.batch():
+                    await dmm.set_trigger_count(7)
+                    raise RuntimeError('aborted')
+            assert await dmm.set_trigger_count(7)
+            assert await dmm.set_trigger_count(7)
+            await dmm.get_operation_complete_bit()
+        finally:
+            await dmm.close_connection()
+    asyncio.run(run())
+    assert writes(messages) == ['TRIG:COUN 7']
+    assert fluke_server.instrument.trigger_count == 7
+
+def test_batch_sends_cached_value_queued_after_other(dmm, fluke_server, messages):
+    dmm.enable_state_cache()
+    assert dmm.set_trigger_count(5)
+    with dmm.batch():
+        dmm.set_trigger_count(10)
+        dmm.set_trigger_count(5)
+    assert sent(dmm, messages) == ['TRIG:COUN 5', 'TRIG:COUN 10;:TRIG:COUN 5']
+    assert fluke_server.instrument.trigger_count == 5
+    # The last value of the batch is cached
+    assert dmm.set_trigger_count(5)
+    assert len(sent(dmm, messages)) == 2
+
+def test_async_batch_sends_cached_value_queued_after_other(fluke_server, messages):
+    async def run():
+        dmm = AsyncFluke8846A(fluke_server.resource)
+        dmm.enable_state_cache()
+        try:
+            assert await dmm.set_trigger_count(5)
+            async with dmm.batch():
+                await dmm.set_trigger_count(10)
+                await dmm.set_trigger_count(5)
+            await dmm.get_operation_complete_bit()
+        finally:
+            await dmm.close_connection()
+    asyncio.run(run())
+    assert writes(messages) == ['TRIG:COUN 5', 'TRIG:COUN 10;:TRIG:COUN 5']
+    assert fluke_server.instrument.trigger_count == 5
+
+def test_related_settings_expire(dmm, fluke_server, messages):
+    dmm.enable_state_cache()
+    assert dmm.set_dc_voltage_NPLC(10)
+    assert float(dmm.get_dc_voltage_nplc()) == 10
+    count = len(messages)
+    dmm.get_dc_voltage_nplc()
+    assert len(messages) == count
+
+    # Resolution changes NPLC of the same function on the meter
+    assert dmm.set_dc_voltage_resolution('MAX')
+    nplc = fluke_server.instrument.parameters['VOLT:DC']['NPLC']
+    assert nplc != 10
+    assert float(dmm.get_dc_voltage_nplc()) == nplc
+    assert dmm.set_dc_voltage_NPLC(10)
+    dmm.get_operation_complete_bit()
+    assert fluke_server.instrument.parameters['VOLT:DC']['NPLC'] == 10
+
+    # Settings of other functions are kept
+    assert float(dmm.get_dc_voltage_nplc()) == 10
+    assert dmm.set_ac_current_range(1)
+    count = len(messages)
+    dmm.get_dc_voltage_nplc()
+    assert len(messages) == count
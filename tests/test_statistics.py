@@ -0,0 +1,74 @@
+import math
+import numpy as np
+import pytest
+from Fluke8846A.MeasurementConfig import MeasurementConfig
+from Fluke8846A.Statistics import ReadingStatistics
+
+@pytest.fixture
+def readings() -> np.ndarray:
+    rng = np.random.default_rng(3)
+    return 0.6 + 1e-6*np.arange(10_000) + 1e-3*rng.standard_normal(10_000)
+
+def allan_deviation(readings, factor) -> float:
+    blocks = len(readings)//factor
+    means = readings[:blocks*factor].reshape(blocks, factor).mean(axis=1)
+    return math.sqrt(np.mean(np.diff(means)**2)/2)
+
+def test_chunks_match_numpy(readings):
+    stats = ReadingStatistics(histogram_range=(0.59, 0.62), bins=30)
+    for chunk in np.array_split(readings, [1, 7, 1000, 1003, 6000]):
+        stats.update(chunk)
+    assert stats.count == len(readings)
+    assert stats.mean == pytest.approx(readings.mean())
+    assert stats.std == pytest.approx(readings.std(ddof=1))
+    assert stats.drift == pytest.approx(np.polyfit(np.arange(len(readings)), readings, 1)[0])
+    assert (stats.minimum, stats.maximum) == (readings.min(), readings.max())
+    histogram = np.histogram(readings, 30, (0.59, 0.62))[0]
+    np.testing.assert_array_equal(stats.histogram, histogram)
+    assert stats.underflow + stats.overflow + histogram.sum() == len(readings)
+    deviations = stats.allan_deviation()
+    for factor in (1, 16, 256):
+        assert deviations[factor] == pytest.approx(allan_deviation(readings, factor))
+    assert max(deviations) == 4096
+
+def test_overloads_are_counted(readings):
+    stats = ReadingStatistics()
+    stats.update(np.concatenate((readings[:10], [np.nan, np.nan])))
+    assert (stats.count, stats.overloads) == (10, 2)
+    assert stats.summary()['mean'] == pytest.approx(readings[:10].mean())
+
+def test_merge(readings):
+    whole = ReadingStatistics(histogram_range=(0.59, 0.62))
+    whole.update(readings)
+    first, second = ReadingStatistics(histogram_range=(0.59, 0.62)), ReadingStatistics(histogram_range=(0.59, 0.62))
+    first.update(readings[:4000])
+    second.update(readings[4000:])
+    merged = first.merge(second)
+    assert merged.count == whole.count
+    assert merged.mean == pytest.approx(whole.mean)
+    assert merged.std == pytest.approx(whole.std)
+    assert merged.drift == pytest.approx(whole.drift)
+    np.testing.assert_array_equal(merged.histogram, whole.histogram)
+    assert merged.allan_deviation()[1] == pytest.approx(whole.allan_deviation()[1], rel=1e-3)
+    with pytest.raises(ValueError):
+        merged.merge(ReadingStatistics(histogram_range=(0, 1)))
+
+def test_empty():
+    stats = ReadingStatistics()
+    assert stats.count == 0
+    assert math.isnan(stats.std) and math.isnan(stats.drift)
+    assert stats.allan_deviation() == {}
+
+def test_streamed_readings(dmm):
+    assert dmm.apply_config(MeasurementConfig('VOLT:DC', range=10, nplc=0.02))
+    stats = ReadingStatistics(histogram_range=(0.9, 1.1), bins=20)
+    readings = []
+    for chunk in dmm.stream(1000, count=3000, poll_interval=0.01):
+        stats.update(chunk)
+        readings.append(chunk)
+    readings = np.concatenate(readings)
+    assert stats.count == len(readings) == 3000
+    assert stats.mean == pytest.approx(readings.mean())
+    assert stats.std == pytest.approx(readings.std(ddof=1))
+    assert stats.histogram.sum() + stats.underflow + stats.overflow == 3000
+    assert stats.summary()['count'] == 3000
@@ -0,0 +1,65 @@
+import asyncio
+import time
+import numpy as np
+from Fluke8846A.Fluke8846A import MEMORY_SIZE
+from Fluke8846A.AsyncFluke8846A import AsyncFluke8846A
+from Fluke8846A.MeasurementConfig import MeasurementConfig
+
+FAST = MeasurementConfig('VOLT:DC', range=10, nplc=0.02)
+
+def test_stream(dmm, fluke_server):
+    assert dmm.apply_config(FAST)
+    chunks = list(dmm.stream(1000, count=6000, poll_interval=0.01))
+    assert sum(len(chunk) for chunk in chunks) == 6000
+    assert all(len(chunk) >= 1000 for chunk in chunks[:-1])
+    assert np.all(np.abs(np.concatenate(chunks) - 1.0) < 0.01)
+    assert fluke_server.instrument.lost == 0
+
+def test_stream_closed_early(dmm, messages):
+    assert dmm.apply_config(FAST)
+    stream = dmm.stream(500, poll_interval=0.01)
+    assert len(next(stream)) >= 500
+    stream.close()
+    dmm.get_operation_complete_bit()
+    assert 'ABOR' in messages
+
+def test_stream_rejects_chunk_larger_than_memory(dmm, messages):
+    assert list(dmm.stream(MEMORY_SIZE, count=12000)) == []
+    assert messages == []
+
+def test_stream_stops_when_memory_was_full(dmm, fluke_server, messages):
+    assert dmm.apply_config(FAST)
+    started = time.perf_counter()
+    chunks = []
+    for chunk in dmm.stream(1000, count=20000, poll_interval=0.01):
+        chunks.append(chunk)
+        # A slow consumer lets the memory fill up
+        time.sleep(0.5)
+    assert time.perf_counter() - started < 10
+    assert len(chunks[-1]) == MEMORY_SIZE
+    assert fluke_server.instrument.lost > 0
+    dmm.get_operation_complete_bit()
+    assert 'ABOR' in messages
+
+def test_stream_stops_when_meter_stops(dmm, fluke_server):
+    assert dmm.apply_config(FAST)
+    chunks = []
+    started = time.perf_counter()
+    for chunk in dmm.stream(1000, count=20000, poll_interval=0.01, timeout=0.2):
+        chunks.append(chunk)
+        # The acquisition is aborted on the front panel
+        fluke_server.instrument.abort()
+    assert time.perf_counter() - started < 5
+    assert sum(len(chunk) for chunk in chunks) < 20000
+
+def test_async_stream(fluke_server):
+    async def run():
+        dmm = AsyncFluke8846A(fluke_server.resource)
+        try:
+            assert await dmm.apply_config(FAST)
+            return [chunk async for chunk in dmm.stream(1000, count=4000, poll_interval=0.01)]
+        finally:
+            await dmm.close_connection()
+    chunks = asyncio.run(run())
+    assert sum(len(chunk) for chunk in chunks) == 4000
+    assert fluke_server.instrument.lost == 0
@@ -0,0 +1,22 @@
+import time
+
+def test_single_and_wait(osc, messages):
+    rigol = osc.rigol
+    assert rigol.single_and_wait()
+    assert messages[0] == ':SING'
+    assert messages[-1] == ':TRIG:STAT?'
+    assert rigol.get_trigger_status().strip() == 'STOP'
+
+def test_single_and_wait_timeout(osc, rigol_server, messages):
+    rigol = osc.rigol
+    rigol_server.instrument.trigger_wait = 10
+    started = time.monotonic()
+    assert not rigol.single_and_wait(timeout=0.5)
+    assert 0.5 <= time.monotonic() - started < 1.5
+    # The polling interval grows from 5 ms to 200 ms
+    assert 4 < messages.count(':TRIG:STAT?') < 12
+    assert rigol.get_trigger_status().strip() == 'WAIT'
+
+    assert rigol.force_trigger()
+    assert rigol.wait_for_trigger_state('STOP', timeout=2)
+    assert rigol.wait_for_trigger_state(('TD', 'STOP'), timeout=0)
@@ -0,0 +1,35 @@
+from Fluke8846A.MeasurementConfig import MeasurementConfig
+
+VOLTS = MeasurementConfig('VOLT:DC', range=10, nplc=10)
+
+def bursts(messages) -> int:
+    return sum(message.startswith('INIT') for message in messages)
+
+def test_fastest_nplc_below_noise_limit(dmm, fluke_server, messages):
+    # Noise of the simulated 10 V range is 1 mV at 0.02 NPLC and 0.1 mV at 0.2 NPLC
+    assert dmm.apply_config(VOLTS)
+    config = dmm.tune_nplc(max_std=3e-4, burst=20, burst_time=0.2)
+    assert config == VOLTS._replace(nplc=0.2)
+    assert dmm.get_active_config() == config
+    dmm.get_operation_complete_bit()
+    assert fluke_server.instrument.parameters['VOLT:DC']['NPLC'] == 0.2
+    results = dmm.tuning_cache['VOLT:DC 10']
+    assert sorted(results) == [0.02, 0.2]
+    assert results[0.02][1] > 3e-4 > results[0.2][1]
+    assert bursts(messages) == 2
+
+    # Measured integration times are taken from the cache
+    messages.clear()
+    assert dmm.tune_nplc(max_std=3e-4, config=VOLTS) == config
+    assert bursts(messages) == 0
+
+def test_quietest_nplc_above_rate(dmm):
+    config = dmm.tune_nplc(min_rate=100, config=VOLTS, burst=20, burst_time=0.2)
+    assert config.nplc == 0.2
+    assert list(dmm.tuning_cache['VOLT:DC 10']) == [0.2]
+
+def test_unreachable_target(dmm):
+    assert dmm.tune_nplc(max_std=1e-9, min_rate=10, config=VOLTS._replace(range=0.1), burst=10, burst_time=0.01) is None
+    assert sorted(dmm.tuning_cache['VOLT:DC 0.1']) == [0.02, 0.2, 1]
+    assert dmm.tune_nplc() is None
+    assert dmm.tune_nplc(max_std=1, config=MeasurementConfig('VOLT:AC', range=10)) is None
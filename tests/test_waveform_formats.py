@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+from RigolDS1054Z.Oscilloscope import parse_ascii_values
+
+def test_parse_ascii_values():
+    np.testing.assert_array_equal(parse_ascii_values(b'-1.5e-01,2.0e+00,0.0,\n'), [-0.15, 2.0, 0.0])
+    np.testing.assert_array_equal(parse_ascii_values(memoryview(b'1,2,3,4')[:3]), [1.0, 2.0])
+    assert len(parse_ascii_values(b'')) == 0
+    with pytest.raises(ValueError):
+        parse_ascii_values(b'1.0,x,3.0')
+
+def test_screen_formats_agree(osc):
+    # Both readings show the same acquisition in the stop state
+    assert osc.rigol.stop()
+    codes = osc.get_screen_data('CHAN1', 'BYTE')
+    p = osc.rigol.get_waveform_preamble()
+    voltage = osc.get_screen_data('CHAN1', 'ASC')
+    assert len(codes) == len(voltage) == p.points
+    np.testing.assert_allclose((codes - p.y_origin - p.y_reference)*p.y_increment, voltage, atol=1e-6)
+
+def test_format_choice(osc):
+    assert osc.choose_format('CHAN1', 'NORM') == 'BYTE'
+    assert osc.choose_format('D3', 'NORM') == 'BYTE'
+    assert osc.rigol.set_acquisition_mode('AVER')
+    assert osc.choose_format('CHAN1', 'NORM') == 'ASC'
+    assert osc.choose_format('CHAN1', 'RAW') == 'BYTE'
+    assert osc.rigol.stop()
+    voltage = osc.get_screen_data('CHAN1', 'AUTO')
+    assert voltage.dtype == np.float64 and len(voltage) == osc.points